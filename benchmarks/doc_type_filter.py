@@ -0,0 +1,162 @@
+"""
+Benchmarks the latency of doc type filtered searches against a Qdrant server.
+
+A temporary collection of random vectors with random doc types is created,
+and the same queries are run with:
+
+-   the legacy filter: a nested ``should`` of one ``MatchValue`` per doc type
+-   a single ``MatchAny`` condition
+-   no filter, which is what is used when every doc type is selected
+
+both before and after a keyword payload index is created on ``doc_type``.
+
+Usage::
+
+    python benchmarks/doc_type_filter.py --num_points 100000
+
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from fiftyone.docs_search.common import *
+from fiftyone.docs_search.search_backends import get_doc_type_filter
+
+COLLECTION_NAME = "fiftyone_docs_filter_benchmark"
+
+################################################################
+
+
+def _legacy_filter(doc_types):
+    return models.Filter(
+        must=[
+            models.Filter(
+                should=[
+                    models.FieldCondition(
+                        key="doc_type",
+                        match=models.MatchValue(value=dt),
+                    )
+                    for dt in doc_types
+                ],
+            )
+        ]
+    )
+
+
+def create_collection(client, num_points, dimension, batch_size, seed):
+    rng = np.random.default_rng(seed)
+
+    client.recreate_collection(
+        collection_name=COLLECTION_NAME,
+        vectors_config=models.VectorParams(
+            size=dimension, distance=models.Distance(METRIC)
+        ),
+    )
+
+    for start in range(0, num_points, batch_size):
+        end = min(start + batch_size, num_points)
+        vectors = rng.standard_normal((end - start, dimension))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        doc_types = rng.choice(DOC_TYPES, size=end - start)
+        client.upsert(
+            collection_name=COLLECTION_NAME,
+            points=models.Batch(
+                ids=list(range(start, end)),
+                vectors=vectors.tolist(),
+                payloads=[{"doc_type": str(dt)} for dt in doc_types],
+            ),
+        )
+
+
+def time_queries(client, queries, query_filter, top_k):
+    search_params = models.SearchParams(hnsw_ef=128, exact=False)
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        client.search(
+            collection_name=COLLECTION_NAME,
+            query_vector=query,
+            query_filter=query_filter,
+            limit=top_k,
+            search_params=search_params,
+        )
+        latencies.append(time.perf_counter() - start)
+
+    return 1000 * np.array(latencies)
+
+
+def print_row(name, latencies):
+    print(
+        f"{name:<32} {latencies.mean():>8.2f} "
+        f"{np.percentile(latencies, 50):>8.2f} "
+        f"{np.percentile(latencies, 95):>8.2f}"
+    )
+
+
+def run_filters(client, queries, subset, top_k):
+    filters = [
+        ("legacy, all types", _legacy_filter(DOC_TYPES)),
+        ("legacy, subset", _legacy_filter(subset)),
+        ("MatchAny, subset", get_doc_type_filter(subset)),
+        ("no filter (all types)", get_doc_type_filter(DOC_TYPES)),
+    ]
+
+    print(f"{'filter':<32} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, query_filter in filters:
+        ## warm up
+        time_queries(client, queries[:5], query_filter, top_k)
+        print_row(name, time_queries(client, queries, query_filter, top_k))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--num_points", type=int, default=50000)
+    parser.add_argument("--num_queries", type=int, default=200)
+    parser.add_argument("--dimension", type=int, default=DIMENSION)
+    parser.add_argument("--batch_size", type=int, default=500)
+    parser.add_argument("--top_k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=51)
+    parser.add_argument(
+        "--doc_types",
+        nargs="+",
+        default=["tutorials", "recipes"],
+        help="the doc types to use for the subset filter",
+    )
+    args = parser.parse_args()
+
+    client = get_client()
+    print(f"Creating collection with {args.num_points} points...")
+    create_collection(
+        client, args.num_points, args.dimension, args.batch_size, args.seed
+    )
+
+    rng = np.random.default_rng(args.seed + 1)
+    queries = rng.standard_normal((args.num_queries, args.dimension))
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    queries = queries.tolist()
+
+    try:
+        print("\nWithout a payload index:")
+        run_filters(client, queries, args.doc_types, args.top_k)
+
+        client.create_payload_index(
+            collection_name=COLLECTION_NAME,
+            field_name="doc_type",
+            field_schema=models.PayloadSchemaType.KEYWORD,
+            wait=True,
+        )
+
+        print("\nWith a keyword payload index on doc_type:")
+        run_filters(client, queries, args.doc_types, args.top_k)
+    finally:
+        client.delete_collection(collection_name=COLLECTION_NAME)
+
+
+if __name__ == "__main__":
+    main()
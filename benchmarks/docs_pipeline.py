@@ -0,0 +1,487 @@
+"""
+Benchmarks the document-processing pipeline on synthetic Sphinx pages.
+
+Small, medium and huge Sphinx-style HTML pages are generated from fixed
+seeds, so every run processes exactly the same input, and each stage of the
+pipeline is run on them:
+
+-   ``extract_content_html``: extracting the document body from the HTML
+-   ``markdownify``: converting the body to markdown
+-   ``parse_page_markdown``: cleaning the markdown
+-   ``get_page_markdown``: all of the above, starting from the HTML file
+-   ``split_at_anchors``: splitting the page into sections
+-   ``split_page_into_chunks``: splitting the sections into chunks
+
+For each stage, the best time over several repeats and the peak memory
+allocated (measured separately with ``tracemalloc``) are reported, along with
+the number of sections and chunks that each page produces.
+
+Results can be saved as a baseline and later runs compared against it, which
+exits with a nonzero status if any stage got slower or allocated more by more
+than the tolerance, or if the chunk counts changed. Timings depend on the
+machine, so baselines should be generated on the machine that runs the
+comparison. The benchmark runs offline and doesn't need ``FIFTYONE_DIR``.
+
+Usage::
+
+    python benchmarks/docs_pipeline.py --save_baseline
+
+    python benchmarks/docs_pipeline.py --tolerance 0.25
+
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+
+import argparse
+import base64
+import html
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import markdownify as md
+
+from fiftyone.docs_search.extract_html import extract_content_html
+from fiftyone.docs_search.read_docs import (
+    get_page_markdown,
+    parse_page_markdown,
+    split_at_anchors,
+    split_page_into_chunks,
+)
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "baselines",
+    "docs_pipeline.json",
+)
+
+## (number of sections, seed) of each fixture
+FIXTURES = {
+    "small": (4, 51),
+    "medium": (40, 52),
+    "huge": (400, 53),
+}
+
+PACKAGES = ("markdownify", "beautifulsoup4")
+
+## time increases smaller than this are never regressions
+MIN_TIME_DELTA_MS = 0.5
+
+_WORDS = (
+    "dataset sample field label view load export import evaluate model "
+    "embeddings brain patches frames video image detections classification "
+    "the a of to and in with for is are can you your this that each"
+).split()
+
+_IMAGE = base64.b64encode(bytes(range(256)) * 4).decode("ascii")
+
+################################################################
+
+
+def _sentence(rng, num_words):
+    words = [rng.choice(_WORDS) for _ in range(num_words)]
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng):
+    sentences = []
+    for _ in range(rng.randint(2, 6)):
+        sentence = _sentence(rng, rng.randint(6, 20))
+        if rng.random() < 0.3:
+            sentence += (
+                f' See <a class="reference internal" href="../user_guide/'
+                f'{rng.choice(_WORDS)}.html#{rng.choice(_WORDS)}">'
+                f"<span>{rng.choice(_WORDS)}</span></a> for details."
+            )
+        if rng.random() < 0.2:
+            sentence += (
+                f' Use <code class="docutils literal"><span class="pre">'
+                f"fo.{rng.choice(_WORDS)}()</span></code>."
+            )
+        sentences.append(sentence)
+
+    return f"<p>{' '.join(sentences)}</p>"
+
+
+def _code_block(rng):
+    lines = [
+        f"{rng.choice(_WORDS)} = fo.{rng.choice(_WORDS)}"
+        f'("{rng.choice(_WORDS)}", {rng.randint(0, 100)})'
+        for _ in range(rng.randint(2, 15))
+    ]
+    code = html.escape("\n".join(lines))
+    if rng.random() < 0.5:
+        return (
+            '<div class="highlight-python notranslate"><div class="highlight">'
+            f"<pre><span></span>{code}\n</pre></div></div>"
+        )
+
+    linenos = "\n".join(str(i + 1) for i in range(len(lines)))
+    return (
+        '<div class="highlight-python notranslate"><table class="highlighttable">'
+        f'<tr><td class="linenos"><div class="linenodiv"><pre>{linenos}</pre>'
+        f'</div></td><td class="code"><div class="highlight"><pre><span></span>'
+        f"{code}\n</pre></div></td></tr></table></div>"
+    )
+
+
+def _table(rng):
+    rows = [
+        "<tr>"
+        + "".join(f"<td>{rng.choice(_WORDS)}</td>" for _ in range(3))
+        + "</tr>"
+        for _ in range(rng.randint(2, 8))
+    ]
+    return (
+        '<table class="docutils align-default"><thead><tr><th>Name</th>'
+        "<th>Type</th><th>Description</th></tr></thead>"
+        f"<tbody>{''.join(rows)}</tbody></table>"
+    )
+
+
+def _section(rng, index, level):
+    anchor = f"section-{index}"
+    title = _sentence(rng, rng.randint(2, 5))[:-1]
+    parts = [
+        f'<section id="{anchor}">',
+        f"<h{level}>{title}"
+        f'<a class="headerlink" href="#{anchor}" title="Permalink to this '
+        f'heading">¶</a></h{level}>',
+    ]
+    for _ in range(rng.randint(1, 5)):
+        r = rng.random()
+        if r < 0.55:
+            parts.append(_paragraph(rng))
+        elif r < 0.8:
+            parts.append(_code_block(rng))
+        elif r < 0.9:
+            parts.append(_table(rng))
+        elif r < 0.95:
+            parts.append(
+                '<div class="output_area"><img alt="" '
+                f'src="data:image/png;base64,{_IMAGE}"/></div>'
+            )
+        else:
+            parts.append(
+                '<script type="application/vnd.jupyter.widget-view+json">'
+                '{"model_id": "%032x", "version_major": 2}</script>'
+                % rng.getrandbits(128)
+            )
+
+    parts.append("</section>")
+    return "\n".join(parts)
+
+
+def make_fixture_html(num_sections, seed):
+    """Generates a Sphinx-style HTML docs page.
+
+    Args:
+        num_sections: the number of sections in the page
+        seed: the random seed
+
+    Returns:
+        the HTML string
+    """
+    rng = random.Random(seed)
+
+    ## like the real docs, the sidebar contains the toctree of the whole site
+    nav = "".join(
+        f'<li class="toctree-l1"><a class="reference internal" '
+        f'href="../{word}/index.html">{word.capitalize()}</a><ul>'
+        + "".join(
+            f'<li class="toctree-l2"><a class="reference internal" '
+            f'href="../{word}/{other}.html">{other.capitalize()}</a></li>'
+            for other in _WORDS[:12]
+        )
+        + "</ul></li>"
+        for word in _WORDS[:20]
+    )
+    sections = [
+        _section(rng, i, 2 if i % 4 == 0 else 3) for i in range(num_sections)
+    ]
+
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Synthetic page {seed} &mdash; FiftyOne documentation</title>
+<link rel="stylesheet" href="../_static/css/theme.css" type="text/css" />
+<script>(function() {{ var theme = "light"; }})();</script>
+<script src="../_static/jquery.js"></script>
+<style>.pytorch-left-menu {{ width: 280px; }} .main-content {{ margin: 0; }}</style>
+</head>
+<body class="pytorch-body">
+<div class="pytorch-container">
+<nav class="pytorch-left-menu" id="pytorch-left-menu">
+<ul class="current">{nav}</ul>
+</nav>
+<div class="pytorch-content-wrap">
+<div role="main" class="main-content">
+<article itemprop="articleBody" id="pytorch-article" class="pytorch-article">
+<section id="synthetic-page-{seed}">
+<h1>Synthetic page {seed}<a class="headerlink" href="#synthetic-page-{seed}" title="Permalink to this heading">¶</a></h1>
+{_paragraph(rng)}
+{chr(10).join(sections)}
+</section>
+</article>
+</div>
+<div class="rst-footer-buttons" role="navigation">
+<a href="next.html" class="btn btn-neutral float-right" title="Next">Next <img src="../_static/images/chevron-right-orange.svg" class="next-page"></a>
+</div>
+<footer><div role="contentinfo"><p>© Copyright 2017-2023, Voxel51, Inc.</p></div></footer>
+</div>
+</div>
+</body>
+</html>
+"""
+
+
+def write_fixtures(fixtures, outdir):
+    filepaths = {}
+    for name in fixtures:
+        num_sections, seed = FIXTURES[name]
+        filepath = os.path.join(outdir, f"{name}.html")
+        with open(filepath, "w") as f:
+            f.write(make_fixture_html(num_sections, seed))
+
+        filepaths[name] = filepath
+
+    return filepaths
+
+
+################################################################
+
+
+def get_stages(filepath):
+    """Returns a list of ``(name, fn)`` tuples for the stages of the pipeline
+    on the given page, where each ``fn`` takes no arguments.
+    """
+    with open(filepath) as f:
+        page_html = f.read()
+
+    content_html = extract_content_html(page_html)
+    raw_md = md.markdownify(content_html, heading_style="ATX")
+    page_md = parse_page_markdown(raw_md)
+
+    return [
+        ("extract_content_html", lambda: extract_content_html(page_html)),
+        (
+            "markdownify",
+            lambda: md.markdownify(content_html, heading_style="ATX"),
+        ),
+        ("parse_page_markdown", lambda: parse_page_markdown(raw_md)),
+        ("get_page_markdown", lambda: get_page_markdown(filepath)),
+        ("split_at_anchors", lambda: split_at_anchors(page_md)),
+        ("split_page_into_chunks", lambda: split_page_into_chunks(page_md)),
+    ]
+
+
+def time_stage(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    ## the minimum is the least affected by noise from the rest of the machine
+    return 1000 * min(times)
+
+
+def measure_peak_memory(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return peak / 1024
+
+
+def run_benchmark(filepaths, repeats):
+    results = {}
+    for name, filepath in filepaths.items():
+        stages = {}
+        for stage, fn in get_stages(filepath):
+            ## warm up
+            fn()
+            stages[stage] = {
+                "time_ms": time_stage(fn, repeats),
+                "peak_kb": measure_peak_memory(fn),
+            }
+
+        chunks = split_page_into_chunks(get_page_markdown(filepath))
+        results[name] = {
+            "html_kb": os.path.getsize(filepath) / 1024,
+            "num_sections": len(chunks),
+            "num_chunks": sum(len(c) for c in chunks.values()),
+            "stages": stages,
+        }
+
+    return results
+
+
+def get_environment():
+    from importlib import metadata
+
+    packages = {}
+    for package in PACKAGES:
+        try:
+            packages[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            packages[package] = None
+
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "packages": packages,
+    }
+
+
+################################################################
+
+
+def print_results(results, baseline=None):
+    print(
+        f"{'fixture':<8} {'stage':<24} {'ms':>10} {'peak KB':>10}"
+        + ("" if baseline is None else f" {'ms ratio':>9} {'KB ratio':>9}")
+    )
+    for name, result in results.items():
+        base = None
+        if baseline is not None:
+            base = baseline["results"].get(name, None)
+
+        for stage, values in result["stages"].items():
+            row = (
+                f"{name:<8} {stage:<24} {values['time_ms']:>10.2f} "
+                f"{values['peak_kb']:>10.1f}"
+            )
+            base_values = None
+            if base is not None:
+                base_values = base["stages"].get(stage, None)
+
+            if base_values is not None:
+                row += (
+                    f" {values['time_ms'] / base_values['time_ms']:>9.2f}"
+                    f" {values['peak_kb'] / base_values['peak_kb']:>9.2f}"
+                )
+
+            print(row)
+
+        print(
+            f"{name:<8} {result['html_kb']:.1f} KB of HTML -> "
+            f"{result['num_sections']} sections, "
+            f"{result['num_chunks']} chunks\n"
+        )
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Returns a list of regression messages."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline["results"].get(name, None)
+        if base is None:
+            continue
+
+        for key in ("num_sections", "num_chunks"):
+            if result[key] != base[key]:
+                regressions.append(
+                    f"{name}: {key} changed from {base[key]} to {result[key]}"
+                )
+
+        for stage, values in result["stages"].items():
+            base_values = base["stages"].get(stage, None)
+            if base_values is None:
+                continue
+
+            for key in ("time_ms", "peak_kb"):
+                value = values[key]
+                base_value = base_values[key]
+                if value <= (1 + tolerance) * base_value:
+                    continue
+
+                if key == "time_ms" and value - base_value < MIN_TIME_DELTA_MS:
+                    continue
+
+                regressions.append(
+                    f"{name}/{stage}: {key} increased from "
+                    f"{base_value:.2f} to {value:.2f}"
+                )
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--fixtures",
+        nargs="+",
+        default=list(FIXTURES),
+        choices=list(FIXTURES),
+    )
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--save_baseline",
+        action="store_true",
+        help="save the results as the new baseline",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="the relative increase in time or memory that is a regression",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filepaths = write_fixtures(args.fixtures, tmpdir)
+        results = run_benchmark(filepaths, args.repeats)
+
+    environment = get_environment()
+
+    baseline = None
+    if not args.save_baseline and os.path.isfile(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(json.dumps(environment))
+    if baseline is not None:
+        print(f"baseline: {json.dumps(baseline['environment'])}")
+
+    print()
+    print_results(results, baseline=baseline)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(
+                {"environment": environment, "results": results}, f, indent=4
+            )
+
+        print(f"Saved baseline to '{args.baseline}'")
+        return
+
+    if baseline is None:
+        print(f"No baseline found at '{args.baseline}'")
+        return
+
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print("Regressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+
+        sys.exit(1)
+
+    print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Evaluates the recall and latency of quantized collections on a Qdrant server.
+
+The vectors of a docs index (or random vectors) are loaded into one temporary
+collection per quantization type, and the same queries are run against each
+collection with different rescoring and oversampling settings. Recall@k is
+measured against exact brute-force results computed in-process.
+
+Queries are perturbed copies of indexed vectors, so that they resemble real
+queries that land near the docs rather than random points in space.
+
+Usage::
+
+    python benchmarks/quantization.py --index ~/.fiftyone_docs_search/fiftyone_docs_index.json
+
+    python benchmarks/quantization.py --num_points 50000
+
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from fiftyone.docs_search.binary_index import (
+    is_binary_index,
+    load_binary_index,
+)
+from fiftyone.docs_search.common import *
+from fiftyone.docs_search.create_index import get_quantization_config
+from fiftyone.docs_search.json_index import iter_index_records
+
+COLLECTION_PREFIX = "fiftyone_docs_quantization_benchmark"
+
+################################################################
+
+
+def load_vectors(index_path, num_points, dimension, seed):
+    if index_path is None:
+        rng = np.random.default_rng(seed)
+        vectors = rng.standard_normal((num_points, dimension))
+    elif is_binary_index(index_path):
+        vectors = np.asarray(load_binary_index(index_path).vectors)
+    else:
+        vectors = np.array(
+            [value["vector"] for _, value in iter_index_records(index_path)]
+        )
+
+    vectors = vectors.astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def make_queries(vectors, num_queries, noise, seed):
+    rng = np.random.default_rng(seed)
+    inds = rng.choice(len(vectors), size=num_queries, replace=False)
+    queries = vectors[inds] + noise * rng.standard_normal(
+        (num_queries, vectors.shape[1])
+    ).astype(np.float32) / np.sqrt(vectors.shape[1])
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return queries
+
+
+def create_collection(client, name, vectors, quantization, batch_size):
+    client.recreate_collection(
+        collection_name=name,
+        vectors_config=models.VectorParams(
+            size=vectors.shape[1], distance=models.Distance(METRIC)
+        ),
+        quantization_config=get_quantization_config(quantization),
+    )
+
+    for start in range(0, len(vectors), batch_size):
+        end = min(start + batch_size, len(vectors))
+        client.upsert(
+            collection_name=name,
+            points=models.Batch(
+                ids=list(range(start, end)),
+                vectors=vectors[start:end].tolist(),
+            ),
+        )
+
+    ## wait for the HNSW and quantized indexes to be built
+    while client.get_collection(collection_name=name).status != "green":
+        time.sleep(0.5)
+
+
+def evaluate(
+    client, name, queries, ground_truth, top_k, rescore, oversampling
+):
+    search_params = models.SearchParams(
+        hnsw_ef=128,
+        exact=False,
+        quantization=models.QuantizationSearchParams(
+            rescore=rescore, oversampling=oversampling
+        ),
+    )
+
+    latencies = []
+    recalls = []
+    for query, truth in zip(queries, ground_truth):
+        start = time.perf_counter()
+        results = client.search(
+            collection_name=name,
+            query_vector=query.tolist(),
+            limit=top_k,
+            search_params=search_params,
+        )
+        latencies.append(time.perf_counter() - start)
+
+        ids = set(res.id for res in results)
+        recalls.append(len(ids.intersection(truth)) / top_k)
+
+    return np.mean(recalls), 1000 * np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--index",
+        default=None,
+        help="a JSON, JSONL or binary index whose vectors to use",
+    )
+    parser.add_argument("--num_points", type=int, default=20000)
+    parser.add_argument("--dimension", type=int, default=DIMENSION)
+    parser.add_argument("--num_queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.5)
+    parser.add_argument("--batch_size", type=int, default=500)
+    parser.add_argument("--top_k", type=int, default=10)
+    parser.add_argument(
+        "--oversampling", type=float, nargs="+", default=[1.0, 2.0, 4.0]
+    )
+    parser.add_argument(
+        "--quantization",
+        nargs="+",
+        default=list(QUANTIZATION_TYPES),
+        choices=QUANTIZATION_TYPES,
+    )
+    parser.add_argument("--seed", type=int, default=51)
+    args = parser.parse_args()
+
+    vectors = load_vectors(
+        args.index, args.num_points, args.dimension, args.seed
+    )
+    queries = make_queries(vectors, args.num_queries, args.noise, args.seed)
+
+    scores = queries @ vectors.T
+    ground_truth = [
+        set(inds.tolist())
+        for inds in np.argsort(-scores, axis=1)[:, : args.top_k]
+    ]
+
+    client = get_client()
+
+    print(
+        f"{'quantization':<14} {'rescore':<8} {'oversampling':>12} "
+        f"{'recall@' + str(args.top_k):>10} {'mean ms':>8} {'p95 ms':>8}"
+    )
+    for quantization in args.quantization:
+        name = f"{COLLECTION_PREFIX}_{quantization}"
+        create_collection(client, name, vectors, quantization, args.batch_size)
+
+        if quantization == "none":
+            settings = [(False, 1.0)]
+        else:
+            settings = [(False, 1.0)] + [
+                (True, oversampling) for oversampling in args.oversampling
+            ]
+
+        try:
+            for rescore, oversampling in settings:
+                recall, latencies = evaluate(
+                    client,
+                    name,
+                    queries,
+                    ground_truth,
+                    args.top_k,
+                    rescore,
+                    oversampling,
+                )
+                print(
+                    f"{quantization:<14} {str(rescore):<8} "
+                    f"{oversampling:>12.1f} {recall:>10.3f} "
+                    f"{latencies.mean():>8.2f} "
+                    f"{np.percentile(latencies, 95):>8.2f}"
+                )
+        finally:
+            client.delete_collection(collection_name=name)
+
+
+if __name__ == "__main__":
+    main()
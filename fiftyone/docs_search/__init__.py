@@ -1 +1,9 @@
-from .query_index import FiftyOneDocsSearch
+def __getattr__(name):
+    ## imported lazily so that importing the CLI doesn't pay for the query
+    ## stack
+    if name == "FiftyOneDocsSearch":
+        from .query_index import FiftyOneDocsSearch
+
+        return FiftyOneDocsSearch
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
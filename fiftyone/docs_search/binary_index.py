@@ -0,0 +1,283 @@
+"""
+Binary index format declarations.
+
+A binary index is a directory containing:
+
+-   ``header.json``: the format version, the ID of the embedder that
+    generated the vectors (for OpenAI embeddings, the model name), dimension,
+    dtype and number of points
+-   ``vectors.bin``: a raw, row-major ``count x dimension`` matrix of float32
+    or float16 vectors that can be memory-mapped
+-   ``payloads.jsonl``: one compact JSON line per point containing its ID and
+    payload, in the same order as the vectors
+
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+
+import json
+import os
+
+import numpy as np
+
+from fiftyone.docs_search.json_index import iter_index_records
+
+BINARY_INDEX_FORMAT = "fiftyone-docs-index"
+BINARY_INDEX_VERSION = 1
+BINARY_INDEX_DTYPES = ("float32", "float16")
+
+HEADER_FILENAME = "header.json"
+VECTORS_FILENAME = "vectors.bin"
+PAYLOADS_FILENAME = "payloads.jsonl"
+
+################################################################
+
+
+def is_binary_index(path):
+    return os.path.isfile(os.path.join(path, HEADER_FILENAME))
+
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(",", ":"))
+
+
+################################################################
+
+
+class BinaryIndexWriter(object):
+    """Streams points to a binary index on disk.
+
+    Vectors are appended to the matrix file as they are added, so writing an
+    index never requires holding all of its vectors in memory. The header is
+    written when the writer is closed, unless it is used as a context manager
+    whose block raised an error, so that an incomplete index can't be loaded.
+
+    Args:
+        path: the directory to write the index to
+        model: the ID of the embedder that generated the vectors
+        dimension: the dimension of the vectors
+        dtype ("float32"): the dtype in which to store the vectors. Supported
+            values are ``("float32", "float16")``
+    """
+
+    def __init__(self, path, model, dimension, dtype="float32"):
+        if dtype not in BINARY_INDEX_DTYPES:
+            raise ValueError(
+                f"Unsupported dtype '{dtype}'. Supported values are "
+                f"{BINARY_INDEX_DTYPES}"
+            )
+
+        os.makedirs(path, exist_ok=True)
+
+        ## remove any stale header so that a partially written index is
+        ## never mistaken for a complete one
+        header_path = os.path.join(path, HEADER_FILENAME)
+        if os.path.exists(header_path):
+            os.remove(header_path)
+
+        self.path = path
+        self.model = model
+        self.dimension = dimension
+        self.dtype = dtype
+        self.count = 0
+
+        self._vectors_file = open(os.path.join(path, VECTORS_FILENAME), "wb")
+        self._payloads_file = open(
+            os.path.join(path, PAYLOADS_FILENAME), "w", encoding="utf-8"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(write_header=exc_type is None)
+
+    def add(self, ids, vectors, payloads):
+        vectors = np.asarray(vectors, dtype=self.dtype)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dimension:
+            raise ValueError(
+                f"Expected vectors of shape (n, {self.dimension}), but found "
+                f"{vectors.shape}"
+            )
+
+        self._vectors_file.write(np.ascontiguousarray(vectors).tobytes())
+        for id, payload in zip(ids, payloads):
+            self._payloads_file.write(_dumps({"id": id, **payload}) + "\n")
+
+        self.count += len(vectors)
+
+    def close(self, write_header=True):
+        """Closes the index files.
+
+        Args:
+            write_header (True): whether to write the header, which marks the
+                index as complete
+        """
+        if self._vectors_file is None:
+            return
+
+        self._vectors_file.close()
+        self._payloads_file.close()
+        self._vectors_file = None
+        self._payloads_file = None
+
+        if not write_header:
+            return
+
+        header = {
+            "format": BINARY_INDEX_FORMAT,
+            "version": BINARY_INDEX_VERSION,
+            "model": self.model,
+            "dimension": self.dimension,
+            "dtype": self.dtype,
+            "count": self.count,
+        }
+        with open(os.path.join(self.path, HEADER_FILENAME), "w") as f:
+            json.dump(header, f, indent=4)
+
+
+class BinaryIndex(object):
+    """A binary index loaded from disk.
+
+    The vector matrix is memory-mapped, so loading an index is nearly free
+    and its vectors are only paged in as they are read. Payloads are read
+    lazily on first access.
+
+    Args:
+        path: the index directory
+        mmap (True): whether to memory-map the vectors rather than reading
+            them into memory
+    """
+
+    def __init__(self, path, mmap=True):
+        with open(os.path.join(path, HEADER_FILENAME), "r") as f:
+            header = json.load(f)
+
+        if header.get("format", None) != BINARY_INDEX_FORMAT:
+            raise ValueError(f"'{path}' is not a binary docs index")
+
+        if header["version"] > BINARY_INDEX_VERSION:
+            raise ValueError(
+                f"Binary index '{path}' has version {header['version']}, but "
+                f"only versions <= {BINARY_INDEX_VERSION} are supported"
+            )
+
+        self.path = path
+        self.header = header
+
+        shape = (header["count"], header["dimension"])
+        vectors_path = os.path.join(path, VECTORS_FILENAME)
+        if header["count"] == 0:
+            self.vectors = np.empty(shape, dtype=header["dtype"])
+        elif mmap:
+            self.vectors = np.memmap(
+                vectors_path, dtype=header["dtype"], mode="r", shape=shape
+            )
+        else:
+            self.vectors = np.fromfile(
+                vectors_path, dtype=header["dtype"]
+            ).reshape(shape)
+
+        self._ids = None
+        self._payloads = None
+
+    def __len__(self):
+        return self.header["count"]
+
+    @property
+    def model(self):
+        return self.header["model"]
+
+    @property
+    def dimension(self):
+        return self.header["dimension"]
+
+    @property
+    def ids(self):
+        if self._ids is None:
+            self._load_payloads()
+        return self._ids
+
+    @property
+    def payloads(self):
+        if self._payloads is None:
+            self._load_payloads()
+        return self._payloads
+
+    def iter_batches(self, batch_size):
+        """Yields ``(ids, vectors, payloads)`` batches, where ``vectors`` is a
+        float32 array.
+        """
+        ids = []
+        payloads = []
+        start = 0
+        for id, payload in self._iter_payloads():
+            ids.append(id)
+            payloads.append(payload)
+            if len(ids) >= batch_size:
+                end = start + len(ids)
+                yield ids, self._get_vectors(start, end), payloads
+                ids = []
+                payloads = []
+                start = end
+
+        if ids:
+            end = start + len(ids)
+            yield ids, self._get_vectors(start, end), payloads
+
+    def _get_vectors(self, start, end):
+        return np.asarray(self.vectors[start:end], dtype=np.float32)
+
+    def _iter_payloads(self):
+        payloads_path = os.path.join(self.path, PAYLOADS_FILENAME)
+        with open(payloads_path, "r", encoding="utf-8") as f:
+            for line in f:
+                payload = json.loads(line)
+                yield payload.pop("id"), payload
+
+    def _load_payloads(self):
+        ids = []
+        payloads = []
+        for id, payload in self._iter_payloads():
+            ids.append(id)
+            payloads.append(payload)
+
+        self._ids = ids
+        self._payloads = payloads
+
+
+################################################################
+
+
+def load_binary_index(path, mmap=True):
+    return BinaryIndex(path, mmap=mmap)
+
+
+def save_binary_index(
+    path, ids, vectors, payloads, model, dimension, dtype="float32"
+):
+    with BinaryIndexWriter(path, model, dimension, dtype=dtype) as writer:
+        writer.add(ids, vectors, payloads)
+
+
+def convert_json_index_to_binary(
+    json_path, out_path, model, dimension, dtype="float32", batch_size=1000
+):
+    """Converts a JSON or JSONL index to a binary index."""
+    with BinaryIndexWriter(out_path, model, dimension, dtype=dtype) as writer:
+        ids = []
+        vectors = []
+        payloads = []
+        for id, value in iter_index_records(json_path):
+            ids.append(id)
+            vectors.append(value.pop("vector"))
+            payloads.append(value)
+            if len(ids) >= batch_size:
+                writer.add(ids, vectors, payloads)
+                ids = []
+                vectors = []
+                payloads = []
+
+        if ids:
+            writer.add(ids, vectors, payloads)
@@ -0,0 +1,282 @@
+"""
+Persistent cache declarations.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+
+from array import array
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+
+################################################################
+
+
+def normalize_text(text):
+    text = unicodedata.normalize("NFC", text)
+    return " ".join(text.split())
+
+
+def hash_text(model, text):
+    key = f"{model}\x00{normalize_text(text)}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _pack_embedding(embedding):
+    return array("f", embedding).tobytes()
+
+
+def _unpack_embedding(blob):
+    embedding = array("f")
+    embedding.frombytes(blob)
+    return embedding.tolist()
+
+
+def _pack_sections(sections):
+    data = json.dumps(list(sections.items()), separators=(",", ":"))
+    return zlib.compress(data.encode("utf-8"))
+
+
+def _unpack_sections(blob):
+    return dict(json.loads(zlib.decompress(blob).decode("utf-8")))
+
+
+################################################################
+
+
+class _SQLiteCache(object):
+    """Base class for disk-backed caches of blobs in a SQLite table.
+
+    When the total size of the stored blobs exceeds ``max_size`` bytes, the
+    least recently used entries are evicted.
+
+    Subclasses must set ``_table`` and ``_value_column``.
+
+    Args:
+        path: the path to the SQLite database file
+        max_size: the maximum total size of the cached blobs, in bytes
+    """
+
+    _table = None
+    _value_column = None
+
+    def __init__(self, path, max_size):
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self._table} ("
+            "key TEXT PRIMARY KEY, "
+            f"{self._value_column} BLOB NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "accessed REAL NOT NULL)"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {self._table}_accessed "
+            f"ON {self._table} (accessed)"
+        )
+        self._conn.commit()
+
+    @property
+    def size(self):
+        with self._lock:
+            return self._get_size()
+
+    def stats(self):
+        with self._lock:
+            num_entries = self._conn.execute(
+                f"SELECT COUNT(*) FROM {self._table}"
+            ).fetchone()[0]
+            size = self._get_size()
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": num_entries,
+            "size": size,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self._table}")
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _get_blobs(self, keys):
+        """Returns a dict mapping the given keys that are in the cache to
+        their blobs, and updates their access times.
+        """
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                batch = keys[i : i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, {self._value_column} FROM {self._table} "
+                    "WHERE key IN (%s)" % ",".join("?" * len(batch)),
+                    batch,
+                ).fetchall()
+                found.update(rows)
+
+            now = time.time()
+            self._conn.executemany(
+                f"UPDATE {self._table} SET accessed = ? WHERE key = ?",
+                [(now, key) for key in found],
+            )
+            self._conn.commit()
+
+        num_hits = sum(key in found for key in keys)
+        self.hits += num_hits
+        self.misses += len(keys) - num_hits
+        return found
+
+    def _put_blobs(self, keys, blobs):
+        now = time.time()
+        rows = [(key, blob, len(blob), now) for key, blob in zip(keys, blobs)]
+
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self._table} "
+                f"(key, {self._value_column}, size, accessed) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            self._evict()
+
+    def _get_size(self):
+        size = self._conn.execute(
+            f"SELECT SUM(size) FROM {self._table}"
+        ).fetchone()[0]
+        return size or 0
+
+    def _evict(self):
+        if self.max_size is None:
+            return
+
+        excess = self._get_size() - self.max_size
+        if excess <= 0:
+            return
+
+        ## evict down to 90% of the budget so that we don't evict on every
+        ## subsequent write
+        excess += self.max_size // 10
+        rows = self._conn.execute(
+            f"SELECT key, size FROM {self._table} ORDER BY accessed ASC"
+        )
+        keys = []
+        for key, size in rows:
+            if excess <= 0:
+                break
+            keys.append((key,))
+            excess -= size
+
+        self._conn.executemany(
+            f"DELETE FROM {self._table} WHERE key = ?", keys
+        )
+        self._conn.commit()
+
+
+class EmbeddingCache(_SQLiteCache):
+    """Disk-backed cache of embeddings, keyed by a hash of the model name and
+    the normalized text that was embedded.
+
+    Embeddings are stored as float32 blobs in a SQLite database. When the
+    total size of the stored embeddings exceeds ``max_size`` bytes, the least
+    recently used entries are evicted.
+
+    Args:
+        path: the path to the SQLite database file
+        max_size: the maximum total size of the cached embeddings, in bytes
+    """
+
+    _table = "embeddings"
+    _value_column = "embedding"
+
+    def get(self, model, text):
+        return self.get_many(model, [text])[0]
+
+    def put(self, model, text, embedding):
+        self.put_many(model, [text], [embedding])
+
+    def get_many(self, model, texts):
+        """Returns a list with the cached embedding of each text, or ``None``
+        for texts that are not in the cache.
+        """
+        keys = [hash_text(model, text) for text in texts]
+        found = self._get_blobs(keys)
+
+        embeddings = []
+        for key in keys:
+            blob = found.get(key, None)
+            if blob is None:
+                embeddings.append(None)
+            else:
+                embeddings.append(_unpack_embedding(blob))
+
+        return embeddings
+
+    def put_many(self, model, texts, embeddings):
+        keys = [hash_text(model, text) for text in texts]
+        blobs = [_pack_embedding(embedding) for embedding in embeddings]
+        self._put_blobs(keys, blobs)
+
+
+class ParseCache(_SQLiteCache):
+    """Disk-backed cache of parsed docs pages, keyed by a hash of the page's
+    HTML and the version of the parsing pipeline that parsed it.
+
+    Each page's sections are stored as zlib-compressed JSON of an ordered
+    ``[[anchor, [chunk, ...]], ...]`` list in a SQLite database. Entries
+    written by other versions of the pipeline are never read, and are
+    eventually evicted when the total size of the stored pages exceeds
+    ``max_size`` bytes.
+
+    Args:
+        path: the path to the SQLite database file
+        max_size: the maximum total size of the cached pages, in bytes
+        version: the version stamp of the parsing pipeline
+    """
+
+    _table = "pages"
+    _value_column = "sections"
+
+    def __init__(self, path, max_size, version):
+        super().__init__(path, max_size)
+        self.version = version
+
+    def get_key(self, page_html):
+        """Returns the key of a page from the raw bytes of its HTML."""
+        h = hashlib.sha256(f"{self.version}\x00".encode("utf-8"))
+        h.update(page_html)
+        return h.hexdigest()
+
+    def get(self, key):
+        """Returns the cached ``anchor -> chunks`` dict of the page with the
+        given key, or ``None`` if the page is not in the cache.
+        """
+        blob = self._get_blobs([key]).get(key, None)
+        if blob is None:
+            return None
+
+        return _unpack_sections(blob)
+
+    def put(self, key, sections):
+        self._put_blobs([key], [_pack_sections(sections)])
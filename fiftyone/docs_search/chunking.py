@@ -0,0 +1,450 @@
+"""
+Markdown chunking declarations.
+
+:class:`MarkdownChunker` splits the markdown of a docs section into chunks
+that are small enough to embed. It has no dependencies, and in compatibility
+mode it reproduces the chunks of the ``MarkdownTextSplitter`` of
+``langchain==0.0.179``, which existing indexes were built with. Later
+LangChain versions split differently, since their separators are regexes and
+they can keep the separators in the chunks.
+
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+
+from collections import deque
+import re
+
+from fiftyone.docs_search.common import CHUNK_UNITS, estimate_num_tokens
+
+## the separators of LangChain 0.0.179's `MarkdownTextSplitter`, in order of
+## preference
+COMPAT_SEPARATORS = (
+    "\n## ",
+    "\n### ",
+    "\n#### ",
+    "\n##### ",
+    "\n###### ",
+    "```\n\n",
+    "\n\n***\n\n",
+    "\n\n---\n\n",
+    "\n\n___\n\n",
+    "\n\n",
+    "\n",
+    " ",
+    "",
+)
+
+## the separators used to split blocks that are larger than a chunk
+TEXT_SEPARATORS = ("\n", ". ", " ", "")
+CODE_SEPARATORS = ("\n", " ", "")
+
+_HEADING_PATTERN = re.compile(r"#{1,6}(?:\s|$)")
+_FENCE_PATTERN = re.compile(r"(`{3,}|~{3,})")
+
+################################################################
+
+
+class _Block(object):
+    __slots__ = ("text", "gap", "kind")
+
+    def __init__(self, text, gap, kind):
+        self.text = text
+        self.gap = gap
+        self.kind = kind
+
+
+class MarkdownChunker(object):
+    """Splits markdown text into chunks of at most ``chunk_size`` characters
+    or tokens.
+
+    By default, the text is split exactly like LangChain's
+    ``MarkdownTextSplitter``: it is recursively split on headings, the ends
+    of code blocks, horizontal rules, paragraphs, lines, words and finally
+    characters, and the pieces are merged back into chunks whose consecutive
+    chunks overlap by up to ``chunk_overlap``.
+
+    If ``compat=False``, the text is instead split into blocks: fenced code
+    blocks, headings, and paragraphs. Blocks are packed into chunks whole,
+    headings are kept with the content that follows them, and consecutive
+    chunks overlap by the trailing blocks of the previous chunk that fit in
+    ``chunk_overlap``. Blocks that are larger than a chunk are split
+    recursively, and each piece of a code block is wrapped in its fences.
+
+    Args:
+        chunk_size (1000): the maximum size of a chunk
+        chunk_overlap (200): the maximum overlap between consecutive chunks
+        unit ("chars"): the unit of ``chunk_size`` and ``chunk_overlap``.
+            Supported values are ``("chars", "tokens")``
+        compat (True): whether to reproduce LangChain's
+            ``MarkdownTextSplitter``
+    """
+
+    def __init__(
+        self, chunk_size=1000, chunk_overlap=200, unit="chars", compat=True
+    ):
+        if unit not in CHUNK_UNITS:
+            raise ValueError(
+                f"Invalid chunk unit '{unit}'. Supported values are "
+                f"{CHUNK_UNITS}"
+            )
+
+        if chunk_size < 2:
+            raise ValueError(f"Invalid chunk size {chunk_size}")
+
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError(
+                f"Chunk overlap {chunk_overlap} must be nonnegative and "
+                f"smaller than the chunk size {chunk_size}"
+            )
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.unit = unit
+        self.compat = compat
+
+        if unit == "tokens":
+            self._length = estimate_num_tokens
+        else:
+            self._length = len
+
+    @property
+    def config(self):
+        """A dict describing the chunks that this instance produces."""
+        return {
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            "unit": self.unit,
+            "compat": self.compat,
+        }
+
+    def split_text(self, text):
+        """Splits the given markdown text into chunks.
+
+        Args:
+            text: a markdown string
+
+        Returns:
+            a list of chunk strings
+        """
+        if self.compat:
+            return self._split_recursive(text, COMPAT_SEPARATORS)
+
+        return self._split_markdown(text)
+
+    def _split_recursive(
+        self, text, separators, chunk_size=None, chunk_overlap=None, strip=True
+    ):
+        if chunk_size is None:
+            chunk_size = self.chunk_size
+
+        if chunk_overlap is None:
+            chunk_overlap = self.chunk_overlap
+
+        separator = separators[-1]
+        for _separator in separators:
+            if not _separator or _separator in text:
+                separator = _separator
+                break
+
+        if separator:
+            splits = text.split(separator)
+        else:
+            splits = list(text)
+
+        chunks = []
+        good_splits = []
+        for split in splits:
+            if self._length(split) < chunk_size:
+                good_splits.append(split)
+                continue
+
+            if good_splits:
+                chunks.extend(
+                    self._merge_splits(
+                        good_splits,
+                        separator,
+                        chunk_size,
+                        chunk_overlap,
+                        strip,
+                    )
+                )
+                good_splits = []
+
+            if separator:
+                chunks.extend(
+                    self._split_recursive(
+                        split,
+                        separators,
+                        chunk_size=chunk_size,
+                        chunk_overlap=chunk_overlap,
+                        strip=strip,
+                    )
+                )
+            else:
+                ## a single character that is larger than a chunk
+                chunks.append(split)
+
+        if good_splits:
+            chunks.extend(
+                self._merge_splits(
+                    good_splits, separator, chunk_size, chunk_overlap, strip
+                )
+            )
+
+        return chunks
+
+    def _merge_splits(
+        self, splits, separator, chunk_size, chunk_overlap, strip
+    ):
+        separator_len = self._length(separator)
+
+        chunks = []
+        current = deque()
+        total = 0
+        for split in splits:
+            split_len = self._length(split)
+            if (
+                total + split_len + (separator_len if current else 0)
+                > chunk_size
+            ):
+                if current:
+                    self._append_chunk(chunks, separator.join(current), strip)
+
+                    ## drop pieces until what is left fits in the overlap and
+                    ## leaves room for the next piece
+                    while total > chunk_overlap or (
+                        total + split_len + (separator_len if current else 0)
+                        > chunk_size
+                        and total > 0
+                    ):
+                        total -= self._length(current[0]) + (
+                            separator_len if len(current) > 1 else 0
+                        )
+                        current.popleft()
+
+            current.append(split)
+            total += split_len + (separator_len if len(current) > 1 else 0)
+
+        self._append_chunk(chunks, separator.join(current), strip)
+        return chunks
+
+    @staticmethod
+    def _append_chunk(chunks, text, strip):
+        ## leading indentation is significant in code
+        text = text.strip() if strip else text.strip("\n")
+        if text.strip():
+            chunks.append(text)
+
+    def _split_markdown(self, text):
+        chunks = []
+        current = []
+        total = 0
+        for block in _split_blocks(text):
+            block_len = self._length(block.text)
+            if block_len > self.chunk_size:
+                body, headings = _split_trailing_headings(current)
+                if body:
+                    self._append_blocks(chunks, body)
+
+                chunks.extend(self._split_block(block, headings))
+                current = []
+                total = 0
+                continue
+
+            sep_len = self._length("\n" * (block.gap + 1)) if current else 0
+            if current and total + sep_len + block_len > self.chunk_size:
+                ## headings start the next chunk rather than end this one
+                body, headings = _split_trailing_headings(current)
+                while headings and self._get_size(headings + [block]) > (
+                    self.chunk_size
+                ):
+                    body.append(headings.pop(0))
+
+                if body and headings:
+                    self._append_blocks(chunks, body)
+                    current = headings
+                else:
+                    self._append_blocks(chunks, current)
+                    current = self._get_overlap(current)
+                    while current and self._get_size(current + [block]) > (
+                        self.chunk_size
+                    ):
+                        current.pop(0)
+
+                total = self._get_size(current)
+                sep_len = (
+                    self._length("\n" * (block.gap + 1)) if current else 0
+                )
+
+            current.append(block)
+            total += sep_len + block_len
+
+        if current:
+            self._append_blocks(chunks, current)
+
+        return chunks
+
+    def _get_size(self, blocks):
+        size = 0
+        for idx, block in enumerate(blocks):
+            size += self._length(block.text)
+            if idx > 0:
+                size += self._length("\n" * (block.gap + 1))
+
+        return size
+
+    def _get_overlap(self, blocks):
+        ## the overlap never repeats a whole chunk
+        overlap = []
+        size = 0
+        for block in reversed(blocks[1:]):
+            size += self._length(block.text)
+            if overlap:
+                size += self._length("\n" * (overlap[0].gap + 1))
+
+            if size > self.chunk_overlap:
+                break
+
+            overlap.insert(0, block)
+
+        return overlap
+
+    def _append_blocks(self, chunks, blocks):
+        self._append_chunk(chunks, _join_blocks(blocks), True)
+
+    def _split_block(self, block, headings):
+        """Splits a block that is larger than a chunk, and prepends the given
+        headings to its first piece if they fit.
+        """
+        prefix = _join_blocks(headings).strip()
+        chunk_size = self.chunk_size
+        if prefix:
+            chunk_size -= self._length(prefix + "\n\n")
+
+        if prefix and chunk_size < self.chunk_size // 2:
+            ## the headings are too large to share a chunk with the block
+            return [prefix] + self._split_block(block, [])
+
+        pieces = None
+        if block.kind == "code":
+            lines = block.text.split("\n")
+            head = lines[0]
+            closed = len(lines) > 1 and _FENCE_PATTERN.match(lines[-1].strip())
+            if closed:
+                tail = lines[-1]
+                body = "\n".join(lines[1:-1])
+            else:
+                tail = _FENCE_PATTERN.match(head.strip()).group(1)
+                body = "\n".join(lines[1:])
+
+            ## the budget of the code in each piece, between its fences
+            budget = chunk_size - self._length(head + "\n\n" + tail)
+            if budget >= 2:
+                pieces = self._split_recursive(
+                    body,
+                    CODE_SEPARATORS,
+                    chunk_size=budget,
+                    chunk_overlap=min(self.chunk_overlap, budget // 2),
+                    strip=False,
+                )
+                pieces = [f"{head}\n{piece}\n{tail}" for piece in pieces]
+
+        if pieces is None:
+            pieces = self._split_recursive(
+                block.text,
+                TEXT_SEPARATORS,
+                chunk_size=chunk_size,
+                chunk_overlap=min(self.chunk_overlap, chunk_size // 2),
+            )
+
+        if prefix:
+            if pieces:
+                pieces[0] = prefix + "\n\n" + pieces[0]
+            else:
+                pieces = [prefix]
+
+        return pieces
+
+
+def _join_blocks(blocks):
+    parts = []
+    for idx, block in enumerate(blocks):
+        if idx > 0:
+            parts.append("\n" * (block.gap + 1))
+
+        parts.append(block.text)
+
+    return "".join(parts)
+
+
+def _split_trailing_headings(blocks):
+    idx = len(blocks)
+    while idx > 0 and blocks[idx - 1].kind == "heading":
+        idx -= 1
+
+    return blocks[:idx], blocks[idx:]
+
+
+def _split_blocks(text):
+    """Splits markdown text into a list of :class:`_Block` instances, where
+    each block is a fenced code block, a heading, or a paragraph, and its
+    ``gap`` is the number of blank lines that precede it.
+    """
+    blocks = []
+    lines = []
+    kind = None
+    fence = None
+    gap = 0
+    for line in text.split("\n"):
+        stripped = line.strip()
+
+        if fence is not None:
+            lines.append(line)
+            if stripped.startswith(fence) and not stripped.strip(fence[0]):
+                blocks.append(_Block("\n".join(lines), gap, kind))
+                lines = []
+                kind = None
+                fence = None
+                gap = 0
+
+            continue
+
+        match = _FENCE_PATTERN.match(stripped)
+        if match is not None or not stripped:
+            if lines:
+                blocks.append(_Block("\n".join(lines), gap, kind))
+                lines = []
+                kind = None
+                gap = 0
+
+            if match is not None:
+                lines = [line]
+                kind = "code"
+                fence = match.group(1)
+            elif blocks:
+                gap += 1
+
+            continue
+
+        if _HEADING_PATTERN.match(stripped):
+            if lines:
+                blocks.append(_Block("\n".join(lines), gap, kind))
+                gap = 0
+
+            blocks.append(_Block(line, gap, "heading"))
+            lines = []
+            kind = None
+            gap = 0
+            continue
+
+        if not lines:
+            kind = "text"
+
+        lines.append(line)
+
+    if lines:
+        blocks.append(_Block("\n".join(lines), gap, kind))
+
+    return blocks
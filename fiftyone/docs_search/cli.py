@@ -7,11 +7,9 @@ Definition of the `fiftyone-docs-search` command-line interface (CLI).
 
 import argparse
 import argcomplete
+import json
 import os
-
-
-import fiftyone.docs_search.create_index as dsci
-import fiftyone.docs_search.query_index as dsqi
+import sys
 
 ################################################################
 
@@ -49,9 +47,12 @@ class FiftyOneDocsSearchCommand(Command):
     def setup(parser):
         subparsers = parser.add_subparsers(title="available commands")
         _register_command(subparsers, "create", CreateIndexCommand)
+        _register_command(subparsers, "update", UpdateIndexCommand)
         _register_command(subparsers, "save", SaveIndexCommand)
         _register_command(subparsers, "load", LoadIndexCommand)
+        _register_command(subparsers, "convert", ConvertIndexCommand)
         _register_command(subparsers, "query", QueryIndexCommand)
+        _register_command(subparsers, "serve", ServeCommand)
 
     @staticmethod
     def execute(parser, args):
@@ -77,10 +78,75 @@ class CreateIndexCommand(Command):
             help="the name of the Qdrant collection to create",
         )
 
+        parser.add_argument(
+            "-w",
+            "--num_workers",
+            metavar="NUM_WORKERS",
+            default=None,
+            type=int,
+            help="the number of processes to use to parse the docs",
+        )
+
+        parser.add_argument(
+            "-q",
+            "--quantization",
+            metavar="QUANTIZATION",
+            default=None,
+            choices=("none", "scalar", "binary"),
+            help=(
+                "the quantization to apply to the vectors: none (default), "
+                "scalar (int8) or binary"
+            ),
+        )
+
+    @staticmethod
+    def execute(parser, args):
+        import fiftyone.docs_search.create_index as dsci
+
+        os.environ["FIFTYONE_DOCS_COLLECTION"] = str(args.name)
+        dsci.generate_index_from_html_docs(
+            num_workers=args.num_workers, quantization=args.quantization
+        )
+
+
+class UpdateIndexCommand(Command):
+    """Incrementally updates the vector index for the docs.
+
+    Only the chunks of pages that were added or changed since the last
+    `create` or `update` are embedded and upserted, and the points of chunks
+    that no longer exist are deleted.
+
+    Examples::
+
+        fiftyone-docs-search update --name my_name
+
+    """
+
+    @staticmethod
+    def setup(parser):
+        parser.add_argument(
+            "-n",
+            "--name",
+            metavar="COLLECTION_NAME",
+            default="fiftyone_docs",
+            help="the name of the Qdrant collection to update",
+        )
+
+        parser.add_argument(
+            "-w",
+            "--num_workers",
+            metavar="NUM_WORKERS",
+            default=None,
+            type=int,
+            help="the number of processes to use to parse the docs",
+        )
+
     @staticmethod
     def execute(parser, args):
-        os.environ["FIFTYONE_DOCS_COLLECTION"] = str(args.collection_name)
-        dsci.generate_index_from_html_docs()
+        import fiftyone.docs_search.create_index as dsci
+
+        os.environ["FIFTYONE_DOCS_COLLECTION"] = str(args.name)
+        dsci.update_index_from_html_docs(num_workers=args.num_workers)
 
 
 class SaveIndexCommand(Command):
@@ -90,6 +156,12 @@ class SaveIndexCommand(Command):
 
         fiftyone-docs-search save -o my_index.json -b 100
 
+        # Save one JSON record per line
+        fiftyone-docs-search save -o my_index.jsonl -f jsonl
+
+        # Save a memory-mappable binary index with float16 vectors
+        fiftyone-docs-search save -o my_index -f binary --dtype float16
+
     """
 
     @staticmethod
@@ -97,33 +169,152 @@ class SaveIndexCommand(Command):
         parser.add_argument(
             "-o",
             "--out_path",
-            metavar="INDEX_JSON",
+            metavar="INDEX_PATH",
             default="fiftyone_docs_index.json",
-            help="the name of the JSON file to save the index to",
+            help="the file or binary index directory to save the index to",
         )
 
         parser.add_argument(
             "-b",
             "--batch_size",
             metavar="BATCH_SIZE",
-            default=50,
+            default=256,
+            type=int,
             help="the pagination size for retrieving vectors from Qdrant index",
         )
 
+        parser.add_argument(
+            "-f",
+            "--format",
+            metavar="FORMAT",
+            default="json",
+            choices=("json", "jsonl", "binary"),
+            help="the format of the saved index: json, jsonl or binary",
+        )
+
+        parser.add_argument(
+            "--dtype",
+            metavar="DTYPE",
+            default="float32",
+            choices=("float32", "float16"),
+            help="the dtype of the vectors of a binary index",
+        )
+
+        parser.add_argument(
+            "-p",
+            "--prefetch",
+            metavar="PREFETCH",
+            default=True,
+            type=str2bool,
+            help=(
+                "whether to retrieve the next page while writing the current "
+                "one"
+            ),
+        )
+
     @staticmethod
     def execute(parser, args):
-        dsci.save_index_to_json(
-            docs_index_file=args.out_path, batch_size=args.batch_size
+        import fiftyone.docs_search.create_index as dsci
+
+        dsci.save_index(
+            docs_index_path=args.out_path,
+            format=args.format,
+            batch_size=args.batch_size,
+            dtype=args.dtype,
+            prefetch=args.prefetch,
         )
 
 
 class LoadIndexCommand(Command):
-    """Loads the vector index for the docs from JSON.
+    """Loads the vector index for the docs from a JSON or binary index.
 
     Examples::
 
+        fiftyone-docs-search load
+
         fiftyone-docs-search load -i my_index.json
 
+        fiftyone-docs-search load -i my_binary_index
+
+    """
+
+    @staticmethod
+    def setup(parser):
+        parser.add_argument(
+            "-i",
+            "--in_path",
+            metavar="INDEX_PATH",
+            default=None,
+            help=(
+                "the JSON/JSONL file or binary index directory to load from. "
+                "By default, the downloaded index in "
+                "~/.fiftyone_docs_search is loaded"
+            ),
+        )
+
+        parser.add_argument(
+            "-b",
+            "--batch_size",
+            metavar="BATCH_SIZE",
+            default=500,
+            type=int,
+            help="the number of points to upload per request",
+        )
+
+        parser.add_argument(
+            "-w",
+            "--num_workers",
+            metavar="NUM_WORKERS",
+            default=None,
+            type=int,
+            help="the number of threads to use to upload points",
+        )
+
+        parser.add_argument(
+            "-d",
+            "--defer_indexing",
+            metavar="DEFER_INDEXING",
+            default=True,
+            type=str2bool,
+            help=(
+                "whether to defer building the HNSW index until all points "
+                "are uploaded"
+            ),
+        )
+
+        parser.add_argument(
+            "-q",
+            "--quantization",
+            metavar="QUANTIZATION",
+            default=None,
+            choices=("none", "scalar", "binary"),
+            help=(
+                "the quantization to apply to the vectors: none (default), "
+                "scalar (int8) or binary"
+            ),
+        )
+
+    # pylint: disable=unexpected-keyword-arg
+    @staticmethod
+    def execute(parser, args):
+        import fiftyone.docs_search.create_index as dsci
+
+        dsci.load_index(
+            docs_index_path=args.in_path,
+            batch_size=args.batch_size,
+            num_workers=args.num_workers,
+            defer_indexing=args.defer_indexing,
+            quantization=args.quantization,
+        )
+
+
+class ConvertIndexCommand(Command):
+    """Converts a JSON or JSONL index for the docs to the binary format.
+
+    Examples::
+
+        fiftyone-docs-search convert -i my_index.json -o my_index
+
     """
 
     @staticmethod
@@ -133,13 +324,30 @@ class LoadIndexCommand(Command):
             "--in_path",
             metavar="INDEX_JSON",
             default="fiftyone_docs_index.json",
-            help="the name of the JSON file to load the index from",
+            help="the JSON or JSONL file to convert",
+        )
+
+        parser.add_argument(
+            "-o",
+            "--out_path",
+            metavar="INDEX_DIR",
+            default="fiftyone_docs_index",
+            help="the directory to write the binary index to",
+        )
+
+        parser.add_argument(
+            "--dtype",
+            metavar="DTYPE",
+            default="float32",
+            choices=("float32", "float16"),
+            help="the dtype of the vectors of the binary index",
         )
 
-    # pylint: disable=unexpected-keyword-arg
     @staticmethod
     def execute(parser, args):
-        dsci.load_index_from_json(docs_index_file=args.in_path)
+        import fiftyone.docs_search.create_index as dsci
+
+        dsci.convert_index(args.in_path, args.out_path, dtype=args.dtype)
 
 
 def str2bool(v):
@@ -160,6 +368,15 @@ class QueryIndexCommand(Command):
 
         fiftyone-docs-search query "How do I load a dataset in FiftyOne?" -n 10
 
+        # Search for an identifier offline, without embedding the query
+        fiftyone-docs-search query compute_embeddings --mode lexical
+
+        # Run one query per line of a file and write JSONL results
+        fiftyone-docs-search query --batch queries.txt > results.jsonl
+
+        # Read the queries from stdin
+        cat queries.txt | fiftyone-docs-search query --batch -
+
     """
 
     @staticmethod
@@ -177,6 +394,7 @@ class QueryIndexCommand(Command):
             "--num_results",
             metavar="NUM_RESULTS",
             default=10,
+            type=int,
             help="the number of results to return",
         )
 
@@ -206,14 +424,174 @@ class QueryIndexCommand(Command):
             help="the types of docs to search through",
         )
 
+        parser.add_argument(
+            "-b",
+            "--backend",
+            metavar="BACKEND",
+            default=None,
+            choices=("qdrant", "numpy"),
+            help=(
+                "the search backend to use: qdrant (default) or numpy, which "
+                "searches a local binary index without a Qdrant server"
+            ),
+        )
+
+        parser.add_argument(
+            "-m",
+            "--mode",
+            metavar="MODE",
+            default=None,
+            choices=("vector", "lexical", "hybrid"),
+            help=(
+                "the search mode: vector (default), lexical, which searches a "
+                "local BM25 index without embedding the query, or hybrid, "
+                "which fuses the two"
+            ),
+        )
+
+        parser.add_argument(
+            "-r",
+            "--rescore",
+            metavar="RESCORE",
+            default=True,
+            type=str2bool,
+            help=(
+                "whether to rescore quantized results with the full precision "
+                "vectors"
+            ),
+        )
+
+        parser.add_argument(
+            "--oversampling",
+            metavar="OVERSAMPLING",
+            default=None,
+            type=float,
+            help=(
+                "the factor by which to oversample quantized results before "
+                "rescoring"
+            ),
+        )
+
+        parser.add_argument(
+            "--batch",
+            metavar="QUERIES_PATH",
+            default=None,
+            help=(
+                "a file containing one query per line, or '-' to read from "
+                "stdin. Results are written to stdout as JSON lines"
+            ),
+        )
+
     @staticmethod
     def execute(parser, args):
+        import fiftyone.docs_search.query_index as dsqi
+
+        if args.batch is not None:
+            _query_batch(args)
+            return
+
         dsqi.fiftyone_docs_search(
             args.query,
             top_k=args.num_results,
             open_url=args.open_url,
             score=args.score,
             doc_types=args.doc_types,
+            backend=args.backend,
+            rescore=args.rescore,
+            oversampling=args.oversampling,
+            mode=args.mode,
+        )
+
+
+def _query_batch(args):
+    import fiftyone.docs_search.server as dss
+
+    if args.batch == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(args.batch, "r") as f:
+            lines = f.read().splitlines()
+
+    queries = [line.strip() for line in lines if line.strip()]
+
+    batch_results = dss.query_batch(
+        queries,
+        top_k=args.num_results,
+        doc_types=args.doc_types,
+        backend=args.backend,
+        rescore=args.rescore,
+        oversampling=args.oversampling,
+        mode=args.mode,
+    )
+
+    for query, results in zip(queries, batch_results):
+        record = {
+            "query": query,
+            "results": [
+                {"url": url, "text": text, "score": score}
+                for url, text, score in results
+            ],
+        }
+        sys.stdout.write(json.dumps(record) + "\n")
+
+
+class ServeCommand(Command):
+    """Runs a local query server that keeps the search stack warm.
+
+    While the server is running, the `query` command and `FiftyOneDocsSearch`
+    send their searches to it rather than searching in-process. Set
+    `FIFTYONE_DOCS_SERVER=false` to disable this.
+
+    Examples::
+
+        fiftyone-docs-search serve
+
+        fiftyone-docs-search serve --port 5252 --backend numpy
+
+    """
+
+    @staticmethod
+    def setup(parser):
+        parser.add_argument(
+            "--host",
+            metavar="HOST",
+            default=None,
+            help="the host to bind to (default: 127.0.0.1)",
+        )
+
+        parser.add_argument(
+            "-p",
+            "--port",
+            metavar="PORT",
+            default=None,
+            type=int,
+            help="the port to bind to (default: 5252)",
+        )
+
+        parser.add_argument(
+            "-b",
+            "--backend",
+            metavar="BACKEND",
+            default=None,
+            choices=("qdrant", "numpy"),
+            help="the search backend used by requests that don't specify one",
+        )
+
+        parser.add_argument(
+            "--verbose",
+            action="store_true",
+            help="whether to log each request",
+        )
+
+    @staticmethod
+    def execute(parser, args):
+        import fiftyone.docs_search.server as dss
+
+        dss.serve(
+            host=args.host,
+            port=args.port,
+            backend=args.backend,
+            verbose=args.verbose,
         )
 
 
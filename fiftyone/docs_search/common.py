@@ -5,10 +5,15 @@ Common function declarations.
 |
 """
 
-import openai
+import hashlib
+import json
 import os
-import qdrant_client as qc
-import qdrant_client.http.models as models
+import time
+
+import fiftyone.core.utils as fou
+
+qc = fou.lazy_import("qdrant_client")
+models = fou.lazy_import("qdrant_client.http.models")
 
 DOC_TYPES = (
     "cheat_sheets",
@@ -31,18 +36,105 @@ BLOCK_TYPES = (
 
 MODEL = "text-embedding-ada-002"
 
-CLIENT = qc.QdrantClient(url="localhost")
-METRIC = models.Distance.DOT
+## per-request budgets for batched embedding calls
+EMBEDDING_BATCH_SIZE = 256
+EMBEDDING_BATCH_TOKENS = 64000
+
+## the number of chunks that are embedded at a time when streaming a JSON
+## index to disk, which bounds memory while leaving enough chunks to pack
+## full requests
+EMBEDDING_WINDOW_SIZE = 4096
+
+## concurrency and rate limits of the embedding client
+EMBEDDING_MAX_CONCURRENCY = 8
+EMBEDDING_REQUESTS_PER_MINUTE = 3000
+EMBEDDING_TOKENS_PER_MINUTE = 1000000
+
+## the embedders that can build and search the index. The local `hashing`
+## embedder needs no API, and its dimension can be configured
+EMBEDDERS = ("openai", "hashing")
+DEFAULT_EMBEDDER = "openai"
+HASHING_DIMENSION = 512
+
+QDRANT_URL = "localhost"
+METRIC = "Dot"
 DIMENSION = 1536
 
+## vector quantization of the collection, and the factor by which the number
+## of quantized candidates is oversampled before they are rescored
+QUANTIZATION_TYPES = ("none", "scalar", "binary")
+DEFAULT_QUANTIZATION = "none"
+DEFAULT_OVERSAMPLING = 2.0
+
+## the search modes of `query_index()`. Hybrid searches fuse the vector and
+## lexical results with reciprocal rank fusion, using the given constant and
+## number of candidates per mode
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+DEFAULT_SEARCH_MODE = "vector"
+RRF_K = 60
+HYBRID_NUM_CANDIDATES = 50
+
+## Qdrant's default indexing threshold, in KB, which is restored after a bulk
+## load that deferred HNSW indexing
+INDEXING_THRESHOLD = 20000
+
+## the number of points and approximate number of bytes that are buffered
+## across pages before they are upserted when building an index
+UPSERT_BUFFER_POINTS = 1024
+UPSERT_BUFFER_BYTES = 32 * 1024**2
+
+## the number of threads used to upload batches when bulk loading an index
+BULK_LOAD_NUM_WORKERS = 4
+
+## how docs sections are split into chunks. The `compat` chunking reproduces
+## LangChain's `MarkdownTextSplitter`, which the published index was built with
+CHUNKING_TYPES = ("compat", "markdown")
+DEFAULT_CHUNKING = "compat"
+CHUNK_UNITS = ("chars", "tokens")
+DEFAULT_CHUNK_UNIT = "chars"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
 DEFAULT_COLLECTION_NAME = "fiftyone_docs"
 
+## how long cached collection states are trusted, in seconds
+COLLECTION_STATE_TTL = 300
+
+## the address of the local query server started by `fiftyone-docs-search
+## serve`, and how long clients wait for it before searching in-process
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 5252
+SERVER_CONNECT_TIMEOUT = 0.05
+
 HOME = os.path.expanduser("~")
 FIFTYONE_DOCS_INDEX_FOLDER = os.path.join(HOME, ".fiftyone_docs_search")
 FIFTYONE_DOCS_INDEX_FILENAME = "fiftyone_docs_index.json"
 FIFTYONE_DOCS_INDEX_FILEPATH = os.path.join(
     FIFTYONE_DOCS_INDEX_FOLDER, FIFTYONE_DOCS_INDEX_FILENAME
 )
+FIFTYONE_DOCS_BINARY_INDEX_DIRNAME = "fiftyone_docs_index"
+FIFTYONE_DOCS_BINARY_INDEX_PATH = os.path.join(
+    FIFTYONE_DOCS_INDEX_FOLDER, FIFTYONE_DOCS_BINARY_INDEX_DIRNAME
+)
+
+FIFTYONE_DOCS_EMBEDDING_CACHE_FILENAME = "embedding_cache.sqlite"
+FIFTYONE_DOCS_EMBEDDING_CACHE_FILEPATH = os.path.join(
+    FIFTYONE_DOCS_INDEX_FOLDER, FIFTYONE_DOCS_EMBEDDING_CACHE_FILENAME
+)
+EMBEDDING_CACHE_MAX_SIZE = 1024**3
+
+FIFTYONE_DOCS_PARSE_CACHE_FILENAME = "parse_cache.sqlite"
+FIFTYONE_DOCS_PARSE_CACHE_FILEPATH = os.path.join(
+    FIFTYONE_DOCS_INDEX_FOLDER, FIFTYONE_DOCS_PARSE_CACHE_FILENAME
+)
+PARSE_CACHE_MAX_SIZE = 256 * 1024**2
+
+## the registry of the embedder ID and dimension of each collection, since
+## Qdrant collections have no metadata of their own
+FIFTYONE_DOCS_COLLECTIONS_FILENAME = "collections.json"
+FIFTYONE_DOCS_COLLECTIONS_FILEPATH = os.path.join(
+    FIFTYONE_DOCS_INDEX_FOLDER, FIFTYONE_DOCS_COLLECTIONS_FILENAME
+)
 
 BASE_DOCS_URL = "https://docs.voxel51.com/"
 
@@ -56,13 +148,427 @@ def get_collection_name():
     return collection_name
 
 
+def get_quantization():
+    quantization = os.getenv("FIFTYONE_DOCS_QUANTIZATION")
+    if quantization is None or quantization == "None":
+        quantization = DEFAULT_QUANTIZATION
+    return quantization
+
+
+def get_embedder_name():
+    embedder = os.getenv("FIFTYONE_DOCS_EMBEDDER")
+    if embedder is None or embedder == "None":
+        embedder = DEFAULT_EMBEDDER
+    return embedder
+
+
+def get_search_mode():
+    mode = os.getenv("FIFTYONE_DOCS_SEARCH_MODE")
+    if mode is None or mode == "None":
+        mode = DEFAULT_SEARCH_MODE
+    return mode
+
+
+def get_chunking():
+    chunking = os.getenv("FIFTYONE_DOCS_CHUNKING")
+    if chunking is None or chunking == "None":
+        chunking = DEFAULT_CHUNKING
+    return chunking
+
+
+def get_chunk_unit():
+    unit = os.getenv("FIFTYONE_DOCS_CHUNK_UNIT")
+    if unit is None or unit == "None":
+        unit = DEFAULT_CHUNK_UNIT
+    return unit
+
+
+def get_chunk_size():
+    return _get_env_int("FIFTYONE_DOCS_CHUNK_SIZE", CHUNK_SIZE)
+
+
+def get_chunk_overlap():
+    return _get_env_int("FIFTYONE_DOCS_CHUNK_OVERLAP", CHUNK_OVERLAP)
+
+
+_CLIENT = None
+
+
+def get_client():
+    """Returns the Qdrant client, which is created on first use."""
+    global _CLIENT
+
+    if _CLIENT is None:
+        _CLIENT = qc.QdrantClient(url=QDRANT_URL)
+
+    return _CLIENT
+
+
+def __getattr__(name):
+    ## `CLIENT` is created lazily so that importing this module doesn't
+    ## connect to Qdrant
+    if name == "CLIENT":
+        return get_client()
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_COLLECTION_STATES = {}
+_COLLECTION_METADATA = {}
+
+
+def _get_collection_info(collection_name):
+    from qdrant_client.http.exceptions import UnexpectedResponse
+
+    try:
+        return get_client().get_collection(collection_name=collection_name)
+    except UnexpectedResponse as e:
+        if e.status_code == 404:
+            return None
+        raise
+    except ValueError:
+        ## local-mode clients raise `ValueError` for missing collections
+        return None
+
+
+def get_collection_state(collection_name, refresh=False):
+    """Returns the cached state of the given collection, fetching it from
+    Qdrant if it is missing, older than ``COLLECTION_STATE_TTL`` seconds, or
+    ``refresh`` is True.
+
+    The state is a dict with the following keys:
+
+    -   ``exists``: whether the collection exists
+    -   ``points_count``: the number of points in the collection
+    -   ``config_version``: a hash of the collection's config, which changes
+        whenever the collection is reconfigured
+    -   ``checked_at``: the ``time.monotonic()`` at which the state was
+        fetched
+    """
+    state = _COLLECTION_STATES.get(collection_name, None)
+    if (
+        not refresh
+        and state is not None
+        and time.monotonic() - state["checked_at"] < COLLECTION_STATE_TTL
+    ):
+        return state
+
+    info = _get_collection_info(collection_name)
+    if info is not None:
+        state = {
+            "exists": True,
+            "points_count": info.points_count,
+            "config_version": hashlib.md5(
+                repr(info.config).encode("utf-8")
+            ).hexdigest(),
+        }
+    else:
+        state = {"exists": False, "points_count": 0, "config_version": None}
+
+    state["checked_at"] = time.monotonic()
+    _COLLECTION_STATES[collection_name] = state
+    return state
+
+
+def load_collection_metadata(collection_name):
+    """Returns the registered metadata of the given collection, or ``None``
+    if it has none.
+
+    The metadata is a dict with the following keys:
+
+    -   ``embedder``: the ID of the embedder that built the collection
+    -   ``dimension``: the dimension of the collection's vectors
+
+    Like collection states, the metadata is cached for
+    ``COLLECTION_STATE_TTL`` seconds.
+    """
+    cached = _COLLECTION_METADATA.get(collection_name, None)
+    if (
+        cached is not None
+        and time.monotonic() - cached["checked_at"] < COLLECTION_STATE_TTL
+    ):
+        return cached["metadata"]
+
+    metadata = None
+    if os.path.exists(FIFTYONE_DOCS_COLLECTIONS_FILEPATH):
+        with open(FIFTYONE_DOCS_COLLECTIONS_FILEPATH, "r") as f:
+            metadata = json.load(f).get(collection_name, None)
+
+    _COLLECTION_METADATA[collection_name] = {
+        "metadata": metadata,
+        "checked_at": time.monotonic(),
+    }
+    return metadata
+
+
+def save_collection_metadata(collection_name, metadata):
+    """Registers the metadata of the given collection. See
+    :func:`load_collection_metadata` for details.
+    """
+    if os.path.exists(FIFTYONE_DOCS_COLLECTIONS_FILEPATH):
+        with open(FIFTYONE_DOCS_COLLECTIONS_FILEPATH, "r") as f:
+            registry = json.load(f)
+    else:
+        os.makedirs(FIFTYONE_DOCS_INDEX_FOLDER, exist_ok=True)
+        registry = {}
+
+    registry[collection_name] = metadata
+
+    tmp_path = FIFTYONE_DOCS_COLLECTIONS_FILEPATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(registry, f, indent=4)
+    os.replace(tmp_path, FIFTYONE_DOCS_COLLECTIONS_FILEPATH)
+
+    _COLLECTION_METADATA.pop(collection_name, None)
+
+
+def validate_collection_embedder(collection_name):
+    """Raises a ``ValueError`` if the given collection was built with a
+    different embedder than the current one.
+
+    Collections without metadata predate embedders, and were built with the
+    default OpenAI embedder.
+    """
+    embedder = get_embedder()
+
+    metadata = load_collection_metadata(collection_name)
+    if metadata is not None:
+        collection_embedder = metadata["embedder"]
+    else:
+        collection_embedder = MODEL
+
+    if collection_embedder != embedder.id:
+        raise ValueError(
+            f"Collection {collection_name} was built with embedder "
+            f"'{collection_embedder}', but the current embedder is "
+            f"'{embedder.id}'. Set `FIFTYONE_DOCS_EMBEDDER` to match, or "
+            "rebuild the index"
+        )
+
+
+def validate_binary_index_embedder(index):
+    """Raises a ``ValueError`` if the given
+    :class:`fiftyone.docs_search.binary_index.BinaryIndex` was built with a
+    different embedder than the current one.
+    """
+    embedder = get_embedder()
+    if index.model != embedder.id or index.dimension != embedder.dimension:
+        raise ValueError(
+            f"Binary index '{index.path}' was built with embedder "
+            f"'{index.model}' ({index.dimension} dimensions), but the current "
+            f"embedder is '{embedder.id}' ({embedder.dimension} dimensions). "
+            "Set `FIFTYONE_DOCS_EMBEDDER` to match, or rebuild the index"
+        )
+
+
+def invalidate_collection_state(collection_name=None):
+    """Discards the cached state and metadata of the given collection, or of
+    all collections if no name is provided.
+    """
+    if collection_name is None:
+        _COLLECTION_STATES.clear()
+        _COLLECTION_METADATA.clear()
+    else:
+        _COLLECTION_STATES.pop(collection_name, None)
+        _COLLECTION_METADATA.pop(collection_name, None)
+
+
+def collection_exists(collection_name):
+    return get_collection_state(collection_name)["exists"]
+
+
+################################################################
+
+
+_EMBEDDING_CACHE = None
+
+
+def use_embedding_cache():
+    use_cache = os.getenv("FIFTYONE_DOCS_EMBEDDING_CACHE", "true")
+    return use_cache.lower() not in ("false", "f", "no", "n", "0")
+
+
+def get_embedding_cache():
+    global _EMBEDDING_CACHE
+
+    if not use_embedding_cache():
+        return None
+
+    if _EMBEDDING_CACHE is None:
+        from fiftyone.docs_search.cache import EmbeddingCache
+
+        _EMBEDDING_CACHE = EmbeddingCache(
+            FIFTYONE_DOCS_EMBEDDING_CACHE_FILEPATH,
+            EMBEDDING_CACHE_MAX_SIZE,
+        )
+
+    return _EMBEDDING_CACHE
+
+
+def print_embedding_cache_stats():
+    cache = get_embedding_cache()
+    if cache is None:
+        return
+
+    stats = cache.stats()
+    print(
+        f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses, "
+        f"{stats['entries']} entries ({stats['size'] / 1024**2:.1f} MB)"
+    )
+
+
+_PARSE_CACHE = None
+
+
+def use_parse_cache():
+    use_cache = os.getenv("FIFTYONE_DOCS_PARSE_CACHE", "true")
+    return use_cache.lower() not in ("false", "f", "no", "n", "0")
+
+
+def get_parse_cache():
+    global _PARSE_CACHE
+
+    if not use_parse_cache():
+        return None
+
+    if _PARSE_CACHE is None:
+        from fiftyone.docs_search.cache import ParseCache
+        from fiftyone.docs_search.read_docs import get_parse_version
+
+        _PARSE_CACHE = ParseCache(
+            FIFTYONE_DOCS_PARSE_CACHE_FILEPATH,
+            PARSE_CACHE_MAX_SIZE,
+            get_parse_version(),
+        )
+
+    return _PARSE_CACHE
+
+
+def print_parse_cache_stats():
+    cache = get_parse_cache()
+    if cache is None:
+        return
+
+    stats = cache.stats()
+    print(
+        f"Parse cache: {stats['hits']} hits, {stats['misses']} misses, "
+        f"{stats['entries']} entries ({stats['size'] / 1024**2:.1f} MB)"
+    )
+
+
+_EMBEDDING_CLIENT = None
+_EMBEDDER = None
+
+
+def use_server():
+    use = os.getenv("FIFTYONE_DOCS_SERVER", "true")
+    return use.lower() not in ("false", "f", "no", "n", "0")
+
+
+def get_server_port():
+    return _get_env_int("FIFTYONE_DOCS_SERVER_PORT", SERVER_PORT)
+
+
+def _get_env_int(name, default):
+    value = os.getenv(name)
+    if value is None or value == "None":
+        return default
+    return int(value)
+
+
+def get_embedding_client():
+    global _EMBEDDING_CLIENT
+
+    if _EMBEDDING_CLIENT is None:
+        from fiftyone.docs_search.embedding_client import (
+            AsyncEmbeddingClient,
+        )
+
+        _EMBEDDING_CLIENT = AsyncEmbeddingClient(
+            MODEL,
+            max_concurrency=_get_env_int(
+                "FIFTYONE_DOCS_EMBEDDING_CONCURRENCY",
+                EMBEDDING_MAX_CONCURRENCY,
+            ),
+            requests_per_minute=_get_env_int(
+                "FIFTYONE_DOCS_EMBEDDING_RPM", EMBEDDING_REQUESTS_PER_MINUTE
+            ),
+            tokens_per_minute=_get_env_int(
+                "FIFTYONE_DOCS_EMBEDDING_TPM", EMBEDDING_TOKENS_PER_MINUTE
+            ),
+            token_counter=estimate_num_tokens,
+        )
+
+    return _EMBEDDING_CLIENT
+
+
+def get_embedder():
+    """Returns the embedder selected by the ``FIFTYONE_DOCS_EMBEDDER``
+    environment variable, which is created on first use.
+    """
+    global _EMBEDDER
+
+    if _EMBEDDER is None:
+        from fiftyone.docs_search.embedders import make_embedder
+
+        _EMBEDDER = make_embedder(
+            get_embedder_name(),
+            dimension=_get_env_int(
+                "FIFTYONE_DOCS_HASHING_DIMENSION", HASHING_DIMENSION
+            ),
+        )
+
+    return _EMBEDDER
+
+
 ################################################################
 
 
 def embed_text(text):
-    response = openai.Embedding.create(input=text, model=MODEL)
-    embeddings = response["data"][0]["embedding"]
-    return embeddings
+    return embed_texts([text])[0]
+
+
+def estimate_num_tokens(text):
+    ## conservative estimate: ada-002 averages ~4 characters per token on
+    ## prose, but code and markup tokenize less efficiently
+    return len(text) // 3 + 1
+
+
+def batch_texts(texts, batch_size=None, max_tokens=None):
+    """Packs the given texts into batches that respect both the per-request
+    item and token budgets. Yields lists of indices into ``texts``.
+    """
+    if batch_size is None:
+        batch_size = EMBEDDING_BATCH_SIZE
+    if max_tokens is None:
+        max_tokens = EMBEDDING_BATCH_TOKENS
+
+    batch = []
+    num_tokens = 0
+    for i, text in enumerate(texts):
+        text_tokens = estimate_num_tokens(text)
+        if batch and (
+            len(batch) >= batch_size or num_tokens + text_tokens > max_tokens
+        ):
+            yield batch
+            batch = []
+            num_tokens = 0
+        batch.append(i)
+        num_tokens += text_tokens
+
+    if batch:
+        yield batch
+
+
+def embed_texts(texts, batch_size=None, max_tokens=None):
+    """Embeds a list of texts with the current embedder. Returns embeddings
+    in the same order as ``texts``.
+
+    See :func:`get_embedder` for details.
+    """
+    return get_embedder().embed_texts(
+        texts, batch_size=batch_size, max_tokens=max_tokens
+    )
 
 
 ################################################################
@@ -4,25 +4,84 @@ Index creating and loading function declarations.
 | `voxel51.com <https://voxel51.com/>`_
 |
 """
-from google.cloud import storage
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import itertools
 import json
 import os
-import qdrant_client.http.models as models
-import shutil
+import time
 from tqdm import tqdm
 import uuid
 
+import fiftyone.core.utils as fou
+
+from fiftyone.docs_search.binary_index import (
+    BinaryIndexWriter,
+    convert_json_index_to_binary,
+    is_binary_index,
+    load_binary_index,
+)
 from fiftyone.docs_search.common import *
+from fiftyone.docs_search.json_index import (
+    JSONIndexWriter,
+    JSONLIndexWriter,
+    iter_index_records,
+)
+from fiftyone.docs_search.lexical_index import (
+    LexicalIndexBuilder,
+    get_lexical_index_path,
+    normalize_point_id,
+)
 from fiftyone.docs_search.read_docs import (
     get_docs_list,
     get_markdown_documents,
+    iter_markdown_documents,
 )
 
+storage = fou.lazy_import("google.cloud.storage")
+
 ################################################################
 
 
-def generate_id():
-    return str(uuid.uuid1().int)[:32]
+## namespace for the deterministic point IDs generated by `generate_point_id`
+POINT_ID_NAMESPACE = uuid.UUID("0f9c8a4e-5d1b-4c36-9e57-3f2a6b8d1c40")
+
+
+def hash_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def hash_file(filepath):
+    with open(filepath, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def generate_point_id(page_url, section_anchor, chunk_index, text):
+    key = f"{page_url}#{section_anchor}|{chunk_index}|{hash_text(text)}"
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, key))
+
+
+def generate_payload_ids(payloads):
+    """Generates a deterministic point ID for each payload. Payloads must be
+    in page order so that chunk indices can be recovered per section.
+    """
+    chunk_indices = {}
+    ids = []
+    for payload in payloads:
+        key = (payload["url"], payload["section_anchor"])
+        chunk_index = chunk_indices.get(key, 0)
+        chunk_indices[key] = chunk_index + 1
+        ids.append(
+            generate_point_id(
+                payload["url"],
+                payload["section_anchor"],
+                chunk_index,
+                payload["text"],
+            )
+        )
+
+    return ids
 
 
 def get_page_url(filepath):
@@ -39,218 +98,1048 @@ def get_doc_type(doc_path):
 ################################################################
 
 
-def initialize_index():
+def get_quantization_config(quantization=None):
+    """Returns the Qdrant quantization config for the given quantization
+    type, or ``None`` if the vectors should not be quantized.
+
+    Args:
+        quantization (None): the quantization type. Supported values are
+            ``("none", "scalar", "binary")``. By default, the
+            ``FIFTYONE_DOCS_QUANTIZATION`` environment variable is used, or
+            ``"none"`` if it is not set
+    """
+    if quantization is None:
+        quantization = get_quantization()
+
+    if quantization == "none":
+        return None
+
+    if quantization == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=True,
+            )
+        )
+
+    if quantization == "binary":
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True)
+        )
+
+    raise ValueError(
+        f"Unsupported quantization '{quantization}'. Supported values are "
+        f"{QUANTIZATION_TYPES}"
+    )
+
+
+def initialize_index(defer_indexing=False, quantization=None):
+    """Creates the collection, deleting it first if it already exists.
+
+    The collection's vectors have the dimension of the current embedder, whose
+    ID and dimension are registered as the collection's metadata.
+
+    Args:
+        defer_indexing (False): whether to disable HNSW indexing until
+            :func:`restore_indexing` is called, which makes bulk uploads much
+            faster
+        quantization (None): the quantization to apply to the vectors. See
+            :func:`get_quantization_config` for supported values
+
+    Returns:
+        the indexing threshold to pass to :func:`restore_indexing` if
+        ``defer_indexing`` is True, else ``None``
+    """
     collection_name = get_collection_name()
+    quantization_config = get_quantization_config(quantization)
+    embedder = get_embedder()
 
-    CLIENT.recreate_collection(
+    get_client().recreate_collection(
         collection_name=collection_name,
         vectors_config=models.VectorParams(
-            size=DIMENSION,
-            distance=METRIC,
+            size=embedder.dimension,
+            distance=models.Distance(METRIC),
+        ),
+        quantization_config=quantization_config,
+    )
+
+    ## doc type filters are applied to every search, so index them
+    get_client().create_payload_index(
+        collection_name=collection_name,
+        field_name="doc_type",
+        field_schema=models.PayloadSchemaType.KEYWORD,
+    )
+    save_collection_metadata(
+        collection_name,
+        {"embedder": embedder.id, "dimension": embedder.dimension},
+    )
+    invalidate_collection_state(collection_name)
+
+    if defer_indexing:
+        return disable_indexing()
+
+    return None
+
+
+def disable_indexing():
+    """Disables HNSW indexing of the collection until :func:`restore_indexing`
+    is called.
+
+    Returns:
+        the collection's previous indexing threshold
+    """
+    collection_name = get_collection_name()
+    info = get_client().get_collection(collection_name=collection_name)
+    indexing_threshold = info.config.optimizer_config.indexing_threshold
+    if indexing_threshold is None:
+        indexing_threshold = INDEXING_THRESHOLD
+
+    get_client().update_collection(
+        collection_name=collection_name,
+        optimizers_config=models.OptimizersConfigDiff(indexing_threshold=0),
+    )
+    invalidate_collection_state(collection_name)
+
+    return indexing_threshold
+
+
+def restore_indexing(indexing_threshold=None):
+    """Re-enables the HNSW indexing that was disabled by
+    :func:`disable_indexing`.
+
+    Args:
+        indexing_threshold (None): the indexing threshold to restore, as
+            returned by :func:`disable_indexing`. By default,
+            ``INDEXING_THRESHOLD`` is used
+    """
+    if indexing_threshold is None:
+        indexing_threshold = INDEXING_THRESHOLD
+
+    collection_name = get_collection_name()
+    get_client().update_collection(
+        collection_name=collection_name,
+        optimizers_config=models.OptimizersConfigDiff(
+            indexing_threshold=indexing_threshold
         ),
     )
+    invalidate_collection_state(collection_name)
 
 
-def add_vectors_to_index(ids, vectors, payloads):
+def add_vectors_to_index(ids, vectors, payloads, wait=True):
     collection_name = get_collection_name()
-    CLIENT.upsert(
+    get_client().upsert(
         collection_name=collection_name,
         points=models.Batch(ids=ids, vectors=vectors, payloads=payloads),
+        wait=wait,
     )
 
 
-def create_subsection_vector(
+def _estimate_point_size(vector, payload):
+    ## vectors are serialized as JSON floats, which take ~20 bytes each
+    size = 20 * len(vector)
+    for value in payload.values():
+        if isinstance(value, str):
+            size += len(value)
+
+    return size
+
+
+class UpsertBuffer(object):
+    """Buffers points across pages and upserts them to the collection in large
+    batches.
+
+    A batch is flushed whenever the buffer holds ``max_points`` points or
+    roughly ``max_bytes`` bytes. Flushes are sent from a background thread, so
+    that uploads overlap with parsing and embedding the next pages, and at
+    most ``max_pending`` flushes are in flight at a time.
+
+    When used as a context manager, buffered points are flushed and all
+    pending flushes are awaited on exit, even if an error occurred.
+
+    Args:
+        max_points (None): the maximum number of points per batch. By default,
+            ``UPSERT_BUFFER_POINTS`` is used
+        max_bytes (None): the approximate maximum size of each batch, in
+            bytes. By default, ``UPSERT_BUFFER_BYTES`` is used
+        max_pending (2): the maximum number of flushes in flight
+    """
+
+    def __init__(self, max_points=None, max_bytes=None, max_pending=2):
+        if max_points is None:
+            max_points = UPSERT_BUFFER_POINTS
+
+        if max_bytes is None:
+            max_bytes = UPSERT_BUFFER_BYTES
+
+        self.max_points = max_points
+        self.max_bytes = max_bytes
+        self.max_pending = max_pending
+        self.num_points = 0
+        self.num_flushes = 0
+
+        self._ids = []
+        self._vectors = []
+        self._payloads = []
+        self._size = 0
+        self._pending = deque()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def add(self, ids, vectors, payloads):
+        for id, vector, payload in zip(ids, vectors, payloads):
+            self._ids.append(id)
+            self._vectors.append(vector)
+            self._payloads.append(payload)
+            self._size += _estimate_point_size(vector, payload)
+
+            if (
+                len(self._ids) >= self.max_points
+                or self._size >= self.max_bytes
+            ):
+                self.flush()
+
+    def flush(self):
+        """Sends the buffered points in the background."""
+        if not self._ids:
+            return
+
+        while len(self._pending) >= self.max_pending:
+            self._pending.popleft().result()
+
+        self._pending.append(
+            self._executor.submit(
+                add_vectors_to_index, self._ids, self._vectors, self._payloads
+            )
+        )
+        self.num_points += len(self._ids)
+        self.num_flushes += 1
+
+        self._ids = []
+        self._vectors = []
+        self._payloads = []
+        self._size = 0
+
+    def close(self):
+        """Flushes any buffered points and waits for all pending flushes to
+        complete.
+        """
+        if self._executor is None:
+            return
+
+        try:
+            self.flush()
+            while self._pending:
+                self._pending.popleft().result()
+        finally:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def delete_vectors_from_index(ids):
+    collection_name = get_collection_name()
+    get_client().delete(
+        collection_name=collection_name,
+        points_selector=models.PointIdsList(points=list(ids)),
+    )
+
+
+def create_subsection_payload(
     subsection_content,
     section_anchor,
     page_url,
     doc_type,
 ):
-
-    vector = embed_text(subsection_content)
-    id = generate_id()
-    payload = {
+    return {
         "text": subsection_content,
         "url": page_url,
         "section_anchor": section_anchor,
         "doc_type": doc_type,
     }
-    return id, vector, payload
+
+
+def create_subsection_vectors(payloads, ids=None):
+    """Embeds the text of each payload with batched requests and returns
+    parallel ``ids, vectors, payloads`` lists.
+
+    Point IDs depend on each chunk's index within its section, so ``ids``
+    must be provided when ``payloads`` is not every chunk of its pages.
+    """
+    vectors = embed_texts([payload["text"] for payload in payloads])
+    if ids is None:
+        ids = generate_payload_ids(payloads)
+
+    return ids, vectors, payloads
 
 
 ################################################################
 
 
-def add_doc_to_index(filepath):
-    subsections = get_markdown_documents(filepath)
+def get_doc_payloads(filepath, sections=None):
+    if sections is None:
+        sections = get_markdown_documents(filepath)
 
     page_url = get_page_url(filepath)
     doc_type = get_doc_type(filepath)
 
-    ids = []
-    vectors = []
-    payloads = []
+    ## pages outside of the doc type folders are never searched
+    if doc_type is None:
+        return []
 
-    for section_anchor, section_content in subsections.items():
-        if section_content == []:
-            continue
+    payloads = []
+    for section_anchor, section_content in sections.items():
         for subsection in section_content:
-            id, vector, payload = create_subsection_vector(
-                subsection,
-                section_anchor,
-                page_url,
-                doc_type,
+            if subsection == []:
+                continue
+            payloads.append(
+                create_subsection_payload(
+                    subsection,
+                    section_anchor,
+                    page_url,
+                    doc_type,
+                )
             )
-            ids.append(id)
-            vectors.append(vector)
-            payloads.append(payload)
 
-    add_vectors_to_index(ids, vectors, payloads)
+    return payloads
+
+
+def add_doc_to_index(filepath, sections=None, buffer=None):
+    payloads = get_doc_payloads(filepath, sections=sections)
+    if not payloads:
+        return []
+
+    ids, vectors, payloads = create_subsection_vectors(payloads)
+    if buffer is not None:
+        buffer.add(ids, vectors, payloads)
+    else:
+        add_vectors_to_index(ids, vectors, payloads)
+
+    return ids
 
 
 ################################################################
 
 
-def generate_json_from_html_doc(doc):
-    doc_json = {}
-    sections = get_markdown_documents(doc)
+def get_manifest_path(collection_name):
+    return os.path.join(
+        FIFTYONE_DOCS_INDEX_FOLDER, f"{collection_name}_manifest.json"
+    )
+
+
+def load_manifest(collection_name):
+    manifest_path = get_manifest_path(collection_name)
+    if not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path, "r") as f:
+        return json.load(f)
+
+
+def save_manifest(collection_name, pages):
+    if not os.path.exists(FIFTYONE_DOCS_INDEX_FOLDER):
+        os.makedirs(FIFTYONE_DOCS_INDEX_FOLDER)
+
+    manifest = {"collection": collection_name, "pages": pages}
+
+    ## write atomically so that an interrupted build never leaves a
+    ## truncated manifest behind
+    manifest_path = get_manifest_path(collection_name)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+
+def get_manifest_entry(filepath, ids, file_hash=None):
+    if file_hash is None:
+        file_hash = hash_file(filepath)
+
+    return {
+        "mtime": os.path.getmtime(filepath),
+        "hash": file_hash,
+        "ids": ids,
+    }
+
+
+################################################################
+
+
+def get_unchanged_entry(filepath, entry):
+    """Returns the page's refreshed manifest entry if its HTML is unchanged
+    since ``entry`` was recorded, or ``None`` if the page must be re-indexed.
+    """
+    if entry is None:
+        return None
+
+    if entry["mtime"] == os.path.getmtime(filepath):
+        return entry
+
+    file_hash = hash_file(filepath)
+    if entry["hash"] == file_hash:
+        return get_manifest_entry(filepath, entry["ids"], file_hash)
+
+    return None
+
+
+def update_doc_in_index(filepath, entry=None, sections=None, buffer=None):
+    """Re-indexes a single page, upserting only the chunks that were added or
+    changed and deleting the points of chunks that no longer exist.
+
+    If an :class:`UpsertBuffer` is provided, new points are added to it
+    rather than upserted immediately.
+
+    Returns a ``(entry, num_upserted, num_deleted)`` tuple, where ``entry`` is
+    the page's new manifest entry.
+    """
+    unchanged_entry = get_unchanged_entry(filepath, entry)
+    if unchanged_entry is not None:
+        return unchanged_entry, 0, 0
+
+    file_hash = hash_file(filepath)
+    payloads = get_doc_payloads(filepath, sections=sections)
+    ids = generate_payload_ids(payloads)
+
+    old_ids = set(entry["ids"]) if entry is not None else set()
+    new_ids = []
+    new_payloads = []
+    for id, payload in zip(ids, payloads):
+        if id not in old_ids:
+            new_ids.append(id)
+            new_payloads.append(payload)
+
+    deleted_ids = old_ids - set(ids)
+
+    if new_payloads:
+        ## the IDs were generated over the whole page, and must not be
+        ## regenerated from the subset of changed chunks
+        points = create_subsection_vectors(new_payloads, ids=new_ids)
+        if buffer is not None:
+            buffer.add(*points)
+        else:
+            add_vectors_to_index(*points)
+    if deleted_ids:
+        delete_vectors_from_index(deleted_ids)
+
+    entry = get_manifest_entry(filepath, ids, file_hash)
+    return entry, len(new_payloads), len(deleted_ids)
+
+
+################################################################
+
+
+def _get_json_doc_payloads(doc, sections=None):
+    if sections is None:
+        sections = get_markdown_documents(doc)
 
     if len(sections) == 0:
-        return
+        return None
     if len(sections) == 1 and None in list(sections.keys()):
-        return
+        return None
 
-    page_url = get_page_url(doc)
-    doc_type = get_doc_type(doc)
+    return get_doc_payloads(doc, sections=sections)
 
-    for section_anchor, section in sections.items():
-        for subsection_content in section:
-            if subsection_content == []:
-                continue
 
-            id, vector, payload = create_subsection_vector(
-                subsection_content,
-                section_anchor,
-                page_url,
-                doc_type,
-            )
-            doc_json[id] = {"vector": vector, **payload}
+def _vectors_to_json(ids, vectors, payloads):
+    return {
+        id: {"vector": vector, **payload}
+        for id, vector, payload in zip(ids, vectors, payloads)
+    }
+
 
-    return doc_json
+def generate_json_from_html_doc(doc):
+    payloads = _get_json_doc_payloads(doc)
+    if payloads is None:
+        return
 
+    return _vectors_to_json(*create_subsection_vectors(payloads))
 
-def generate_json_from_html_docs(docs_index_file="fiftyone_docs_index.json"):
-    docs_json = {}
 
-    docs = get_docs_list()
-    for doc in tqdm(docs):
-        doc_json = generate_json_from_html_doc(doc)
-        if doc_json is None:
-            continue
-        for id in doc_json:
-            docs_json[id] = doc_json[id]
+def generate_json_from_html_docs(
+    docs_index_file="fiftyone_docs_index.json",
+    num_workers=None,
+    window_size=None,
+):
+    """Generates a JSON index of the docs without a Qdrant collection.
+
+    Chunks are gathered across pages and embedded ``window_size`` at a time,
+    so that embedding requests are packed across page boundaries while only
+    one window of vectors is held in memory, and each window is appended to
+    the index as soon as it is embedded.
+
+    Args:
+        docs_index_file ("fiftyone_docs_index.json"): the path to write to
+        num_workers (None): the number of parsing processes
+        window_size (None): the number of chunks to embed at a time. By
+            default, ``EMBEDDING_WINDOW_SIZE`` is used
+    """
+    if window_size is None:
+        window_size = EMBEDDING_WINDOW_SIZE
 
-    with open(docs_index_file, "w") as f:
-        json.dump(docs_json, f)
+    docs = get_docs_list()
+    parsed_docs = iter_markdown_documents(docs, num_workers=num_workers)
+
+    embedder = get_embedder()
+    embedder.start()
+    try:
+        with JSONIndexWriter(docs_index_file) as writer, tqdm(
+            parsed_docs, total=len(docs)
+        ) as pbar:
+            ids = []
+            payloads = []
+            for doc, sections in pbar:
+                doc_payloads = _get_json_doc_payloads(doc, sections=sections)
+                if doc_payloads is None:
+                    continue
+
+                ids.extend(generate_payload_ids(doc_payloads))
+                payloads.extend(doc_payloads)
+                if len(payloads) >= window_size:
+                    writer.add(*create_subsection_vectors(payloads, ids=ids))
+                    pbar.set_postfix(points=writer.count)
+                    ids = []
+                    payloads = []
+
+            if payloads:
+                writer.add(*create_subsection_vectors(payloads, ids=ids))
+    finally:
+        embedder.close()
+
+    print_parse_cache_stats()
+    print_embedding_cache_stats()
+    print(f"Wrote {writer.count} points to {docs_index_file}")
 
 
 ################################################################
 
 
-def generate_index_from_html_docs():
-    initialize_index()
+def generate_index_from_html_docs(num_workers=None, quantization=None):
+    initialize_index(quantization=quantization)
 
+    pages = {}
     docs = get_docs_list()
-    for doc in tqdm(docs):
-        add_doc_to_index(doc)
-
+    parsed_docs = iter_markdown_documents(docs, num_workers=num_workers)
+
+    ## every page is embedded through one persistent session
+    embedder = get_embedder()
+    embedder.start()
+    try:
+        with UpsertBuffer() as buffer:
+            for doc, sections in tqdm(parsed_docs, total=len(docs)):
+                ids = add_doc_to_index(doc, sections=sections, buffer=buffer)
+                pages[get_page_url(doc)] = get_manifest_entry(doc, ids)
+    finally:
+        embedder.close()
+
+    save_manifest(get_collection_name(), pages)
+    invalidate_collection_state(get_collection_name())
+    build_lexical_index()
+
+    print_parse_cache_stats()
+    print_embedding_cache_stats()
+    print(
+        f"Upserted {buffer.num_points} points in {buffer.num_flushes} "
+        "batches"
+    )
     print("Index created successfully!")
 
 
+def update_index_from_html_docs(num_workers=None):
+    collection_name = get_collection_name()
+
+    manifest = load_manifest(collection_name)
+    if manifest is None or not collection_exists(collection_name):
+        print(
+            f"No manifest found for collection {collection_name}. "
+            "Creating the index from scratch..."
+        )
+        generate_index_from_html_docs(num_workers=num_workers)
+        return
+
+    validate_collection_embedder(collection_name)
+
+    old_pages = manifest["pages"]
+    pages = {}
+    num_changed = 0
+    num_upserted = 0
+    num_deleted = 0
+
+    ## only parse the pages whose HTML changed
+    changed_docs = []
+    for doc in get_docs_list():
+        page_url = get_page_url(doc)
+        entry = get_unchanged_entry(doc, old_pages.get(page_url, None))
+        if entry is not None:
+            pages[page_url] = entry
+        else:
+            changed_docs.append(doc)
+
+    parsed_docs = iter_markdown_documents(
+        changed_docs, num_workers=num_workers
+    )
+
+    ## every page is embedded through one persistent session
+    embedder = get_embedder()
+    embedder.start()
+    try:
+        with UpsertBuffer() as buffer:
+            for doc, sections in tqdm(parsed_docs, total=len(changed_docs)):
+                page_url = get_page_url(doc)
+                entry = old_pages.get(page_url, None)
+                new_entry, doc_upserted, doc_deleted = update_doc_in_index(
+                    doc, entry=entry, sections=sections, buffer=buffer
+                )
+                pages[page_url] = new_entry
+
+                if entry is None or new_entry["ids"] != entry["ids"]:
+                    num_changed += 1
+                num_upserted += doc_upserted
+                num_deleted += doc_deleted
+    finally:
+        embedder.close()
+
+    ## remove the points of pages that no longer exist
+    for page_url, entry in old_pages.items():
+        if page_url not in pages and entry["ids"]:
+            delete_vectors_from_index(entry["ids"])
+            num_changed += 1
+            num_deleted += len(entry["ids"])
+
+    save_manifest(collection_name, pages)
+    invalidate_collection_state(collection_name)
+    build_lexical_index()
+
+    print_parse_cache_stats()
+    print_embedding_cache_stats()
+    print(
+        f"Index updated successfully! {num_changed} pages changed, "
+        f"{num_upserted} points upserted, {num_deleted} points deleted"
+    )
+
+
 ################################################################
 
 
-def save_index_to_json(
-    docs_index_file="fiftyone_docs_index.json", batch_size=50
+INDEX_FORMATS = ("json", "jsonl", "binary")
+
+
+def iter_index_points(batch_size=256, prefetch=True, with_vectors=True):
+    """Iterates over pages of points in the collection using Qdrant's scroll
+    cursor.
+
+    Args:
+        batch_size (256): the number of points to fetch per page
+        prefetch (True): whether to fetch the next page in a background
+            thread while the current page is being consumed
+        with_vectors (True): whether to fetch the vectors of the points
+    """
+    collection_name = get_collection_name()
+
+    def _fetch(offset):
+        return get_client().scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=with_vectors,
+        )
+
+    if not prefetch:
+        offset = None
+        while True:
+            points, offset = _fetch(offset)
+            yield points
+            if offset is None:
+                return
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(_fetch, None)
+        while future is not None:
+            points, offset = future.result()
+            if offset is not None:
+                future = executor.submit(_fetch, offset)
+            else:
+                future = None
+
+            yield points
+
+
+def _get_index_writer(docs_index_path, format, dtype):
+    if format == "json":
+        return JSONIndexWriter(docs_index_path)
+    if format == "jsonl":
+        return JSONLIndexWriter(docs_index_path)
+    if format == "binary":
+        metadata = load_collection_metadata(get_collection_name())
+        if metadata is None:
+            ## collections without metadata predate embedders
+            metadata = {"embedder": MODEL, "dimension": DIMENSION}
+
+        return BinaryIndexWriter(
+            docs_index_path,
+            metadata["embedder"],
+            metadata["dimension"],
+            dtype=dtype,
+        )
+
+    raise ValueError(
+        f"Unsupported format '{format}'. Supported values are "
+        f"{INDEX_FORMATS}"
+    )
+
+
+def save_index(
+    docs_index_path="fiftyone_docs_index.json",
+    format="json",
+    batch_size=256,
+    dtype="float32",
+    prefetch=True,
 ):
+    """Exports the collection to disk, streaming each page of points to the
+    output as it is retrieved.
+
+    Args:
+        docs_index_path ("fiftyone_docs_index.json"): the path to write to
+        format ("json"): the output format. Supported values are
+            ``("json", "jsonl", "binary")``
+        batch_size (256): the number of points to retrieve per page
+        dtype ("float32"): the dtype of the vectors of a binary index
+        prefetch (True): whether to retrieve the next page while the current
+            page is being written
+    """
     collection_name = get_collection_name()
-    collection = CLIENT.get_collection(collection_name=collection_name)
+    collection = get_client().get_collection(collection_name=collection_name)
     num_vectors = collection.points_count
-    docs_index = {}
 
-    curr_points = CLIENT.scroll(
-        collection_name=collection_name,
-        limit=batch_size,
-        with_payloads=True,
-        with_vectors=True,
+    writer = _get_index_writer(docs_index_path, format, dtype)
+    with writer, tqdm(total=num_vectors) as pbar:
+        for points in iter_index_points(
+            batch_size=batch_size, prefetch=prefetch
+        ):
+            writer.add(
+                [point.id for point in points],
+                [point.vector for point in points],
+                [point.payload for point in points],
+            )
+            pbar.update(len(points))
+
+    print(f"Index saved successfully to {docs_index_path}!")
+
+
+def save_index_to_json(
+    docs_index_file="fiftyone_docs_index.json", batch_size=256
+):
+    save_index(
+        docs_index_path=docs_index_file, format="json", batch_size=batch_size
     )
 
-    for i in tqdm(range(0, num_vectors, batch_size)):
-        min_ind = i * batch_size
 
-        curr_points = CLIENT.scroll(
-            collection_name=collection_name,
-            limit=10,
-            offset=min_ind,
-            with_payload=True,
-            with_vectors=True,
-        )[0]
+def save_index_to_binary(
+    docs_index_path="fiftyone_docs_index", batch_size=256, dtype="float32"
+):
+    save_index(
+        docs_index_path=docs_index_path,
+        format="binary",
+        batch_size=batch_size,
+        dtype=dtype,
+    )
+
 
-        for point in curr_points:
-            docs_index[point.id] = {"vector": point.vector, **point.payload}
+def build_lexical_index(batch_size=256):
+    """Builds the lexical index of the collection from its payloads and
+    writes it to ``FIFTYONE_DOCS_INDEX_FOLDER``.
 
-    with open(docs_index_file, "w") as f:
-        json.dump(docs_index, f)
+    Args:
+        batch_size (256): the number of points to retrieve per page
+    """
+    builder = LexicalIndexBuilder()
+    for points in iter_index_points(batch_size=batch_size, with_vectors=False):
+        builder.add(
+            [point.id for point in points],
+            [point.payload for point in points],
+        )
 
-    print(f"Index saved successfully to {docs_index_file}!")
+    lexical_index_path = get_lexical_index_path(get_collection_name())
+    builder.write(lexical_index_path)
+    print(
+        f"Lexical index of {len(builder)} points saved to "
+        f"{lexical_index_path}"
+    )
 
 
 ################################################################
 
 
-def load_index_from_json(docs_index_file=None, batch_size=500):
+## payload fields that are copied from JSON index records into Qdrant
+JSON_PAYLOAD_KEYS = (
+    "text",
+    "url",
+    "section_anchor",
+    "doc_type",
+    "block_type",
+)
 
-    initialize_index()
-    tmp_index_file = (
-        docs_index_file
-        if docs_index_file is not None
-        else FIFTYONE_DOCS_INDEX_FILENAME
-    )
-    shutil.copyfile(FIFTYONE_DOCS_INDEX_FILEPATH, tmp_index_file)
-    with open(tmp_index_file, "r") as f:
-        docs_index = json.load(f)
-    os.remove(tmp_index_file)
 
+def iter_json_index_batches(docs_index_file, batch_size):
+    """Streams ``(ids, vectors, payloads)`` batches from a JSON or JSONL
+    index, so that at most ``batch_size`` records are held in memory at a
+    time.
+    """
     ids = []
     vectors = []
     payloads = []
-
-    for id, value in docs_index.items():
+    for id, value in iter_index_records(docs_index_file):
         ids.append(id)
         vectors.append(value["vector"])
+        payloads.append(
+            {key: value[key] for key in JSON_PAYLOAD_KEYS if key in value}
+        )
+
+        if len(ids) >= batch_size:
+            yield ids, vectors, payloads
+            ids = []
+            vectors = []
+            payloads = []
+
+    if ids:
+        yield ids, vectors, payloads
+
+
+def bulk_load_batches(
+    batches,
+    num_workers=None,
+    defer_indexing=True,
+    quantization=None,
+    total=None,
+):
+    """Recreates the collection and uploads the given batches into it.
+
+    Batches are uploaded from a pool of worker threads without waiting for
+    each upsert to be applied, while at most ``2 * num_workers`` batches are
+    in flight so that streamed inputs are never fully loaded into memory.
+    The last batch is upserted once the others have been sent, and waits
+    until every upsert has been applied. The number of points in the
+    collection is then checked, so that upserts that failed while being
+    applied are never silently lost.
+
+    The lexical index of the collection is built from the same batches.
+
+    Args:
+        batches: an iterable of ``(ids, vectors, payloads)`` batches
+        num_workers (None): the number of upload threads. By default,
+            ``BULK_LOAD_NUM_WORKERS`` is used
+        defer_indexing (True): whether to defer building the HNSW index until
+            all points have been uploaded
+        quantization (None): the quantization to apply to the vectors. See
+            :func:`get_quantization_config` for supported values
+        total (None): the total number of points, if known
+    """
+    if num_workers is None:
+        num_workers = BULK_LOAD_NUM_WORKERS
+
+    ## check the first batch before the existing collection is deleted
+    batches = _drop_untyped_points(batches)
+    first_batch = next(batches, None)
+    if first_batch is not None:
+        _validate_dimension(first_batch[1])
+        batches = itertools.chain([first_batch], batches)
+
+    indexing_threshold = initialize_index(
+        defer_indexing=defer_indexing, quantization=quantization
+    )
+
+    collection_name = get_collection_name()
+    lexical_builder = LexicalIndexBuilder()
+
+    ## indexing is restored even if the load fails, so that the collection
+    ## is never left unindexed
+    try:
+        num_points, elapsed = _upload_batches(
+            batches, lexical_builder, num_workers, total
+        )
+    finally:
+        if defer_indexing:
+            restore_indexing(indexing_threshold=indexing_threshold)
+
+    invalidate_collection_state(collection_name)
+    lexical_builder.write(get_lexical_index_path(collection_name))
+    print(
+        f"Uploaded {num_points} points in {elapsed:.1f}s "
+        f"({num_points / max(elapsed, 1e-9):.0f} points/s)"
+    )
+
+
+def _drop_untyped_points(batches):
+    ## points without a doc type are never searched, so they aren't loaded
+    for ids, vectors, payloads in batches:
+        inds = [
+            i
+            for i, payload in enumerate(payloads)
+            if payload.get("doc_type", None) is not None
+        ]
+        if len(inds) < len(ids):
+            ids = [ids[i] for i in inds]
+            vectors = [vectors[i] for i in inds]
+            payloads = [payloads[i] for i in inds]
+
+        if ids:
+            yield ids, vectors, payloads
+
+
+def _validate_dimension(vectors):
+    embedder = get_embedder()
+    if vectors and len(vectors[0]) != embedder.dimension:
+        raise ValueError(
+            f"The index has vectors of dimension {len(vectors[0])}, but the "
+            f"current embedder '{embedder.id}' has dimension "
+            f"{embedder.dimension}. Set `FIFTYONE_DOCS_EMBEDDER` to the "
+            "embedder that built the index"
+        )
+
+
+def _upload_batches(batches, lexical_builder, num_workers, total):
+    point_ids = set()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_workers) as executor, tqdm(
+        total=total, unit=" points"
+    ) as pbar:
+        futures = deque()
+        last_batch = None
+        for batch in batches:
+            ## each batch is sent once the next one is read, so that the last
+            ## batch can be upserted synchronously
+            if last_batch is not None:
+                if len(futures) >= 2 * num_workers:
+                    pbar.update(futures.popleft().result())
+
+                futures.append(executor.submit(_upload_batch, *last_batch))
 
-        payload_keys = (
-            "text",
-            "url",
-            "section_anchor",
-            "doc_type",
-            "block_type",
+            ids, _, payloads = batch
+            lexical_builder.add(ids, payloads)
+            point_ids.update(normalize_point_id(id) for id in ids)
+            last_batch = batch
+
+        while futures:
+            pbar.update(futures.popleft().result())
+
+        ## Qdrant applies upserts in order, so waiting for the last one
+        ## waits for them all
+        if last_batch is not None:
+            add_vectors_to_index(*last_batch, wait=True)
+            pbar.update(len(last_batch[0]))
+
+    elapsed = time.perf_counter() - start
+
+    collection_name = get_collection_name()
+    num_points = (
+        get_client().count(collection_name=collection_name, exact=True).count
+    )
+    if num_points != len(point_ids):
+        raise RuntimeError(
+            f"Collection {collection_name} contains {num_points} points, but "
+            f"{len(point_ids)} were uploaded. Some upserts failed; check the "
+            "Qdrant logs and load the index again"
         )
-        payload = {key: value[key] for key in payload_keys}
-        payloads.append(payload)
 
-    for i in tqdm(range(0, len(ids), batch_size)):
-        min_ind = i
-        max_ind = min(i + batch_size, len(ids))
+    return num_points, elapsed
+
+
+def _upload_batch(ids, vectors, payloads):
+    add_vectors_to_index(ids, vectors, payloads, wait=False)
+    return len(ids)
+
+
+def load_index_from_json(
+    docs_index_file=None,
+    batch_size=500,
+    num_workers=None,
+    defer_indexing=True,
+    quantization=None,
+):
+    if docs_index_file is None:
+        docs_index_file = FIFTYONE_DOCS_INDEX_FILEPATH
+
+    bulk_load_batches(
+        iter_json_index_batches(docs_index_file, batch_size),
+        num_workers=num_workers,
+        defer_indexing=defer_indexing,
+        quantization=quantization,
+    )
+
+    print("Index created successfully!")
 
-        curr_ids = ids[min_ind:max_ind]
-        curr_vectors = vectors[min_ind:max_ind]
-        curr_payloads = payloads[min_ind:max_ind]
 
-        add_vectors_to_index(curr_ids, curr_vectors, curr_payloads)
+def load_index_from_binary(
+    docs_index_path,
+    batch_size=500,
+    num_workers=None,
+    defer_indexing=True,
+    quantization=None,
+):
+    index = load_binary_index(docs_index_path)
+    validate_binary_index_embedder(index)
+
+    batches = (
+        (ids, vectors.tolist(), payloads)
+        for ids, vectors, payloads in index.iter_batches(batch_size)
+    )
+    bulk_load_batches(
+        batches,
+        num_workers=num_workers,
+        defer_indexing=defer_indexing,
+        quantization=quantization,
+        total=len(index),
+    )
 
     print("Index created successfully!")
 
 
+def load_index(
+    docs_index_path=None,
+    batch_size=500,
+    num_workers=None,
+    defer_indexing=True,
+    quantization=None,
+):
+    """Loads the index from a JSON, JSONL or binary index."""
+    if docs_index_path is not None and is_binary_index(docs_index_path):
+        load_index_from_binary(
+            docs_index_path,
+            batch_size=batch_size,
+            num_workers=num_workers,
+            defer_indexing=defer_indexing,
+            quantization=quantization,
+        )
+    else:
+        load_index_from_json(
+            docs_index_file=docs_index_path,
+            batch_size=batch_size,
+            num_workers=num_workers,
+            defer_indexing=defer_indexing,
+            quantization=quantization,
+        )
+
+
+def convert_index(docs_index_file, docs_index_path, dtype="float32"):
+    """Converts a JSON or JSONL index, whose vectors must have been generated
+    by the current embedder, to a binary index.
+    """
+    embedder = get_embedder()
+    convert_json_index_to_binary(
+        docs_index_file,
+        docs_index_path,
+        embedder.id,
+        embedder.dimension,
+        dtype=dtype,
+    )
+    print(f"Index converted successfully to {docs_index_path}!")
+
+
 ################################################################
 
 
@@ -0,0 +1,232 @@
+"""
+Embedder declarations.
+
+Embedders turn texts into the vectors that are indexed and searched. The
+index records the ID and dimension of the embedder that built it, so that it
+is only ever searched with vectors from the same embedder.
+
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+
+from collections import Counter
+import zlib
+
+import numpy as np
+
+from fiftyone.docs_search.common import (
+    DIMENSION,
+    EMBEDDERS,
+    HASHING_DIMENSION,
+    MODEL,
+    batch_texts,
+    get_embedding_cache,
+    get_embedding_client,
+)
+from fiftyone.docs_search.lexical_index import tokenize
+
+## bump this whenever the features of `HashingEmbedder` change, so that
+## indexes built with older versions are not searched with new vectors
+HASHING_VERSION = 1
+
+################################################################
+
+
+class Embedder(object):
+    """Interface for embedders.
+
+    Embedders must implement the `embed_texts()` method and set the ``id``
+    and ``dimension`` attributes.
+
+    Attributes:
+        id: a string that uniquely identifies the vectors that this embedder
+            produces
+        dimension: the dimension of the vectors
+    """
+
+    id = None
+    dimension = None
+
+    def embed_texts(self, texts, batch_size=None, max_tokens=None):
+        """Embeds the given texts.
+
+        Args:
+            texts: a list of strings
+            batch_size (None): the maximum number of texts per request, for
+                embedders that send requests
+            max_tokens (None): the maximum number of tokens per request, for
+                embedders that send requests
+
+        Returns:
+            a list of embedding vectors, in the same order as ``texts``
+        """
+        raise NotImplementedError("subclass must implement embed_texts()")
+
+    def start(self):
+        """Prepares the embedder for repeated use, e.g. by opening any
+        persistent connections.
+        """
+        pass
+
+    def close(self):
+        """Releases any resources acquired by :meth:`start`."""
+        pass
+
+
+class OpenAIEmbedder(Embedder):
+    """Embedder that uses the OpenAI embeddings API.
+
+    Texts are embedded with as few multi-input requests as the batch budgets
+    allow, and embeddings are cached on disk unless
+    ``FIFTYONE_DOCS_EMBEDDING_CACHE`` is disabled.
+
+    Args:
+        model (None): the embedding model. By default, ``MODEL`` is used
+        dimension (None): the dimension of the model's embeddings. By
+            default, ``DIMENSION`` is used
+    """
+
+    def __init__(self, model=None, dimension=None):
+        if model is None:
+            model = MODEL
+
+        if dimension is None:
+            dimension = DIMENSION
+
+        ## the model name is the ID, so that the embedding caches and the
+        ## indexes that predate embedders remain valid
+        self.id = model
+        self.model = model
+        self.dimension = dimension
+
+    def embed_texts(self, texts, batch_size=None, max_tokens=None):
+        texts = list(texts)
+
+        cache = get_embedding_cache()
+        if cache is not None:
+            embeddings = cache.get_many(self.model, texts)
+        else:
+            embeddings = [None] * len(texts)
+
+        inds = [
+            i for i, embedding in enumerate(embeddings) if embedding is None
+        ]
+        if not inds:
+            return embeddings
+
+        missing_texts = [texts[i] for i in inds]
+        batches = list(
+            batch_texts(
+                missing_texts, batch_size=batch_size, max_tokens=max_tokens
+            )
+        )
+
+        ## store each batch as soon as it completes so that a failed build
+        ## doesn't lose the embeddings it already paid for
+        def _on_batch(batch_index, batch_embeddings):
+            batch = batches[batch_index]
+            for i, embedding in zip(batch, batch_embeddings):
+                embeddings[inds[i]] = embedding
+
+            if cache is not None:
+                cache.put_many(
+                    self.model,
+                    [missing_texts[i] for i in batch],
+                    batch_embeddings,
+                )
+
+        client = get_embedding_client()
+        client.embed_batches(
+            [[missing_texts[i] for i in batch] for batch in batches],
+            callback=_on_batch,
+        )
+
+        return embeddings
+
+    def start(self):
+        get_embedding_client().start()
+
+    def close(self):
+        get_embedding_client().close()
+
+
+class HashingEmbedder(Embedder):
+    """Local embedder that needs no model, network or GPU.
+
+    Each text is represented by its terms, as tokenized for the lexical index,
+    and its adjacent term pairs. The sublinear frequencies ``1 + log(tf)`` of
+    these features are hashed into a signed ``dimension``-dimensional vector,
+    which is a sparse random projection of the text's bag of features, and
+    the vector is L2-normalized so that dot products are cosine similarities.
+
+    Vectors capture word overlap rather than meaning, so searches are much
+    less relevant than with a learned model, but embedding is fast and
+    deterministic, which makes this embedder suitable for air-gapped
+    environments, tests and load tests.
+
+    Args:
+        dimension (None): the dimension of the vectors. By default,
+            ``HASHING_DIMENSION`` is used
+    """
+
+    def __init__(self, dimension=None):
+        if dimension is None:
+            dimension = HASHING_DIMENSION
+
+        self.id = f"hashing-v{HASHING_VERSION}-{dimension}"
+        self.dimension = dimension
+
+    def embed_texts(self, texts, batch_size=None, max_tokens=None):
+        texts = list(texts)
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for i, text in enumerate(texts):
+            counts = Counter(_get_features(text))
+            if not counts:
+                continue
+
+            hashes = np.fromiter(
+                (zlib.crc32(f.encode("utf-8")) for f in counts),
+                dtype=np.uint32,
+                count=len(counts),
+            )
+            weights = 1 + np.log(
+                np.fromiter(counts.values(), dtype=np.float32)
+            )
+
+            ## the top bit of each hash chooses the sign of its feature
+            signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+            np.add.at(vectors[i], hashes % self.dimension, signs * weights)
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.maximum(norms, 1e-12)
+
+        return vectors.tolist()
+
+
+def _get_features(text):
+    terms = tokenize(text)
+    return terms + [f"{a} {b}" for a, b in zip(terms, terms[1:])]
+
+
+def make_embedder(name, dimension=None):
+    """Creates the embedder with the given name.
+
+    Args:
+        name: the name of the embedder. Supported values are
+            ``("openai", "hashing")``
+        dimension (None): the dimension of the vectors of the ``hashing``
+            embedder
+
+    Returns:
+        an :class:`Embedder`
+    """
+    if name == "openai":
+        return OpenAIEmbedder()
+
+    if name == "hashing":
+        return HashingEmbedder(dimension=dimension)
+
+    raise ValueError(
+        f"Unsupported embedder '{name}'. Supported values are {EMBEDDERS}"
+    )
@@ -0,0 +1,477 @@
+"""
+Asynchronous embedding client declarations.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import os
+import random
+import re
+import threading
+import time
+
+import aiohttp
+import openai
+
+DEFAULT_API_BASE = "https://api.openai.com/v1"
+
+## the `openai.api_type` values that are supported. Azure deployments are
+## addressed by name and authenticated with an API key (`azure`) or an Azure
+## AD token (`azure_ad`)
+API_TYPES = ("open_ai", "azure", "azure_ad")
+AZURE_API_TYPES = ("azure", "azure_ad")
+
+## statuses that are worth retrying rather than failing the whole build
+RETRY_STATUSES = (408, 409, 429, 500, 502, 503, 504)
+
+_DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+################################################################
+
+
+def parse_duration(value):
+    """Parses a rate limit reset duration such as ``"1s"``, ``"6m0s"`` or
+    ``"20ms"`` into seconds. Returns ``None`` if the value can't be parsed.
+    """
+    if value is None:
+        return None
+
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    matches = _DURATION_PATTERN.findall(value)
+    if not matches:
+        return None
+
+    return sum(float(num) * _DURATION_UNITS[unit] for num, unit in matches)
+
+
+def get_retry_after(headers):
+    retry_after_ms = headers.get("retry-after-ms", None)
+    if retry_after_ms is not None:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+
+    return parse_duration(headers.get("retry-after", None))
+
+
+def _parse_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def run_sync(coro):
+    """Runs the coroutine to completion, even if the calling thread already
+    has a running event loop (e.g., in a Jupyter notebook).
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+################################################################
+
+
+class TokenBucket(object):
+    """An asyncio token bucket that refills continuously at
+    ``rate_per_minute`` and holds at most one minute's worth of tokens.
+
+    Args:
+        rate_per_minute: the number of tokens added per minute
+    """
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = None
+        self._loop = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        ## the level of the bucket outlives event loops, but its lock can only
+        ## be used by the loop that created it
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def sync(self, remaining, reset_seconds=None):
+        """Lowers the bucket's level to the ``remaining`` budget reported by
+        the server, so that the client never runs ahead of the server's view
+        of the rate limit.
+        """
+        if remaining is None:
+            return
+
+        self._refill()
+        self.tokens = min(self.tokens, float(remaining))
+
+        if remaining <= 0 and reset_seconds:
+            ## the bucket will be full again after the reset, so adopt the
+            ## implied refill time
+            self.tokens = min(self.tokens, -reset_seconds * self.rate)
+
+
+class AsyncEmbeddingClient(object):
+    """Client that embeds many batches of texts concurrently against an
+    OpenAI-compatible ``/embeddings`` endpoint.
+
+    Requests are paced by token buckets on both requests and tokens per
+    minute, rate limit headers returned by the server are used to adjust the
+    buckets, and retryable failures such as 429s are retried with backoff
+    that honors ``Retry-After``. The buckets and any pause after a 429 are
+    shared by all calls to the client, so that consecutive calls stay within
+    the same budget.
+
+    Unless they are provided, the API settings are read from the ``openai``
+    module, or from the ``OPENAI_*`` environment variables that it reads, so
+    that Azure OpenAI endpoints configured for ``openai`` keep working.
+
+    Args:
+        model: the embedding model to use
+        api_key (None): the API key. By default, ``openai.api_key`` or the
+            ``OPENAI_API_KEY`` environment variable is used
+        api_base (None): the base URL of the API. By default,
+            ``openai.api_base`` or the ``OPENAI_API_BASE`` environment
+            variable is used
+        api_type (None): the type of the API. Supported values are
+            ``("open_ai", "azure", "azure_ad")``. By default,
+            ``openai.api_type`` or the ``OPENAI_API_TYPE`` environment
+            variable is used, or ``"open_ai"`` if neither is set
+        api_version (None): the API version, which is required by Azure. By
+            default, ``openai.api_version`` or the ``OPENAI_API_VERSION``
+            environment variable is used
+        organization (None): the organization to bill. By default,
+            ``openai.organization`` or the ``OPENAI_ORGANIZATION`` environment
+            variable is used
+        deployment_id (None): the name of the Azure deployment of ``model``.
+            By default, the deployment is assumed to be named after the model
+        max_concurrency (8): the maximum number of requests in flight
+        requests_per_minute (3000): the request rate limit
+        tokens_per_minute (1000000): the token rate limit
+        max_retries (8): the maximum number of retries per request
+        timeout (60): the timeout of each request, in seconds
+        token_counter (None): a function that estimates the number of tokens
+            in a text. By default, four characters per token are assumed
+    """
+
+    def __init__(
+        self,
+        model,
+        api_key=None,
+        api_base=None,
+        api_type=None,
+        api_version=None,
+        organization=None,
+        deployment_id=None,
+        max_concurrency=8,
+        requests_per_minute=3000,
+        tokens_per_minute=1000000,
+        max_retries=8,
+        timeout=60,
+        token_counter=None,
+    ):
+        if api_key is None:
+            api_key = getattr(openai, "api_key", None) or os.getenv(
+                "OPENAI_API_KEY"
+            )
+
+        if api_base is None:
+            api_base = (
+                getattr(openai, "api_base", None)
+                or os.getenv("OPENAI_API_BASE")
+                or DEFAULT_API_BASE
+            )
+
+        if api_type is None:
+            api_type = (
+                getattr(openai, "api_type", None)
+                or os.getenv("OPENAI_API_TYPE")
+                or "open_ai"
+            )
+
+        api_type = api_type.lower()
+        if api_type == "azuread":
+            api_type = "azure_ad"
+
+        if api_type not in API_TYPES:
+            raise ValueError(
+                f"Unsupported API type '{api_type}'. Supported values are "
+                f"{API_TYPES}"
+            )
+
+        if api_version is None:
+            api_version = getattr(openai, "api_version", None) or os.getenv(
+                "OPENAI_API_VERSION"
+            )
+
+        if api_type in AZURE_API_TYPES and not api_version:
+            raise ValueError(
+                "Azure OpenAI requires an API version. Set "
+                "`openai.api_version` or `OPENAI_API_VERSION`"
+            )
+
+        if organization is None:
+            organization = getattr(openai, "organization", None) or os.getenv(
+                "OPENAI_ORGANIZATION"
+            )
+
+        if deployment_id is None:
+            deployment_id = model
+
+        if token_counter is None:
+            token_counter = lambda text: len(text) // 4 + 1
+
+        self.model = model
+        self.api_key = api_key
+        self.api_base = api_base.rstrip("/")
+        self.api_type = api_type
+        self.api_version = api_version
+        self.organization = organization
+        self.deployment_id = deployment_id
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.token_counter = token_counter
+
+        self.num_requests = 0
+        self.num_retries = 0
+
+        self._request_bucket = TokenBucket(requests_per_minute)
+        self._token_bucket = TokenBucket(tokens_per_minute)
+        self._paused_until = 0.0
+        self._semaphore = None
+        self._semaphore_loop = None
+
+        self._loop = None
+        self._thread = None
+        self._session = None
+
+    def start(self):
+        """Starts a background event loop with a persistent HTTP session that
+        is reused by all calls until :meth:`close` is called, so that
+        long-running processes keep their connections to the API warm.
+        """
+        if self._loop is not None:
+            return
+
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+
+        self._loop = loop
+        self._thread = thread
+        self._session = asyncio.run_coroutine_threadsafe(
+            self._create_session(), loop
+        ).result()
+
+    def close(self):
+        """Closes the persistent session and event loop started by
+        :meth:`start`, if any.
+        """
+        if self._loop is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(
+            self._session.close(), self._loop
+        ).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+        self._loop = None
+        self._thread = None
+        self._session = None
+
+    def embed_batches(self, batches, callback=None):
+        """Embeds the given batches of texts.
+
+        Args:
+            batches: a list of lists of texts. Each batch is sent as one
+                request
+            callback (None): an optional function called with
+                ``(batch_index, embeddings)`` as each batch completes
+
+        Returns:
+            a list containing a list of embeddings for each batch
+        """
+        coro = self.aembed_batches(batches, callback=callback)
+        if self._loop is not None:
+            return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+        return run_sync(coro)
+
+    async def aembed_batches(self, batches, callback=None):
+        ## the persistent session can only be used from its own loop
+        if (
+            self._session is not None
+            and asyncio.get_running_loop() is self._loop
+        ):
+            return await self._embed_batches(self._session, batches, callback)
+
+        async with await self._create_session() as session:
+            return await self._embed_batches(session, batches, callback)
+
+    async def _create_session(self):
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    def _get_semaphore(self):
+        ## like locks, semaphores can only be used by the loop that created
+        ## them. Calls made through the persistent loop share one semaphore
+        loop = asyncio.get_running_loop()
+        if self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+
+        return self._semaphore
+
+    async def _embed_batches(self, session, batches, callback):
+        semaphore = self._get_semaphore()
+
+        async def _embed(batch_index, texts):
+            async with semaphore:
+                embeddings = await self._embed_batch(session, texts)
+
+            if callback is not None:
+                callback(batch_index, embeddings)
+
+            return embeddings
+
+        return await asyncio.gather(
+            *[_embed(i, texts) for i, texts in enumerate(batches)]
+        )
+
+    async def _embed_batch(self, session, texts):
+        url = self._get_url()
+        headers = self._get_headers()
+        body = {"input": texts, "model": self.model}
+        num_tokens = sum(self.token_counter(text) for text in texts)
+
+        attempt = 0
+        while True:
+            ## a 429 on any request pauses all of them
+            delay = self._paused_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            await self._request_bucket.acquire(1)
+            await self._token_bucket.acquire(num_tokens)
+
+            self.num_requests += 1
+            retry_after = None
+            try:
+                async with session.post(
+                    url, json=body, headers=headers
+                ) as response:
+                    self._sync_buckets(response.headers)
+
+                    if response.status == 200:
+                        result = await response.json()
+                        embeddings = [None] * len(texts)
+                        for item in result["data"]:
+                            embeddings[item["index"]] = item["embedding"]
+
+                        return embeddings
+
+                    if (
+                        response.status not in RETRY_STATUSES
+                        or attempt >= self.max_retries
+                    ):
+                        message = await response.text()
+                        raise aiohttp.ClientResponseError(
+                            response.request_info,
+                            response.history,
+                            status=response.status,
+                            message=message,
+                            headers=response.headers,
+                        )
+
+                    retry_after = get_retry_after(response.headers)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= self.max_retries:
+                    raise
+
+            delay = self._get_backoff(attempt, retry_after)
+            if retry_after is not None:
+                self._paused_until = max(
+                    self._paused_until, time.monotonic() + delay
+                )
+
+            attempt += 1
+            self.num_retries += 1
+            await asyncio.sleep(delay)
+
+    def _get_url(self):
+        if self.api_type in AZURE_API_TYPES:
+            return (
+                f"{self.api_base}/openai/deployments/{self.deployment_id}"
+                f"/embeddings?api-version={self.api_version}"
+            )
+
+        return f"{self.api_base}/embeddings"
+
+    def _get_headers(self):
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            if self.api_type == "azure":
+                headers["api-key"] = self.api_key
+            else:
+                headers["Authorization"] = f"Bearer {self.api_key}"
+
+        if self.organization:
+            headers["OpenAI-Organization"] = self.organization
+
+        return headers
+
+    def _sync_buckets(self, headers):
+        self._request_bucket.sync(
+            _parse_int(headers.get("x-ratelimit-remaining-requests", None)),
+            parse_duration(headers.get("x-ratelimit-reset-requests", None)),
+        )
+        self._token_bucket.sync(
+            _parse_int(headers.get("x-ratelimit-remaining-tokens", None)),
+            parse_duration(headers.get("x-ratelimit-reset-tokens", None)),
+        )
+
+    def _get_backoff(self, attempt, retry_after):
+        if retry_after is not None:
+            return retry_after + random.uniform(0, 0.1 * retry_after + 0.05)
+
+        ## exponential backoff with full jitter, capped at one minute
+        return random.uniform(0, min(60.0, 0.5 * 2**attempt))
@@ -0,0 +1,213 @@
+"""
+HTML content extraction declarations.
+
+Sphinx pages wrap the document itself in navigation, sidebars, scripts and
+footers. :func:`extract_content_html` finds the document body in a single
+streaming pass over the page, so that only the body needs to be converted to
+markdown.
+
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+
+import re
+
+## elements that never have an end tag
+VOID_ELEMENTS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "param",
+    "source",
+    "track",
+    "wbr",
+}
+
+## elements whose contents are not parsed as HTML
+RAW_TEXT_ELEMENTS = {"script", "style", "textarea", "title"}
+
+## elements that are dropped along with their contents
+DROPPED_ELEMENTS = {"script", "style", "noscript", "template"}
+
+_TOKEN_PATTERN = re.compile(
+    r"<!--.*?-->"
+    r"|<[!?][^>]*>"
+    r"|<(/?)([a-zA-Z][^\s/>]*)((?:[^>\"']|\"[^\"]*\"|'[^']*')*)>",
+    re.DOTALL,
+)
+_ATTR_PATTERN = re.compile(
+    r"""([^\s=/>"']+)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s>]+))?"""
+)
+_RAW_TEXT_END_PATTERNS = {}
+
+################################################################
+
+
+def _parse_attrs(attrs_text):
+    attrs = {}
+    for name, value in _ATTR_PATTERN.findall(attrs_text):
+        if value[:1] in ("'", '"'):
+            value = value[1:-1]
+
+        attrs.setdefault(name.lower(), value)
+
+    return attrs
+
+
+def _get_content_priority(tag, attrs_text):
+    """Returns the priority of the given element as the content region of a
+    page, where lower is better, or ``None`` if it can't be one.
+    """
+    ## most elements are ruled out without parsing their attributes, whose
+    ## names are case-insensitive
+    attrs_lower = attrs_text.lower()
+    if tag == "article":
+        if "itemprop" not in attrs_lower and "role" not in attrs_lower:
+            return None
+    elif "role" not in attrs_lower and not (
+        tag == "div" and "body" in attrs_lower
+    ):
+        return None
+
+    attrs = _parse_attrs(attrs_text)
+
+    ## the pytorch theme, which the FiftyOne docs use
+    if tag == "article" and attrs.get("itemprop", None) == "articleBody":
+        return 0
+
+    if attrs.get("role", None) == "main":
+        return 1
+
+    ## the classic and alabaster themes
+    if tag == "div" and "body" in attrs.get("class", "").split():
+        return 2
+
+    return None
+
+
+def _find_raw_text_end(page_html, tag, pos):
+    pattern = _RAW_TEXT_END_PATTERNS.get(tag, None)
+    if pattern is None:
+        pattern = re.compile(r"</%s\s*>" % tag, re.IGNORECASE)
+        _RAW_TEXT_END_PATTERNS[tag] = pattern
+
+    match = pattern.search(page_html, pos)
+    if match is None:
+        return len(page_html)
+
+    return match.end()
+
+
+def _find_content(page_html):
+    """Scans the tags of a page once, and returns the span of its content
+    region, or ``None``, and the spans of the elements to drop.
+    """
+    content_span = None
+    content_priority = None
+    dropped_spans = []
+    stack = []
+
+    pos = 0
+    while True:
+        match = _TOKEN_PATTERN.search(page_html, pos)
+        if match is None:
+            break
+
+        pos = match.end()
+        start = match.start()
+        tag = match.group(2)
+        if tag is None:
+            ## comments, doctypes and processing instructions
+            continue
+
+        tag = tag.lower()
+        attrs_text = match.group(3)
+
+        if not match.group(1):
+            if tag in RAW_TEXT_ELEMENTS:
+                pos = _find_raw_text_end(page_html, tag, pos)
+                if tag in DROPPED_ELEMENTS:
+                    dropped_spans.append((start, pos))
+
+                continue
+
+            if tag in VOID_ELEMENTS:
+                ## inline images are huge, and become noise in the markdown
+                if tag == "img" and "data:" in attrs_text:
+                    src = _parse_attrs(attrs_text).get("src", "")
+                    if src.startswith("data:"):
+                        dropped_spans.append((start, pos))
+
+                continue
+
+            priority = _get_content_priority(tag, attrs_text)
+            stack.append((tag, start, priority))
+            continue
+
+        ## unclosed elements are implicitly closed by their parent's end tag
+        for i in range(len(stack) - 1, -1, -1):
+            if stack[i][0] == tag:
+                break
+        else:
+            continue
+
+        _, start, priority = stack[i]
+        del stack[i:]
+
+        if tag in DROPPED_ELEMENTS:
+            dropped_spans.append((start, pos))
+
+        if priority is not None and (
+            content_priority is None or priority < content_priority
+        ):
+            content_span = (start, pos)
+            content_priority = priority
+
+            ## nothing later in the page can be a better match
+            if priority == 0:
+                break
+
+    return content_span, dropped_spans
+
+
+def extract_content_html(page_html):
+    """Extracts the document body of a Sphinx HTML page.
+
+    The body is the ``<article itemprop="articleBody">`` element used by the
+    pytorch theme, or else the ``role="main"`` element, or else the
+    ``<div class="body">`` element of the classic themes. If a page has none
+    of these, the whole page is used.
+
+    Scripts, styles and inline ``data:`` images are dropped from the body.
+
+    Args:
+        page_html: the HTML string of a page
+
+    Returns:
+        the HTML string of the body
+    """
+    content_span, dropped_spans = _find_content(page_html)
+    if content_span is not None:
+        start, end = content_span
+    else:
+        start, end = 0, len(page_html)
+
+    parts = []
+    pos = start
+    for drop_start, drop_end in sorted(dropped_spans):
+        if drop_end <= pos or drop_start >= end:
+            continue
+
+        parts.append(page_html[pos : max(pos, drop_start)])
+        pos = max(pos, drop_end)
+
+    parts.append(page_html[pos:end])
+    return "".join(parts)
@@ -0,0 +1,246 @@
+"""
+JSON index reading and writing declarations.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+
+import json
+import os
+
+_WHITESPACE = " \t\n\r"
+
+################################################################
+
+
+class _JSONStream(object):
+    """Incrementally decodes JSON values from a text file, holding only a
+    bounded window of the file in memory.
+    """
+
+    def __init__(self, f, read_size):
+        self._f = f
+        self._read_size = read_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _read(self, read_size):
+        if self._eof:
+            return False
+
+        chunk = self._f.read(read_size)
+        if not chunk:
+            self._eof = True
+            return False
+
+        ## drop the consumed prefix before growing the buffer
+        if self._pos > 0:
+            self._buf = self._buf[self._pos :]
+            self._pos = 0
+
+        self._buf += chunk
+        return True
+
+    def peek(self):
+        """Skips whitespace and returns the next character, or ``None`` at
+        the end of the file.
+        """
+        while True:
+            buf = self._buf
+            pos = self._pos
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+
+            self._pos = pos
+            if pos < len(buf):
+                return buf[pos]
+
+            if not self._read(self._read_size):
+                return None
+
+    def expect(self, chars):
+        char = self.peek()
+        if char is None or char not in chars:
+            raise ValueError(
+                f"Expected one of {list(chars)} but found {char!r} in JSON "
+                "index"
+            )
+
+        self._pos += 1
+        return char
+
+    def decode(self):
+        self.peek()
+
+        read_size = self._read_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._read(read_size):
+                    raise
+            else:
+                ## a value that ends exactly at the end of the buffer may be
+                ## truncated (e.g. a number), so make sure there's more input
+                if end < len(self._buf) or not self._read(read_size):
+                    self._pos = end
+                    return value
+
+            ## grow reads geometrically so that huge values don't cause
+            ## quadratic re-decoding
+            read_size *= 2
+
+
+def is_jsonl_index(path):
+    return path.endswith(".jsonl")
+
+
+def iter_json_index(path, read_size=1024**2):
+    """Iterates over the ``(id, value)`` pairs of a JSON index file without
+    loading the whole file into memory.
+
+    The index must be a single JSON object mapping point IDs to values.
+
+    Args:
+        path: the path to the JSON index
+        read_size (1MB): the number of characters to read at a time
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        stream = _JSONStream(f, read_size)
+        stream.expect("{")
+        if stream.peek() == "}":
+            return
+
+        while True:
+            id = stream.decode()
+            stream.expect(":")
+            value = stream.decode()
+            yield id, value
+
+            if stream.expect(",}") == "}":
+                return
+
+
+def iter_jsonl_index(path):
+    """Iterates over the ``(id, value)`` pairs of a JSONL index file, which
+    contains one JSON object per line with an ``id`` field.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+
+            value = json.loads(line)
+            yield value.pop("id"), value
+
+
+def iter_index_records(path):
+    """Iterates over the ``(id, value)`` pairs of a JSON or JSONL index."""
+    if is_jsonl_index(path):
+        return iter_jsonl_index(path)
+
+    return iter_json_index(path)
+
+
+################################################################
+
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(",", ":"))
+
+
+class _IndexFileWriter(object):
+    """Base class for writers that stream points to a temporary file, which
+    replaces the index at ``path`` only once the writer is successfully
+    closed, so that a failed write never clobbers an existing index.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._tmp_path = path + ".tmp"
+        self._f = open(self._tmp_path, "w", encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(commit=exc_type is None)
+
+    def add(self, ids, vectors, payloads):
+        raise NotImplementedError("subclass must implement add()")
+
+    def _finish(self):
+        pass
+
+    def close(self, commit=True):
+        """Closes the index file.
+
+        Args:
+            commit (True): whether to move the written index to ``path``. If
+                False, the written points are discarded
+        """
+        if self._f is None:
+            return
+
+        try:
+            if commit:
+                self._finish()
+        finally:
+            self._f.close()
+            self._f = None
+
+        if commit:
+            os.replace(self._tmp_path, self.path)
+        else:
+            os.remove(self._tmp_path)
+
+
+class JSONIndexWriter(_IndexFileWriter):
+    """Streams points to a JSON index, which is a single JSON object mapping
+    point IDs to their vector and payload.
+
+    The index is written to a temporary file that replaces ``path`` when the
+    writer is closed, unless it is used as a context manager whose block
+    raised an error, in which case any existing index is left untouched.
+
+    Args:
+        path: the path to write the index to
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._f.write("{")
+
+    def add(self, ids, vectors, payloads):
+        for id, vector, payload in zip(ids, vectors, payloads):
+            if self.count > 0:
+                self._f.write(",")
+
+            record = {"vector": vector, **payload}
+            self._f.write(_dumps(str(id)) + ":" + _dumps(record))
+            self.count += 1
+
+    def _finish(self):
+        self._f.write("}")
+
+
+class JSONLIndexWriter(_IndexFileWriter):
+    """Streams points to a JSONL index, which contains one JSON object per
+    point with its ID, vector and payload.
+
+    The index is written to a temporary file that replaces ``path`` when the
+    writer is closed, unless it is used as a context manager whose block
+    raised an error, in which case any existing index is left untouched.
+
+    Args:
+        path: the path to write the index to
+    """
+
+    def add(self, ids, vectors, payloads):
+        for id, vector, payload in zip(ids, vectors, payloads):
+            record = {"id": id, "vector": vector, **payload}
+            self._f.write(_dumps(record) + "\n")
+            self.count += 1
@@ -0,0 +1,346 @@
+"""
+Lexical index declarations.
+
+A lexical index is a BM25 inverted index over the chunk texts of a
+collection. It is stored as a single JSON file containing:
+
+-   the format version and BM25 parameters
+-   the ID and payload of each point
+-   the length, in tokens, of each point's text
+-   a ``term -> [point indices, term frequencies]`` postings dict
+
+Lexical searches run entirely in-process, so they need neither an embedding
+request nor a search server.
+
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+
+from collections import Counter
+import json
+import math
+import os
+import re
+import uuid
+
+import fiftyone.core.utils as fou
+
+from fiftyone.docs_search.common import FIFTYONE_DOCS_INDEX_FOLDER
+
+np = fou.lazy_import("numpy")
+
+LEXICAL_INDEX_FORMAT = "fiftyone-docs-lexical-index"
+LEXICAL_INDEX_VERSION = 1
+
+## the standard BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_PATTERN = re.compile(r"\w+(?:\.\w+)*")
+_PART_PATTERN = re.compile(r"[._]+")
+
+################################################################
+
+
+def get_lexical_index_path(collection_name):
+    return os.path.join(
+        FIFTYONE_DOCS_INDEX_FOLDER, f"{collection_name}_lexical_index.json"
+    )
+
+
+def normalize_point_id(id):
+    """Returns the given point ID in the form that Qdrant returns it, so that
+    the IDs of lexical and vector results can be compared.
+    """
+    if isinstance(id, int):
+        return id
+
+    try:
+        return str(uuid.UUID(str(id)))
+    except ValueError:
+        return id
+
+
+def tokenize(text):
+    """Returns the lowercase terms of the given text.
+
+    Identifiers such as ``compute_embeddings`` or ``fo.load_dataset`` are
+    kept whole, so that they match exactly, and are also split into their
+    parts, so that they match queries like "load dataset".
+    """
+    ## markdown escapes the underscores of identifiers in prose
+    text = text.replace("\\_", "_").lower()
+
+    terms = []
+    for term in _TOKEN_PATTERN.findall(text):
+        terms.append(term)
+        if "_" in term or "." in term:
+            terms.extend(part for part in _PART_PATTERN.split(term) if part)
+
+    return terms
+
+
+################################################################
+
+
+class LexicalIndexBuilder(object):
+    """Builds a :class:`LexicalIndex` from the points of a collection.
+
+    Args:
+        k1 (None): the BM25 term frequency saturation. By default, ``BM25_K1``
+            is used
+        b (None): the BM25 length normalization. By default, ``BM25_B`` is
+            used
+    """
+
+    def __init__(self, k1=None, b=None):
+        if k1 is None:
+            k1 = BM25_K1
+
+        if b is None:
+            b = BM25_B
+
+        self.k1 = k1
+        self.b = b
+
+        self._ids = []
+        self._payloads = []
+        self._lengths = []
+        self._postings = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, ids, payloads):
+        """Adds the given points to the index.
+
+        Points without a doc type are skipped, since they are never returned
+        by searches.
+        """
+        for id, payload in zip(ids, payloads):
+            if payload.get("doc_type", None) is None:
+                continue
+
+            ind = len(self._ids)
+            terms = tokenize(payload.get("text", ""))
+
+            self._ids.append(normalize_point_id(id))
+            self._payloads.append(payload)
+            self._lengths.append(len(terms))
+
+            for term, count in Counter(terms).items():
+                postings = self._postings.get(term, None)
+                if postings is None:
+                    postings = ([], [])
+                    self._postings[term] = postings
+
+                postings[0].append(ind)
+                postings[1].append(count)
+
+    def build(self):
+        """Returns a :class:`LexicalIndex` of the points added so far."""
+        return LexicalIndex(
+            self._ids,
+            self._payloads,
+            self._lengths,
+            self._postings,
+            k1=self.k1,
+            b=self.b,
+        )
+
+    def write(self, path):
+        """Writes the index to the given JSON file.
+
+        The file is written atomically, so that searches never read a
+        partially written index.
+        """
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        index = {
+            "format": LEXICAL_INDEX_FORMAT,
+            "version": LEXICAL_INDEX_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "ids": self._ids,
+            "payloads": self._payloads,
+            "lengths": self._lengths,
+            "postings": self._postings,
+        }
+
+        ## `json.dump()` encodes in pure Python, which is much slower than
+        ## `json.dumps()` for an object this large
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps(index, separators=(",", ":")))
+        os.replace(tmp_path, path)
+
+
+class LexicalIndex(object):
+    """A BM25 index over the chunk texts of a collection.
+
+    Use :class:`LexicalIndexBuilder` to create an index, and
+    :func:`load_lexical_index` to load one from disk.
+
+    Args:
+        ids: a list of point IDs
+        payloads: a list of point payloads
+        lengths: a list of the number of terms of each point's text
+        postings: a ``term -> (point indices, term frequencies)`` dict
+        k1 (None): the BM25 term frequency saturation
+        b (None): the BM25 length normalization
+    """
+
+    def __init__(self, ids, payloads, lengths, postings, k1=None, b=None):
+        if k1 is None:
+            k1 = BM25_K1
+
+        if b is None:
+            b = BM25_B
+
+        self.ids = ids
+        self.payloads = payloads
+        self.k1 = k1
+        self.b = b
+
+        lengths = np.asarray(lengths, dtype=np.float32)
+        avg_length = float(lengths.mean()) if len(lengths) else 1.0
+
+        ## the length normalization of each point, which is the same for
+        ## every term
+        self._norms = k1 * (1 - b + b * lengths / max(avg_length, 1.0))
+        self._postings = postings
+        self._arrays = {}
+
+        doc_types = [payload.get("doc_type", None) for payload in payloads]
+        self.doc_type_masks = {
+            dt: np.array([t == dt for t in doc_types], dtype=bool)
+            for dt in set(doc_types)
+        }
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get_mask(self, doc_types):
+        """Returns a boolean mask of the points whose doc type is in
+        ``doc_types``, or ``None`` if no points are excluded.
+        """
+        if doc_types is None:
+            return None
+
+        doc_types = set(doc_types)
+        if doc_types.issuperset(self.doc_type_masks.keys()):
+            return None
+
+        mask = np.zeros(len(self.ids), dtype=bool)
+        for dt in doc_types:
+            dt_mask = self.doc_type_masks.get(dt, None)
+            if dt_mask is not None:
+                mask |= dt_mask
+
+        return mask
+
+    def score(self, query):
+        """Returns the BM25 score of every point for the given query."""
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        num_points = len(self.ids)
+        for term in set(tokenize(query)):
+            postings = self._get_postings(term)
+            if postings is None:
+                continue
+
+            inds, counts = postings
+            df = len(inds)
+            idf = math.log(1 + (num_points - df + 0.5) / (df + 0.5))
+            scores[inds] += (
+                idf * counts * (self.k1 + 1) / (counts + self._norms[inds])
+            )
+
+        return scores
+
+    def search(self, query, top_k=10, doc_types=None):
+        """Returns the ``top_k`` points that best match ``query``.
+
+        Points that match none of the query's terms are never returned.
+
+        Args:
+            query: a query string
+            top_k (10): the number of results to return
+            doc_types (None): an optional iterable of doc types to which to
+                restrict the search
+
+        Returns:
+            a list of ``(id, score, payload)`` tuples, sorted by descending
+            score
+        """
+        scores = self.score(query)
+
+        mask = self.get_mask(doc_types)
+        if mask is not None:
+            scores[~mask] = 0
+
+        inds = np.flatnonzero(scores > 0)
+        top_k = min(top_k, len(inds))
+        if top_k <= 0:
+            return []
+
+        if top_k < len(inds):
+            inds = inds[np.argpartition(-scores[inds], top_k - 1)[:top_k]]
+
+        inds = inds[np.argsort(-scores[inds], kind="stable")]
+
+        return [
+            (self.ids[ind], float(scores[ind]), self.payloads[ind])
+            for ind in inds
+        ]
+
+    def _get_postings(self, term):
+        ## postings are converted to arrays the first time they are queried
+        arrays = self._arrays.get(term, None)
+        if arrays is None:
+            postings = self._postings.get(term, None)
+            if postings is None:
+                return None
+
+            arrays = (
+                np.asarray(postings[0], dtype=np.int64),
+                np.asarray(postings[1], dtype=np.float32),
+            )
+            self._arrays[term] = arrays
+
+        return arrays
+
+
+def load_lexical_index(path):
+    """Loads the lexical index at the given path.
+
+    Args:
+        path: the path to a JSON file written by
+            :meth:`LexicalIndexBuilder.write`
+
+    Returns:
+        a :class:`LexicalIndex`
+    """
+    with open(path, "r") as f:
+        index = json.load(f)
+
+    if index.get("format", None) != LEXICAL_INDEX_FORMAT:
+        raise ValueError(f"'{path}' is not a lexical index")
+
+    version = index.get("version", None)
+    if version != LEXICAL_INDEX_VERSION:
+        raise ValueError(
+            f"Unsupported lexical index version {version}; expected "
+            f"{LEXICAL_INDEX_VERSION}"
+        )
+
+    return LexicalIndex(
+        index["ids"],
+        index["payloads"],
+        index["lengths"],
+        index["postings"],
+        k1=index["k1"],
+        b=index["b"],
+    )
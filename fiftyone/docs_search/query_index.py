@@ -5,17 +5,15 @@ Index querying function declaration.
 |
 """
 
-import os
-import qdrant_client as qc
-import qdrant_client.http.models as models
 from rich import print
 import webbrowser
 
-from fiftyone.docs_search.create_index import (
-    download_index,
-    load_index_from_json,
-)
 from fiftyone.docs_search.common import *
+from fiftyone.docs_search.search_backends import (
+    fuse_results,
+    get_search_backend,
+)
+import fiftyone.docs_search.server as dss
 
 ################################################################
 
@@ -28,57 +26,164 @@ def parse_doc_types(doc_types):
     return doc_types
 
 
-################################################################
+def parse_mode(mode):
+    if mode is None:
+        mode = get_search_mode()
+
+    if mode not in SEARCH_MODES:
+        raise ValueError(
+            f"Unsupported search mode '{mode}'. Supported values are "
+            f"{SEARCH_MODES}"
+        )
 
+    return mode
 
-def collection_exists(collection_name):
-    collections = CLIENT.get_collections().collections
-    collection_names = [collection.name for collection in collections]
-    return collection_name in collection_names
 
+################################################################
 
-def query_index(query, top_k=10, doc_types=None):
-    collection_name = get_collection_name()
 
-    if not collection_exists(collection_name):
-        print(f"Collection {collection_name} does not exist. Creating...")
-        if not os.path.exists(FIFTYONE_DOCS_INDEX_FILEPATH):
-            print(
-                f"Index JSON file {FIFTYONE_DOCS_INDEX_FILEPATH} does not exist."
-            )
-            download_index()
-        load_index_from_json()
+def query_index(
+    query,
+    top_k=10,
+    doc_types=None,
+    backend=None,
+    rescore=True,
+    oversampling=None,
+    mode=None,
+):
+    """Searches the docs index.
+
+    Args:
+        query: the query string
+        top_k (10): the number of results to return
+        doc_types (None): the doc types to search over
+        backend (None): the search backend to use
+        rescore (True): whether to rescore quantized results
+        oversampling (None): the oversampling factor for quantized results
+        mode (None): the search mode. Supported values are
+            ``("vector", "lexical", "hybrid")``. Lexical searches use a local
+            BM25 index and never embed the query, and hybrid searches fuse
+            the vector and lexical results with reciprocal rank fusion. By
+            default, the ``FIFTYONE_DOCS_SEARCH_MODE`` environment variable
+            is used, or ``"vector"`` if it is not set
+
+    Returns:
+        a list of ``(url, text, score)`` tuples
+    """
+    mode = parse_mode(mode)
+    doc_types = parse_doc_types(doc_types)
+    backend = get_search_backend(backend)
+
+    if mode == "lexical":
+        results = backend.search_lexical(
+            query, top_k=top_k, doc_types=doc_types
+        )
+        return _format_results(results)
+
+    num_results = _get_num_candidates(top_k, mode)
 
     vector = embed_text(query)
 
-    _search_params = models.SearchParams(hnsw_ef=128, exact=False)
+    results = backend.search(
+        vector,
+        top_k=num_results,
+        doc_types=doc_types,
+        rescore=rescore,
+        oversampling=oversampling,
+    )
 
+    if mode == "hybrid":
+        lexical_results = backend.search_lexical(
+            query, top_k=num_results, doc_types=doc_types
+        )
+        results = fuse_results([results, lexical_results], top_k=top_k)
+
+    return _format_results(results)
+
+
+def query_index_batch(
+    queries,
+    top_k=10,
+    doc_types=None,
+    backend=None,
+    rescore=True,
+    oversampling=None,
+    mode=None,
+):
+    """Runs many queries at once.
+
+    All queries are embedded with as few requests as possible and searched
+    with the backend's batch search, which avoids a round trip per query.
+    Lexical searches skip embedding entirely.
+
+    Args:
+        queries: a list of query strings
+        top_k (10): the number of results to return per query
+        doc_types (None): the doc types to search over
+        backend (None): the search backend to use
+        rescore (True): whether to rescore quantized results
+        oversampling (None): the oversampling factor for quantized results
+        mode (None): the search mode. See :func:`query_index` for details
+
+    Returns:
+        a list containing a list of ``(url, text, score)`` tuples for each
+        query
+    """
+    queries = list(queries)
+    if not queries:
+        return []
+
+    mode = parse_mode(mode)
     doc_types = parse_doc_types(doc_types)
+    backend = get_search_backend(backend)
 
-    _filter = models.Filter(
-        must=[
-            models.Filter(
-                should=[
-                    models.FieldCondition(
-                        key="doc_type",
-                        match=models.MatchValue(value=dt),
-                    )
-                    for dt in doc_types
-                ],
+    if mode == "lexical":
+        return [
+            _format_results(
+                backend.search_lexical(query, top_k=top_k, doc_types=doc_types)
             )
+            for query in queries
         ]
-    )
 
-    results = CLIENT.search(
-        collection_name=collection_name,
-        query_vector=vector,
-        query_filter=_filter,
-        limit=top_k,
-        with_payload=True,
-        search_params=_search_params,
+    num_results = _get_num_candidates(top_k, mode)
+
+    vectors = embed_texts(queries)
+
+    batch_results = backend.search_batch(
+        vectors,
+        top_k=num_results,
+        doc_types=doc_types,
+        rescore=rescore,
+        oversampling=oversampling,
     )
 
-    results = [
+    if mode == "hybrid":
+        batch_results = [
+            fuse_results(
+                [
+                    results,
+                    backend.search_lexical(
+                        query, top_k=num_results, doc_types=doc_types
+                    ),
+                ],
+                top_k=top_k,
+            )
+            for query, results in zip(queries, batch_results)
+        ]
+
+    return [_format_results(results) for results in batch_results]
+
+
+def _get_num_candidates(top_k, mode):
+    ## hybrid searches fuse more candidates than they return
+    if mode == "hybrid":
+        return max(top_k, HYBRID_NUM_CANDIDATES)
+
+    return top_k
+
+
+def _format_results(results):
+    return [
         (
             f"{res.payload['url']}#{res.payload['section_anchor']}",
             res.payload["text"],
@@ -87,8 +192,6 @@ def query_index(query, top_k=10, doc_types=None):
         for res in results
     ]
 
-    return results
-
 
 ################################################################
 
@@ -128,12 +231,25 @@ def print_results(query, results, score=True):
 
 
 def fiftyone_docs_search(
-    query, top_k=10, doc_types=None, score=False, open_url=True
+    query,
+    top_k=10,
+    doc_types=None,
+    score=False,
+    open_url=True,
+    backend=None,
+    rescore=True,
+    oversampling=None,
+    mode=None,
 ):
-    results = query_index(
+    ## runs on the local query server if one is running
+    results = dss.query(
         query,
         top_k=top_k,
         doc_types=doc_types,
+        backend=backend,
+        rescore=rescore,
+        oversampling=oversampling,
+        mode=mode,
     )
 
     print_results(query, results, score=score)
@@ -148,14 +264,31 @@ def fiftyone_docs_search(
 class FiftyOneDocsSearch:
     """Class for handling FiftyOneDocsSearch queries."""
 
-    def __init__(self, top_k=None, doc_types=None, score=False, open_url=True):
+    def __init__(
+        self,
+        top_k=None,
+        doc_types=None,
+        score=False,
+        open_url=True,
+        backend=None,
+        mode=None,
+    ):
         self.default_top_k = top_k
         self.default_doc_types = doc_types
         self.default_score = score
         self.default_open_url = open_url
+        self.default_backend = backend
+        self.default_mode = mode
 
     def __call__(
-        self, query, top_k=None, doc_types=None, score=None, open_url=None
+        self,
+        query,
+        top_k=None,
+        doc_types=None,
+        score=None,
+        open_url=None,
+        backend=None,
+        mode=None,
     ):
         args_dict = {}
 
@@ -179,4 +312,14 @@ class FiftyOneDocsSearch:
         if open_url is not None:
             args_dict["open_url"] = open_url
 
+        if backend is None:
+            backend = self.default_backend
+        if backend is not None:
+            args_dict["backend"] = backend
+
+        if mode is None:
+            mode = self.default_mode
+        if mode is not None:
+            args_dict["mode"] = mode
+
         fiftyone_docs_search(query, **args_dict)
@@ -6,20 +6,54 @@ Declaration of document reading functions.
 """
 
 from glob import glob
+import hashlib
+from importlib import metadata
+import json
+import multiprocessing
 import os.path
 import os
 import re
-
-from langchain.schema import Document
-from langchain.text_splitter import MarkdownTextSplitter
+import sys
 
 import fiftyone.core.utils as fou
 
+from fiftyone.docs_search.chunking import MarkdownChunker
+from fiftyone.docs_search.common import (
+    CHUNKING_TYPES,
+    get_chunk_overlap,
+    get_chunk_size,
+    get_chunk_unit,
+    get_chunking,
+    get_parse_cache,
+)
+from fiftyone.docs_search.extract_html import extract_content_html
+
 md = fou.lazy_import("markdownify")
 
 ################################################################
 
-splitter = MarkdownTextSplitter(chunk_size=1000)
+_SPLITTER = None
+
+
+def get_splitter():
+    global _SPLITTER
+
+    if _SPLITTER is None:
+        chunking = get_chunking()
+        if chunking not in CHUNKING_TYPES:
+            raise ValueError(
+                f"Invalid chunking '{chunking}'. Supported values are "
+                f"{CHUNKING_TYPES}"
+            )
+
+        _SPLITTER = MarkdownChunker(
+            chunk_size=get_chunk_size(),
+            chunk_overlap=get_chunk_overlap(),
+            unit=get_chunk_unit(),
+            compat=chunking == "compat",
+        )
+
+    return _SPLITTER
 
 
 def get_docs_list():
@@ -185,16 +219,47 @@ def remove_bad_elements(page_md):
 
 
 def remove_links(page_md):
-    match = re.search("\[.*?\]\(.*?\)", page_md)
-    if match is not None:
-        start, end = match.span()
-        link = page_md[start:end]
-        link_text = link[1:].split("]")[0]
+    """Replaces each markdown link with its text, except for ``¶`` permalinks,
+    which are duplicated so that :func:`split_at_anchors` can find them.
+
+    Links are matched like the pattern ``\[.*?\]\(.*?\)``: from a ``[``, up
+    to the first ``](`` on the same line and then the first ``)``. If a ``[``
+    starts no link, no later ``[`` on its line does either, so the page is
+    scanned once, in linear time.
+    """
+    parts = []
+    pos = 0
+    eol = -1
+    start = page_md.find("[")
+    while start >= 0:
+        if start > eol:
+            eol = page_md.find("\n", start)
+            if eol < 0:
+                eol = len(page_md)
+
+        mid = page_md.find("](", start + 1, eol)
+        end = page_md.find(")", mid + 2, eol) if mid >= 0 else -1
+        if end < 0:
+            start = page_md.find("[", eol)
+            continue
+
+        end += 1
+        link_text = page_md[start + 1 : mid].split("]")[0]
         if link_text != "¶":
-            return page_md[:start] + link_text + remove_links(page_md[end:])
+            parts.append(page_md[pos:start])
+            parts.append(link_text)
         else:
-            return page_md[:end] + link + remove_links(page_md[end:])
-    return page_md
+            parts.append(page_md[pos:end])
+            parts.append(page_md[start:end])
+
+        pos = end
+        start = page_md.find("[", pos)
+
+    if not parts:
+        return page_md
+
+    parts.append(page_md[pos:])
+    return "".join(parts)
 
 
 def reformat_markdown(page_md):
@@ -220,7 +285,12 @@ def remove_unicode(page_md):
     return page_md
 
 
-def parse_page_markdown(page_md):
+def parse_page_markdown_staged(page_md):
+    """Cleans the markdown of a docs page by running each cleaning function
+    over the whole page in turn.
+
+    This is the reference implementation of :func:`parse_page_markdown`.
+    """
     page_md = remove_header(page_md)
     page_md = remove_footer(page_md)
     page_md = remove_line_numbers(page_md)
@@ -237,10 +307,324 @@ def parse_page_markdown(page_md):
     return page_md
 
 
+################################################################
+
+_FENCE = "```"
+_OPEN_FENCE = "```py"
+_FOOTER = "[Next ![]"
+_FUNCTION_START = "(function() {"
+_BAD_KEYWORDS = ("#focontainer", "#fooverlay", "#foactivate")
+
+_CODE_LINE_NUMBER_PATTERN = re.compile(r"^[^\S\n]*\d+[^\S\n]*", re.MULTILINE)
+_EMPTY_CODE_BLOCK_PATTERN = re.compile(r"```py\s*```")
+_BASE64_IMAGE_PATTERN = re.compile(r"!\[\]\(data:image/png;base64.*?\)")
+_IMAGE_NAME_PATTERN = re.compile(r"![\w-]+")
+_FUNCTION_PATTERN = re.compile(r"\(function\(\) {[\s\S]*?}\)\(\);")
+_CODE_CELL_VESTIGE_PATTERN = re.compile(r"\[\s*\d*\]:")
+_OPEN_BRACKET_PATTERN = re.compile(r"\[\s*")
+_EXTRA_NEWLINES_PATTERN = re.compile(r"\n{3,}")
+_UNICODE_REPLACEMENTS = {
+    "\u2500": "",
+    "\u2514": "",
+    "\u251c": "",
+    "\u2502": "",
+    "\u2588": "'",
+    "\u2019": "'",
+    "\u201d": '"',
+    "\u201c": '"',
+    "\u00a9": "copyright",
+}
+_UNICODE_PATTERN = re.compile("[%s]" % "".join(_UNICODE_REPLACEMENTS))
+
+
+def _replace_unicode(match):
+    return _UNICODE_REPLACEMENTS[match.group(0)]
+
+
+def _filter_table_rows(text, keep_first, keep_last):
+    ## the first and last lines of a block share their line with a code
+    ## fence, so they are never table rows
+    lines = text.split("\n")
+    start = 1 if keep_first else 0
+    end = max(len(lines) - 1 if keep_last else len(lines), start)
+    body = [line for line in lines[start:end] if not line or line.strip("| -")]
+    return "\n".join(lines[:start] + body + lines[end:])
+
+
+def _clean_code_blocks(page_md):
+    """Applies the code block stages of the cleaning pipeline, from
+    :func:`remove_line_numbers` through :func:`merge_adjacent_code_blocks`,
+    or returns ``None`` if the page has an unmatched code fence.
+    """
+    blocks = page_md.split(_FENCE)
+    if len(blocks) % 2 == 0:
+        return None
+
+    num_blocks = len(blocks)
+    for i, block in enumerate(blocks):
+        if i % 2 == 1:
+            block = _CODE_LINE_NUMBER_PATTERN.sub("", block)
+
+        blocks[i] = _filter_table_rows(block, i > 0, i < num_blocks - 1)
+
+    ## empty code blocks are dropped, and the staged pipeline then pairs the
+    ## remaining code blocks with the leading text blocks
+    codes = [cb for cb in blocks[1::2] if cb.strip() and cb.strip("| -\n")]
+    parts = []
+    for tb, cb in zip(blocks[::2], codes):
+        parts.extend((tb, _FENCE, cb, _FENCE))
+
+    parts.append(blocks[-1])
+    page_md = "".join(parts)
+    if _OPEN_FENCE in page_md:
+        page_md = _EMPTY_CODE_BLOCK_PATTERN.sub("", page_md)
+
+    blocks = page_md.split(_FENCE)
+    codes = [cb for cb in blocks[1::2] if cb.strip() and cb.strip("| -")]
+    parts = []
+    for tb, cb in zip(blocks[::2], codes):
+        parts.extend((tb, _OPEN_FENCE, cb, _FENCE))
+
+    parts.append(blocks[-1])
+    page_md = "".join(parts)
+
+    page_md = page_md.replace("```\n```py", "")
+    return page_md.replace("```py\n```py", "```py")
+
+
+class _FallbackError(Exception):
+    pass
+
+
+def _get_fence_type(line):
+    ## fences may be indented, but must otherwise be alone on their line
+    prefix, fence, suffix = line.partition(_FENCE)
+    if prefix.strip() or _FENCE in suffix:
+        raise _FallbackError()
+
+    if suffix == "py":
+        return _OPEN_FENCE
+
+    if suffix == "":
+        return _FENCE
+
+    raise _FallbackError()
+
+
+class _LineCleaner(object):
+    """Streams lines through the reformatting stages of the cleaning
+    pipeline, from :func:`reformat_markdown` onwards.
+
+    Every stage is either a per-line rewrite, a per-line filter, or a small
+    amount of state (the current run of empty lines, whether a bad element
+    is being skipped, and the current code block), so each line is visited
+    once.
+    """
+
+    def __init__(self):
+        self.lines = []
+        self._num_empty = 0
+        self._seen_text = False
+        self._captured = None
+        self._keep = True
+        self._code = None
+        self._code_prefix = None
+
+    def add(self, line):
+        if "`" in line and _FENCE in line:
+            _get_fence_type(line)
+            self._add_collapsed(line)
+            return
+
+        if "\\" in line:
+            line = line.replace("\\_", "_").replace("\\*", "*")
+
+        if "[" in line:
+            line = remove_links(line)
+
+        if "!" in line:
+            if "![](data:image/png;base64" in line:
+                line = _BASE64_IMAGE_PATTERN.sub("", line)
+
+            if line[:1] == "!" and _IMAGE_NAME_PATTERN.fullmatch(line):
+                line = ""
+
+        if line:
+            if _FENCE in line:
+                raise _FallbackError()
+
+            if line[0] == "{" or "jupyter-widgets" in line:
+                return
+
+            if line.startswith("<?xml"):
+                return
+
+            if line.strip() == "!":
+                return
+
+        self._add_collapsed(line)
+
+    def close(self):
+        n = self._num_empty
+        if self._seen_text:
+            self._add_empty(2 if n >= 3 else n)
+        else:
+            ## the page is all empty lines
+            self._add_empty(3 if n >= 4 else n)
+
+        if self._captured is not None:
+            captured = "\n".join(self._captured)
+            captured = _FUNCTION_PATTERN.sub("", captured)
+            self._captured = None
+            for line in captured.split("\n"):
+                self._add_element(line)
+
+        if self._code is not None:
+            raise _FallbackError()
+
+    def _add_collapsed(self, line):
+        ## runs of three or more newlines are collapsed to two
+        if not line:
+            self._num_empty += 1
+            return
+
+        n = self._num_empty
+        if n:
+            if self._seen_text:
+                self._add_empty(1 if n >= 2 else n)
+            else:
+                self._add_empty(2 if n >= 3 else n)
+
+            self._num_empty = 0
+
+        self._seen_text = True
+        if self._captured is None and _FUNCTION_START not in line:
+            self._add_element(line)
+        else:
+            self._capture(line)
+
+    def _add_empty(self, n):
+        for _ in range(n):
+            if self._captured is None:
+                self._add_element("")
+            else:
+                self._captured.append("")
+
+    def _capture(self, line):
+        ## inline scripts may span many lines, so once one starts, the rest
+        ## of the page is captured and stripped of them all at once
+        if self._captured is None:
+            self._captured = []
+
+        self._captured.append(line)
+
+    def _add_element(self, line):
+        if line.startswith("@import"):
+            return
+
+        if not self._keep or any(kw in line for kw in _BAD_KEYWORDS):
+            self._keep = "}" in line
+            if _FENCE in line:
+                raise _FallbackError()
+
+            return
+
+        if line[:1] == "[":
+            if _CODE_CELL_VESTIGE_PATTERN.fullmatch(line):
+                line = ""
+            elif _OPEN_BRACKET_PATTERN.fullmatch(line):
+                ## vestiges may span lines
+                raise _FallbackError()
+
+        if "`" in line and _FENCE in line:
+            self._add_fence(line)
+        elif self._code is not None:
+            self._code.append(line)
+        elif "!" not in line or line.strip() != "!":
+            self.lines.append(line)
+
+    def _add_fence(self, line):
+        fence_type = _get_fence_type(line)
+        if self._code is None:
+            if fence_type != _OPEN_FENCE:
+                raise _FallbackError()
+
+            self._code = []
+            self._code_prefix = line
+            return
+
+        if fence_type != _FENCE:
+            raise _FallbackError()
+
+        code = self._code
+        self._code = None
+        if not any(l.strip() for l in code):
+            ## code blocks that contain only whitespace are removed, leaving
+            ## the indentation of their opening fence
+            self.lines.append(self._code_prefix[: -len(_OPEN_FENCE)])
+            return
+
+        self.lines.append(self._code_prefix)
+        self.lines.extend(l for l in code if "!" not in l or l.strip() != "!")
+        self.lines.append(line)
+
+
+def _clean_page_markdown_fused(page_md):
+    if page_md.startswith("#"):
+        start = 0
+    else:
+        start = page_md.find("\n#")
+        if start < 0:
+            return ""
+
+        start += 1
+
+    page_md = page_md[start:]
+    end = page_md.find(_FOOTER)
+    if end >= 0:
+        page_md = page_md[:end]
+
+    page_md = _clean_code_blocks(page_md)
+    if page_md is None:
+        return None
+
+    cleaner = _LineCleaner()
+    try:
+        for line in page_md.split("\n"):
+            cleaner.add(line)
+
+        cleaner.close()
+    except _FallbackError:
+        return None
+
+    page_md = "\n".join(cleaner.lines)
+    page_md = _EXTRA_NEWLINES_PATTERN.sub("\n\n", page_md)
+    return _UNICODE_PATTERN.sub(_replace_unicode, page_md)
+
+
+def parse_page_markdown(page_md):
+    """Cleans the markdown of a docs page.
+
+    The page is cleaned by a fused engine that groups its lines into text
+    and code blocks in one pass and then streams them through every
+    reformatting stage in a second pass. The output is identical to
+    :func:`parse_page_markdown_staged`, which is used instead for the rare
+    pages whose structure the fused engine doesn't model, such as code fences
+    that share a line with other text.
+    """
+    result = _clean_page_markdown_fused(page_md)
+    if result is None:
+        result = parse_page_markdown_staged(page_md)
+
+    return result
+
+
 def get_page_markdown(filepath):
     with open(filepath) as f:
         page_html = f.read()
 
+    ## only the document body is converted, not the navigation and footers
+    page_html = extract_content_html(page_html)
     page_md = md.markdownify(page_html, heading_style="ATX")
     page_md = parse_page_markdown(page_md)
 
@@ -266,9 +650,7 @@ def split_at_anchors(page_md):
 
 
 def split_section_into_chunks(text):
-    document = Document(page_content=text)
-    documents = splitter.split_documents([document])
-    return [d.page_content for d in documents]
+    return get_splitter().split_text(text)
 
 
 def split_page_into_chunks(page_md):
@@ -280,6 +662,134 @@ def split_page_into_chunks(page_md):
     return chunks
 
 
-def get_markdown_documents(filepath):
+################################################################
+
+## the modules and packages whose code determines how pages are parsed
+PARSE_MODULES = (
+    __name__,
+    "fiftyone.docs_search.chunking",
+    "fiftyone.docs_search.extract_html",
+)
+PARSE_PACKAGES = ("markdownify",)
+
+_PARSE_VERSION = None
+
+
+def get_parse_version():
+    """Returns a version stamp of the parsing pipeline.
+
+    The stamp is a hash of the source of the parsing modules, the versions
+    of the packages they use and the chunking settings, so it changes
+    whenever the chunks that a page is parsed into might change.
+    """
+    global _PARSE_VERSION
+
+    if _PARSE_VERSION is None:
+        h = hashlib.sha256()
+        for module in PARSE_MODULES:
+            with open(sys.modules[module].__file__, "rb") as f:
+                h.update(f.read())
+
+        for package in PARSE_PACKAGES:
+            try:
+                version = metadata.version(package)
+            except metadata.PackageNotFoundError:
+                version = None
+
+            h.update(f"{package}=={version}\n".encode("utf-8"))
+
+        config = json.dumps(get_splitter().config, sort_keys=True)
+        h.update(config.encode("utf-8"))
+
+        _PARSE_VERSION = h.hexdigest()[:16]
+
+    return _PARSE_VERSION
+
+
+def _get_parse_key(cache, filepath):
+    with open(filepath, "rb") as f:
+        return cache.get_key(f.read())
+
+
+def _parse_markdown_documents(filepath):
     page_md = get_page_markdown(filepath)
     return split_page_into_chunks(page_md)
+
+
+def get_markdown_documents(filepath):
+    """Returns the ``anchor -> chunks`` dict of the given HTML doc.
+
+    Parsed pages are cached on disk, keyed by their HTML and
+    :func:`get_parse_version`, unless ``FIFTYONE_DOCS_PARSE_CACHE`` is
+    disabled.
+    """
+    cache = get_parse_cache()
+    if cache is None:
+        return _parse_markdown_documents(filepath)
+
+    key = _get_parse_key(cache, filepath)
+    sections = cache.get(key)
+    if sections is None:
+        sections = _parse_markdown_documents(filepath)
+        cache.put(key, sections)
+
+    return sections
+
+
+def iter_markdown_documents(filepaths, num_workers=None, chunksize=None):
+    """Parses the given HTML docs in a pool of worker processes.
+
+    Yields ``(filepath, chunks)`` tuples in the same order as ``filepaths``,
+    so downstream stages can embed and upsert pages while the remaining pages
+    are still being parsed.
+
+    Pages in the parse cache are not parsed again. The cache is only read
+    and written by the current process.
+
+    Args:
+        filepaths: a list of HTML doc paths
+        num_workers: the number of worker processes to use. By default,
+            ``multiprocessing.cpu_count()`` is used. If ``num_workers <= 1``,
+            the docs are parsed serially in the current process
+        chunksize: the number of docs sent to a worker at a time. By
+            default, the docs are split into roughly four chunks per worker
+    """
+    filepaths = list(filepaths)
+
+    cache = get_parse_cache()
+    if cache is not None:
+        keys = [_get_parse_key(cache, filepath) for filepath in filepaths]
+        cached = [cache.get(key) for key in keys]
+    else:
+        keys = [None] * len(filepaths)
+        cached = [None] * len(filepaths)
+
+    missing = [fp for fp, chunks in zip(filepaths, cached) if chunks is None]
+
+    if num_workers is None:
+        num_workers = multiprocessing.cpu_count()
+    num_workers = min(num_workers, len(missing))
+
+    if num_workers <= 1:
+        results = map(_parse_markdown_documents, missing)
+        yield from _merge_cached(filepaths, keys, cached, results, cache)
+        return
+
+    if chunksize is None:
+        chunksize = max(1, len(missing) // (4 * num_workers))
+
+    with multiprocessing.Pool(processes=num_workers) as pool:
+        results = pool.imap(
+            _parse_markdown_documents, missing, chunksize=chunksize
+        )
+        yield from _merge_cached(filepaths, keys, cached, results, cache)
+
+
+def _merge_cached(filepaths, keys, cached, results, cache):
+    for filepath, key, chunks in zip(filepaths, keys, cached):
+        if chunks is None:
+            chunks = next(results)
+            if cache is not None:
+                cache.put(key, chunks)
+
+        yield filepath, chunks
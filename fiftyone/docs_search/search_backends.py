@@ -0,0 +1,541 @@
+"""
+Search backend declarations.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+
+from collections import namedtuple
+import os
+
+import fiftyone.core.utils as fou
+
+from fiftyone.docs_search.common import *
+from fiftyone.docs_search.lexical_index import (
+    LexicalIndexBuilder,
+    get_lexical_index_path,
+    load_lexical_index,
+    normalize_point_id,
+)
+
+## numpy is only needed by in-process searches, so it is not loaded by
+## queries that are answered by Qdrant or the query server
+np = fou.lazy_import("numpy")
+
+SEARCH_BACKENDS = ("qdrant", "numpy")
+DEFAULT_SEARCH_BACKEND = "qdrant"
+
+## the number of rows converted to float32 at a time when scoring a float16
+## index, which bounds the temporary memory used per query
+_SCORE_BLOCK_SIZE = 8192
+
+## the maximum number of queries sent per batch search request or scored
+## together in-process
+_SEARCH_BATCH_SIZE = 256
+
+SearchResult = namedtuple("SearchResult", ["id", "score", "payload"])
+
+################################################################
+
+
+def get_search_backend_name():
+    backend = os.getenv("FIFTYONE_DOCS_SEARCH_BACKEND")
+    if backend is None or backend == "None":
+        backend = DEFAULT_SEARCH_BACKEND
+    return backend
+
+
+def get_doc_type_filter(doc_types):
+    """Returns a Qdrant filter that restricts results to the given doc types,
+    or ``None`` if no filter is needed because all doc types are selected.
+
+    Points without a doc type are never indexed, so selecting every doc type
+    is the same as not filtering at all.
+    """
+    if doc_types is None:
+        return None
+
+    doc_types = list(doc_types)
+    if set(doc_types).issuperset(DOC_TYPES):
+        return None
+
+    return models.Filter(
+        must=[
+            models.FieldCondition(
+                key="doc_type", match=models.MatchAny(any=doc_types)
+            )
+        ]
+    )
+
+
+def _ensure_json_index():
+    from fiftyone.docs_search.create_index import download_index
+
+    if not os.path.exists(FIFTYONE_DOCS_INDEX_FILEPATH):
+        print(
+            f"Index JSON file {FIFTYONE_DOCS_INDEX_FILEPATH} does not exist."
+        )
+        download_index()
+
+
+################################################################
+
+
+class SearchBackend(object):
+    """Interface for backends that run vector searches over the docs index.
+
+    Backends must implement the `search()` method.
+    """
+
+    def search(
+        self, vector, top_k=10, doc_types=None, rescore=True, oversampling=None
+    ):
+        """Returns the ``top_k`` points most similar to ``vector``.
+
+        Args:
+            vector: the query vector
+            top_k (10): the number of results to return
+            doc_types (None): an optional iterable of doc types to which to
+                restrict the search
+            rescore (True): whether to rescore candidates retrieved with
+                quantized vectors using the full precision vectors. Only
+                applicable to backends that support quantization
+            oversampling (None): the factor by which to oversample candidates
+                before rescoring. Only applicable to backends that support
+                quantization
+
+        Returns:
+            a list of :class:`SearchResult` instances, sorted by descending
+            score
+        """
+        raise NotImplementedError("subclass must implement search()")
+
+    def search_batch(
+        self,
+        vectors,
+        top_k=10,
+        doc_types=None,
+        rescore=True,
+        oversampling=None,
+    ):
+        """Runs :meth:`search` for each of the given query vectors.
+
+        Backends may override this method to search many vectors more
+        efficiently than one at a time.
+
+        Returns:
+            a list containing a list of :class:`SearchResult` instances for
+            each vector
+        """
+        return [
+            self.search(
+                vector,
+                top_k=top_k,
+                doc_types=doc_types,
+                rescore=rescore,
+                oversampling=oversampling,
+            )
+            for vector in vectors
+        ]
+
+    def get_lexical_index(self):
+        """Returns the
+        :class:`fiftyone.docs_search.lexical_index.LexicalIndex` of the
+        points that this backend searches.
+        """
+        raise NotImplementedError(
+            "subclass must implement get_lexical_index()"
+        )
+
+    def search_lexical(self, query, top_k=10, doc_types=None):
+        """Returns the ``top_k`` points whose text best matches ``query``
+        according to BM25.
+
+        Lexical searches run in-process, without embedding the query.
+
+        Args:
+            query: the query string
+            top_k (10): the number of results to return
+            doc_types (None): an optional iterable of doc types to which to
+                restrict the search
+
+        Returns:
+            a list of :class:`SearchResult` instances, sorted by descending
+            score
+        """
+        results = self.get_lexical_index().search(
+            query, top_k=top_k, doc_types=doc_types
+        )
+        return [SearchResult(*result) for result in results]
+
+
+class QdrantSearchBackend(SearchBackend):
+    """Backend that searches a collection on the Qdrant server.
+
+    Lexical searches use the collection's lexical index in
+    ``FIFTYONE_DOCS_INDEX_FOLDER``, which is built from the collection if it
+    does not exist, and reloaded whenever it is rewritten.
+    """
+
+    def __init__(self):
+        self._lexical_index = None
+        self._lexical_index_key = None
+
+    def search(
+        self, vector, top_k=10, doc_types=None, rescore=True, oversampling=None
+    ):
+        collection_name = self._ensure_collection()
+
+        results = get_client().search(
+            collection_name=collection_name,
+            query_vector=vector,
+            query_filter=get_doc_type_filter(doc_types),
+            limit=top_k,
+            with_payload=True,
+            search_params=self._get_search_params(rescore, oversampling),
+        )
+
+        return self._parse_results(results)
+
+    def search_batch(
+        self,
+        vectors,
+        top_k=10,
+        doc_types=None,
+        rescore=True,
+        oversampling=None,
+    ):
+        collection_name = self._ensure_collection()
+
+        _filter = get_doc_type_filter(doc_types)
+        _search_params = self._get_search_params(rescore, oversampling)
+        requests = [
+            models.SearchRequest(
+                vector=list(vector),
+                filter=_filter,
+                limit=top_k,
+                with_payload=True,
+                params=_search_params,
+            )
+            for vector in vectors
+        ]
+
+        batch_results = []
+        for start in range(0, len(requests), _SEARCH_BATCH_SIZE):
+            batch_results.extend(
+                get_client().search_batch(
+                    collection_name=collection_name,
+                    requests=requests[start : start + _SEARCH_BATCH_SIZE],
+                )
+            )
+
+        return [self._parse_results(results) for results in batch_results]
+
+    def get_lexical_index(self):
+        from fiftyone.docs_search.create_index import build_lexical_index
+
+        path = get_lexical_index_path(get_collection_name())
+        if not os.path.exists(path):
+            print(f"Lexical index {path} does not exist. Creating...")
+
+            ## loading a missing collection also builds its lexical index
+            self._ensure_collection()
+            if not os.path.exists(path):
+                build_lexical_index()
+
+        key = (path, os.path.getmtime(path))
+        if key != self._lexical_index_key:
+            self._lexical_index = load_lexical_index(path)
+            self._lexical_index_key = key
+
+        return self._lexical_index
+
+    @staticmethod
+    def _ensure_collection():
+        from fiftyone.docs_search.create_index import load_index_from_json
+
+        collection_name = get_collection_name()
+
+        if not collection_exists(collection_name):
+            print(f"Collection {collection_name} does not exist. Creating...")
+            _ensure_json_index()
+            load_index_from_json()
+
+        validate_collection_embedder(collection_name)
+
+        return collection_name
+
+    @staticmethod
+    def _get_search_params(rescore, oversampling):
+        if oversampling is None:
+            oversampling = DEFAULT_OVERSAMPLING
+
+        ## quantization params are ignored by collections that aren't
+        ## quantized
+        return models.SearchParams(
+            hnsw_ef=128,
+            exact=False,
+            quantization=models.QuantizationSearchParams(
+                rescore=rescore, oversampling=oversampling
+            ),
+        )
+
+    @staticmethod
+    def _parse_results(results):
+        return [
+            SearchResult(res.id, res.score, res.payload) for res in results
+        ]
+
+
+class NumpySearchBackend(SearchBackend):
+    """Backend that searches a memory-mapped binary index in-process.
+
+    Scores are computed with a brute-force dot product over the whole vector
+    matrix, which for an index the size of the docs is faster than a network
+    round trip to a search server. Doc type filters are applied via boolean
+    masks that are precomputed when the index is loaded. Like in Qdrant,
+    points without a doc type are never returned.
+
+    Lexical searches use a lexical index that is built in memory from the
+    payloads of the binary index on first use.
+
+    Args:
+        index_path (None): the binary index directory to search. By default,
+            ``FIFTYONE_DOCS_BINARY_INDEX_PATH`` is used, and it is converted
+            from the JSON index (downloading it if necessary) on first use
+    """
+
+    def __init__(self, index_path=None):
+        from fiftyone.docs_search.binary_index import load_binary_index
+
+        if index_path is None:
+            index_path = FIFTYONE_DOCS_BINARY_INDEX_PATH
+            if not os.path.exists(index_path):
+                self._create_binary_index(index_path)
+
+        self.index_path = index_path
+        self.index = load_binary_index(index_path)
+        validate_binary_index_embedder(self.index)
+        self.vectors = self.index.vectors
+        self.ids = self.index.ids
+        self.payloads = self.index.payloads
+
+        doc_types = [
+            payload.get("doc_type", None) for payload in self.payloads
+        ]
+        self.doc_type_masks = {
+            dt: np.array([t == dt for t in doc_types], dtype=bool)
+            for dt in set(doc_types)
+            if dt is not None
+        }
+        self._all_typed = None not in doc_types
+
+        self._lexical_index = None
+
+    @staticmethod
+    def _create_binary_index(index_path):
+        from fiftyone.docs_search.binary_index import (
+            convert_json_index_to_binary,
+        )
+
+        print(f"Binary index {index_path} does not exist. Creating...")
+        _ensure_json_index()
+
+        ## the downloaded JSON index contains OpenAI embeddings
+        convert_json_index_to_binary(
+            FIFTYONE_DOCS_INDEX_FILEPATH, index_path, MODEL, DIMENSION
+        )
+
+    def get_lexical_index(self):
+        if self._lexical_index is None:
+            builder = LexicalIndexBuilder()
+            builder.add(self.ids, self.payloads)
+            self._lexical_index = builder.build()
+
+        return self._lexical_index
+
+    def get_mask(self, doc_types):
+        """Returns a boolean mask of the points whose doc type is in
+        ``doc_types``, or of all points with a doc type if ``doc_types`` is
+        None, or ``None`` if no points are excluded.
+        """
+        if doc_types is None:
+            doc_types = self.doc_type_masks.keys()
+
+        doc_types = set(doc_types)
+        if self._all_typed and doc_types.issuperset(
+            self.doc_type_masks.keys()
+        ):
+            return None
+
+        mask = np.zeros(len(self.ids), dtype=bool)
+        for dt in doc_types:
+            dt_mask = self.doc_type_masks.get(dt, None)
+            if dt_mask is not None:
+                mask |= dt_mask
+
+        return mask
+
+    def score(self, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        if self.vectors.dtype == np.float32:
+            return self.vectors @ vector
+
+        scores = np.empty(len(self.vectors), dtype=np.float32)
+        for start in range(0, len(self.vectors), _SCORE_BLOCK_SIZE):
+            block = self.vectors[start : start + _SCORE_BLOCK_SIZE]
+            scores[start : start + len(block)] = (
+                block.astype(np.float32) @ vector
+            )
+
+        return scores
+
+    def score_batch(self, vectors):
+        """Returns a ``num_points x len(vectors)`` matrix of scores."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.vectors.dtype == np.float32:
+            return self.vectors @ vectors.T
+
+        scores = np.empty((len(self.vectors), len(vectors)), dtype=np.float32)
+        for start in range(0, len(self.vectors), _SCORE_BLOCK_SIZE):
+            block = self.vectors[start : start + _SCORE_BLOCK_SIZE]
+            scores[start : start + len(block)] = (
+                block.astype(np.float32) @ vectors.T
+            )
+
+        return scores
+
+    def search(
+        self, vector, top_k=10, doc_types=None, rescore=True, oversampling=None
+    ):
+        ## vectors are never quantized, so all scores are full precision
+        scores = self.score(vector)
+        candidates = self._get_candidates(doc_types)
+        if candidates is not None:
+            scores = scores[candidates]
+
+        return self._top_k(scores, top_k, candidates)
+
+    def search_batch(
+        self,
+        vectors,
+        top_k=10,
+        doc_types=None,
+        rescore=True,
+        oversampling=None,
+    ):
+        candidates = self._get_candidates(doc_types)
+
+        batch_results = []
+        for start in range(0, len(vectors), _SEARCH_BATCH_SIZE):
+            scores = self.score_batch(
+                vectors[start : start + _SEARCH_BATCH_SIZE]
+            )
+            if candidates is not None:
+                scores = scores[candidates]
+
+            for query_scores in scores.T:
+                batch_results.append(
+                    self._top_k(query_scores, top_k, candidates)
+                )
+
+        return batch_results
+
+    def _get_candidates(self, doc_types):
+        mask = self.get_mask(doc_types)
+        if mask is None:
+            return None
+
+        return np.flatnonzero(mask)
+
+    def _top_k(self, scores, top_k, candidates=None):
+        top_k = min(top_k, len(scores))
+        if top_k <= 0:
+            return []
+
+        if top_k < len(scores):
+            inds = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            inds = np.arange(len(scores))
+
+        inds = inds[np.argsort(-scores[inds], kind="stable")]
+
+        results = []
+        for ind in inds:
+            point_ind = candidates[ind] if candidates is not None else ind
+            results.append(
+                SearchResult(
+                    self.ids[point_ind],
+                    float(scores[ind]),
+                    self.payloads[point_ind],
+                )
+            )
+
+        return results
+
+
+################################################################
+
+
+_SEARCH_BACKENDS = {}
+
+
+def get_search_backend(backend=None):
+    """Returns the search backend with the given name.
+
+    Backends are created on first use and reused thereafter, so that indexes
+    loaded in-process are only loaded once.
+
+    Args:
+        backend (None): the name of the backend. Supported values are
+            ``("qdrant", "numpy")``. By default, the
+            ``FIFTYONE_DOCS_SEARCH_BACKEND`` environment variable is used, or
+            ``"qdrant"`` if it is not set
+    """
+    if backend is None:
+        backend = get_search_backend_name()
+
+    if backend not in _SEARCH_BACKENDS:
+        if backend == "qdrant":
+            _SEARCH_BACKENDS[backend] = QdrantSearchBackend()
+        elif backend == "numpy":
+            _SEARCH_BACKENDS[backend] = NumpySearchBackend()
+        else:
+            raise ValueError(
+                f"Unsupported search backend '{backend}'. Supported values "
+                f"are {SEARCH_BACKENDS}"
+            )
+
+    return _SEARCH_BACKENDS[backend]
+
+
+def fuse_results(batch_results, top_k=10, k=None):
+    """Fuses ranked result lists with reciprocal rank fusion.
+
+    Each point is scored by the sum of ``1 / (k + rank)`` over the lists that
+    contain it, where ``rank`` starts at 1, and points are identified by
+    their IDs.
+
+    Args:
+        batch_results: a list of lists of :class:`SearchResult` instances,
+            each sorted by descending score
+        top_k (10): the number of results to return
+        k (None): the rank constant. By default, ``RRF_K`` is used
+
+    Returns:
+        a list of :class:`SearchResult` instances whose scores are their
+        fused scores, sorted by descending score
+    """
+    if k is None:
+        k = RRF_K
+
+    scores = {}
+    payloads = {}
+    for results in batch_results:
+        for rank, result in enumerate(results, 1):
+            id = normalize_point_id(result.id)
+            scores[id] = scores.get(id, 0.0) + 1.0 / (k + rank)
+            payloads.setdefault(id, result.payload)
+
+    ids = sorted(scores, key=lambda id: scores[id], reverse=True)[:top_k]
+    return [SearchResult(id, scores[id], payloads[id]) for id in ids]
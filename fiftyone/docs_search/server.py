@@ -0,0 +1,277 @@
+"""
+Local query server declarations.
+
+The server started by ``fiftyone-docs-search serve`` keeps the search backend,
+the collection state and the embedding client's HTTP session warm between
+searches, so that each search costs little more than its embedding request.
+
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import urllib.error
+import urllib.request
+
+from fiftyone.docs_search.common import *
+
+## the keyword arguments of `query_index()` that clients may send
+SEARCH_KWARGS = (
+    "top_k",
+    "doc_types",
+    "backend",
+    "rescore",
+    "oversampling",
+    "mode",
+)
+
+## the timeout of search requests, which include embedding the queries
+REQUEST_TIMEOUT = 120
+
+## the server is always local, so never send requests through HTTP proxies
+_OPENER = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+################################################################
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = "FiftyOneDocsSearch"
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": f"Unknown path '{self.path}'"})
+
+    def do_POST(self):
+        from fiftyone.docs_search.query_index import (
+            query_index,
+            query_index_batch,
+        )
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            kwargs = self.server.get_search_kwargs(body)
+
+            if self.path == "/search":
+                results = query_index(body["query"], **kwargs)
+            elif self.path == "/search_batch":
+                results = query_index_batch(body["queries"], **kwargs)
+            else:
+                self._send_json(404, {"error": f"Unknown path '{self.path}'"})
+                return
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {"error": f"Invalid request: {e}"})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+
+        self._send_json(200, {"results": results})
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, obj):
+        data = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class DocsSearchServer(ThreadingHTTPServer):
+    """A threaded HTTP server that runs docs searches in-process.
+
+    Endpoints:
+
+    -   ``GET /health``: returns ``{"status": "ok"}``
+    -   ``POST /search``: runs ``{"query": ...}`` and returns
+        ``{"results": [[url, text, score], ...]}``
+    -   ``POST /search_batch``: runs ``{"queries": [...]}`` and returns
+        ``{"results": [[[url, text, score], ...], ...]}``
+
+    Search requests may also contain any of ``("top_k", "doc_types",
+    "backend", "rescore", "oversampling", "mode")``.
+
+    Args:
+        host (None): the host to bind to. By default, ``SERVER_HOST`` is used
+        port (None): the port to bind to. By default, the
+            ``FIFTYONE_DOCS_SERVER_PORT`` environment variable or
+            ``SERVER_PORT`` is used
+        backend (None): the search backend used by requests that don't
+            specify one
+        verbose (False): whether to log each request
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host=None, port=None, backend=None, verbose=False):
+        if host is None:
+            host = SERVER_HOST
+
+        if port is None:
+            port = get_server_port()
+
+        self.backend = backend
+        self.verbose = verbose
+        super().__init__((host, port), _RequestHandler)
+
+    def get_search_kwargs(self, body):
+        kwargs = {key: body[key] for key in SEARCH_KWARGS if key in body}
+        if kwargs.get("backend", None) is None:
+            kwargs["backend"] = self.backend
+
+        return kwargs
+
+    def warm_up(self):
+        """Starts the embedder's persistent session and loads the
+        search backend and, if lexical searches are enabled by default, its
+        lexical index, so that the first search is as fast as the rest.
+        """
+        from fiftyone.docs_search.search_backends import (
+            QdrantSearchBackend,
+            get_search_backend,
+        )
+
+        get_embedder().start()
+
+        backend = get_search_backend(self.backend)
+        if isinstance(backend, QdrantSearchBackend):
+            backend._ensure_collection()
+
+        if get_search_mode() != "vector":
+            backend.get_lexical_index()
+
+    def server_close(self):
+        super().server_close()
+        get_embedder().close()
+
+
+def serve(host=None, port=None, backend=None, verbose=False):
+    """Runs a local query server until interrupted.
+
+    See :class:`DocsSearchServer` for details.
+    """
+    server = DocsSearchServer(
+        host=host, port=port, backend=backend, verbose=verbose
+    )
+
+    try:
+        server.warm_up()
+        host, port = server.server_address[:2]
+        print(f"Serving docs search on http://{host}:{port} (Ctrl+C to stop)")
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+################################################################
+
+
+class ServerClient(object):
+    """Client for a server started by ``fiftyone-docs-search serve``.
+
+    Args:
+        host (None): the server's host. By default, ``SERVER_HOST`` is used
+        port (None): the server's port. By default, the
+            ``FIFTYONE_DOCS_SERVER_PORT`` environment variable or
+            ``SERVER_PORT`` is used
+    """
+
+    def __init__(self, host=None, port=None):
+        if host is None:
+            host = SERVER_HOST
+
+        if port is None:
+            port = get_server_port()
+
+        self.url = f"http://{host}:{port}"
+
+    def is_running(self):
+        """Returns whether a docs search server is listening."""
+        try:
+            with _OPENER.open(
+                self.url + "/health", timeout=SERVER_CONNECT_TIMEOUT
+            ) as response:
+                return json.load(response).get("status", None) == "ok"
+        except (OSError, ValueError):
+            return False
+
+    def search(self, query, **kwargs):
+        results = self._post("/search", {"query": query, **kwargs})
+        return [tuple(result) for result in results]
+
+    def search_batch(self, queries, **kwargs):
+        batch_results = self._post(
+            "/search_batch", {"queries": list(queries), **kwargs}
+        )
+        return [
+            [tuple(result) for result in results] for results in batch_results
+        ]
+
+    def _post(self, path, body):
+        request = urllib.request.Request(
+            self.url + path,
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+
+        try:
+            with _OPENER.open(request, timeout=REQUEST_TIMEOUT) as response:
+                return json.load(response)["results"]
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.load(e)["error"]
+            except (KeyError, ValueError):
+                message = e.reason
+
+            raise RuntimeError(f"Docs search server error: {message}") from e
+
+
+def get_server_client():
+    """Returns a :class:`ServerClient` for the local docs search server if
+    one is running and ``FIFTYONE_DOCS_SERVER`` is not disabled, or ``None``
+    otherwise.
+    """
+    if not use_server():
+        return None
+
+    client = ServerClient()
+    if not client.is_running():
+        return None
+
+    return client
+
+
+def query(query, **kwargs):
+    """Runs :func:`fiftyone.docs_search.query_index.query_index` on the local
+    server if one is running, or in-process otherwise.
+    """
+    client = get_server_client()
+    if client is not None:
+        return client.search(query, **kwargs)
+
+    from fiftyone.docs_search.query_index import query_index
+
+    return query_index(query, **kwargs)
+
+
+def query_batch(queries, **kwargs):
+    """Runs :func:`fiftyone.docs_search.query_index.query_index_batch` on the
+    local server if one is running, or in-process otherwise.
+    """
+    client = get_server_client()
+    if client is not None:
+        return client.search_batch(queries, **kwargs)
+
+    from fiftyone.docs_search.query_index import query_index_batch
+
+    return query_index_batch(queries, **kwargs)
@@ -8,10 +8,11 @@ Installs FiftyOne Docs Search.
 from setuptools import setup, find_packages
 
 INSTALL_REQUIRES = [
+    "aiohttp",
     "argcomplete",
     "google-cloud-storage",
-    "langchain",
     "markdownify",
+    "numpy",
     "openai",
     "packaging",
     "qdrant-client",
@@ -29,7 +30,7 @@ setup(
     version="0.21.0",
     author="Voxel51, Inc.",
     author_email="info@voxel51.com",
-    packages=find_packages(),
+    packages=find_packages(exclude=["tests", "tests.*"]),
     description="Semantic search for the FiftyOne Docs from command line",
     long_description=description,
     long_description_content_type="text/markdown",
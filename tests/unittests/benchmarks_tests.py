@@ -0,0 +1,142 @@
+"""
+Benchmark tests.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+BENCHMARKS_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "benchmarks"
+)
+
+
+def _load_benchmark(name):
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(BENCHMARKS_DIR, name + ".py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class DocsPipelineBenchmarkTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+        self.benchmark = _load_benchmark("docs_pipeline")
+        self.baseline_path = os.path.join(self.tmp_dir, "baseline.json")
+
+    def _run(self, *args):
+        argv = [
+            "docs_pipeline.py",
+            "--fixtures",
+            "small",
+            "--repeats",
+            "1",
+            "--baseline",
+            self.baseline_path,
+        ] + list(args)
+
+        ## the benchmark runs offline, without `FIFTYONE_DIR`
+        env = {k: v for k, v in os.environ.items() if k != "FIFTYONE_DIR"}
+        stdout = io.StringIO()
+        with mock.patch.object(sys, "argv", argv), mock.patch.dict(
+            os.environ, env, clear=True
+        ), contextlib.redirect_stdout(stdout):
+            try:
+                self.benchmark.main()
+                code = 0
+            except SystemExit as e:
+                code = e.code
+
+        return code, stdout.getvalue()
+
+    def test_fixtures(self):
+        ## fixtures are generated deterministically
+        html = self.benchmark.make_fixture_html(4, 51)
+        self.assertEqual(self.benchmark.make_fixture_html(4, 51), html)
+        self.assertNotEqual(self.benchmark.make_fixture_html(4, 52), html)
+        self.assertIn('itemprop="articleBody"', html)
+
+    def test_baseline(self):
+        code, output = self._run()
+        self.assertEqual(code, 0)
+        self.assertIn("No baseline found", output)
+
+        code, output = self._run("--save_baseline")
+        self.assertEqual(code, 0)
+
+        with open(self.baseline_path) as f:
+            baseline = json.load(f)
+
+        result = baseline["results"]["small"]
+        self.assertGreater(result["num_sections"], 1)
+        self.assertGreater(result["num_chunks"], 1)
+        self.assertSetEqual(
+            set(result["stages"]),
+            {
+                "extract_content_html",
+                "markdownify",
+                "parse_page_markdown",
+                "get_page_markdown",
+                "split_at_anchors",
+                "split_page_into_chunks",
+            },
+        )
+
+        code, output = self._run("--tolerance", "1000")
+        self.assertEqual(code, 0)
+        self.assertIn("No regressions", output)
+
+        ## changed chunk counts are regressions, regardless of the tolerance
+        result["num_chunks"] += 1
+        with open(self.baseline_path, "w") as f:
+            json.dump(baseline, f)
+
+        code, output = self._run("--tolerance", "1000")
+        self.assertEqual(code, 1)
+        self.assertIn("small: num_chunks changed", output)
+
+    def test_compare_to_baseline(self):
+        def _results(time_ms, peak_kb):
+            return {
+                "small": {
+                    "num_sections": 3,
+                    "num_chunks": 5,
+                    "stages": {
+                        "markdownify": {"time_ms": time_ms, "peak_kb": peak_kb}
+                    },
+                }
+            }
+
+        baseline = {"results": _results(10.0, 100.0)}
+        compare = self.benchmark.compare_to_baseline
+
+        self.assertListEqual(
+            compare(_results(12.0, 120.0), baseline, 0.25), []
+        )
+        self.assertEqual(
+            len(compare(_results(13.0, 100.0), baseline, 0.25)), 1
+        )
+        self.assertEqual(
+            len(compare(_results(10.0, 130.0), baseline, 0.25)), 1
+        )
+
+        ## tiny absolute time increases are noise
+        baseline = {"results": _results(0.1, 100.0)}
+        self.assertListEqual(compare(_results(0.5, 100.0), baseline, 0.25), [])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,84 @@
+"""
+Binary index tests.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import fiftyone.docs_search.binary_index as fodb
+
+
+class BinaryIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def _write_json_index(self, vectors):
+        docs_json = {
+            str(i): {"vector": vector, "text": f"chunk {i}"}
+            for i, vector in enumerate(vectors)
+        }
+
+        json_path = os.path.join(self.tmp_dir, "index.json")
+        with open(json_path, "w") as f:
+            json.dump(docs_json, f)
+
+        return json_path
+
+    def test_convert(self):
+        vectors = np.random.default_rng(51).random((5, 4)).tolist()
+        json_path = self._write_json_index(vectors)
+        index_path = os.path.join(self.tmp_dir, "index")
+
+        fodb.convert_json_index_to_binary(
+            json_path, index_path, "model", 4, batch_size=2
+        )
+
+        index = fodb.load_binary_index(index_path)
+        self.assertEqual(len(index), 5)
+        self.assertEqual(index.model, "model")
+        self.assertListEqual(index.ids, ["0", "1", "2", "3", "4"])
+        self.assertEqual(index.payloads[3]["text"], "chunk 3")
+        np.testing.assert_allclose(index.vectors, vectors, rtol=1e-6)
+
+    def test_failed_convert(self):
+        index_path = os.path.join(self.tmp_dir, "index")
+        vectors = np.random.default_rng(51).random((5, 4)).tolist()
+        fodb.convert_json_index_to_binary(
+            self._write_json_index(vectors), index_path, "model", 4
+        )
+        self.assertTrue(fodb.is_binary_index(index_path))
+
+        ## overwriting the index fails partway through, so neither the old
+        ## index nor the partial one may remain loadable
+        vectors[3] = vectors[3][:2]
+        with self.assertRaises(ValueError):
+            fodb.convert_json_index_to_binary(
+                self._write_json_index(vectors),
+                index_path,
+                "model",
+                4,
+                batch_size=2,
+            )
+
+        self.assertFalse(fodb.is_binary_index(index_path))
+
+    def test_writer_error(self):
+        index_path = os.path.join(self.tmp_dir, "index")
+        with self.assertRaises(RuntimeError):
+            with fodb.BinaryIndexWriter(index_path, "model", 4) as writer:
+                writer.add(["0"], [[0.0, 1.0, 2.0, 3.0]], [{}])
+                raise RuntimeError("interrupted")
+
+        self.assertFalse(fodb.is_binary_index(index_path))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
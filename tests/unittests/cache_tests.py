@@ -0,0 +1,304 @@
+"""
+Persistent cache tests.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import fiftyone.docs_search.cache as fodca
+import fiftyone.docs_search.common as fodc
+import fiftyone.docs_search.read_docs as fodr
+
+from tests.unittests.utils import LocalIndexTestCase
+
+
+class EmbeddingCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+        self.path = os.path.join(self.tmp_dir, "cache", "embeddings.sqlite")
+
+    def _make_cache(self, max_size=None):
+        cache = fodca.EmbeddingCache(self.path, max_size)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_get_put(self):
+        cache = self._make_cache()
+
+        self.assertIsNone(cache.get("model", "a text"))
+        cache.put("model", "a text", [0.5, -1.0, 0.25])
+        self.assertListEqual(cache.get("model", "a text"), [0.5, -1.0, 0.25])
+
+        ## embeddings are keyed by model
+        self.assertIsNone(cache.get("other-model", "a text"))
+
+        ## embeddings are stored as float32
+        cache.put("model", "third", [0.1])
+        self.assertNotEqual(cache.get("model", "third"), [0.1])
+        self.assertAlmostEqual(cache.get("model", "third")[0], 0.1, places=6)
+
+        self.assertListEqual(
+            cache.get_many("model", ["third", "missing", "a text"]),
+            [cache.get("model", "third"), None, [0.5, -1.0, 0.25]],
+        )
+
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 6)
+        self.assertEqual(stats["misses"], 3)
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["size"], 4 * 4)
+
+    def test_key_normalization(self):
+        cache = self._make_cache()
+        cache.put("model", "Café  au\tlait\n", [1.0])
+
+        ## whitespace and unicode normalization don't change the key
+        self.assertListEqual(cache.get("model", " Café au lait"), [1.0])
+        self.assertIsNone(cache.get("model", "cafe au lait"))
+        self.assertEqual(
+            fodca.hash_text("model", "a  b\n"), fodca.hash_text("model", "a b")
+        )
+
+    def test_persistence(self):
+        cache = self._make_cache()
+        cache.put_many("model", ["a", "b"], [[1.0], [2.0]])
+        cache.close()
+
+        cache = self._make_cache()
+        self.assertListEqual(
+            cache.get_many("model", ["a", "b"]), [[1.0], [2.0]]
+        )
+
+        cache.clear()
+        self.assertEqual(cache.size, 0)
+        self.assertIsNone(cache.get("model", "a"))
+
+    def test_lru_eviction(self):
+        ## room for ten 100-byte embeddings
+        cache = self._make_cache(max_size=1000)
+        embedding = [0.0] * 25
+
+        texts = [f"text {i}" for i in range(10)]
+        for i, text in enumerate(texts):
+            with mock.patch("time.time", return_value=float(i)):
+                cache.put("model", text, embedding)
+
+        ## reading the oldest entry makes it the most recently used
+        with mock.patch("time.time", return_value=10.0):
+            self.assertIsNotNone(cache.get("model", texts[0]))
+
+        self.assertEqual(cache.size, 1000)
+
+        ## exceeding the budget evicts down to 90% of it
+        with mock.patch("time.time", return_value=11.0):
+            cache.put("model", "new", embedding)
+
+        self.assertEqual(cache.size, 900)
+
+        found = cache.get_many("model", texts + ["new"])
+        self.assertListEqual(
+            [text for text, e in zip(texts, found) if e is None],
+            texts[1:3],
+        )
+        self.assertIsNotNone(found[-1])
+
+
+class FakeEmbeddingClient(object):
+    def __init__(self):
+        self.texts = []
+
+    def embed_batches(self, batches, callback=None):
+        results = []
+        for idx, batch in enumerate(batches):
+            self.texts.extend(batch)
+            embeddings = [[float(len(text)), 1.0] for text in batch]
+            if callback is not None:
+                callback(idx, embeddings)
+
+            results.append(embeddings)
+
+        return results
+
+
+class CachedEmbedTextsTests(LocalIndexTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.client = FakeEmbeddingClient()
+        patches = [
+            mock.patch.dict(
+                os.environ,
+                {
+                    "FIFTYONE_DOCS_EMBEDDER": "openai",
+                    "FIFTYONE_DOCS_EMBEDDING_CACHE": "true",
+                },
+            ),
+            mock.patch.object(
+                fodc,
+                "FIFTYONE_DOCS_EMBEDDING_CACHE_FILEPATH",
+                os.path.join(self.tmp_dir, "embedding_cache.sqlite"),
+            ),
+            mock.patch.object(fodc, "_EMBEDDING_CACHE", None),
+            mock.patch.object(fodc, "_EMBEDDING_CLIENT", self.client),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_embed_texts(self):
+        embeddings = fodc.embed_texts(["a", "bb", "ccc"])
+        self.assertListEqual(embeddings, [[1.0, 1.0], [2.0, 1.0], [3.0, 1.0]])
+        self.assertListEqual(self.client.texts, ["a", "bb", "ccc"])
+
+        ## only the texts that aren't cached are embedded
+        embeddings = fodc.embed_texts(["bb", "dddd", " a "])
+        self.assertListEqual(embeddings, [[2.0, 1.0], [4.0, 1.0], [1.0, 1.0]])
+        self.assertListEqual(self.client.texts, ["a", "bb", "ccc", "dddd"])
+
+        self.assertListEqual(fodc.embed_text("ccc"), [3.0, 1.0])
+        self.assertEqual(len(self.client.texts), 4)
+
+        stats = fodc.get_embedding_cache().stats()
+        self.assertEqual(stats["hits"], 3)
+        self.assertEqual(stats["misses"], 4)
+
+    def test_disabled(self):
+        with mock.patch.dict(
+            os.environ, {"FIFTYONE_DOCS_EMBEDDING_CACHE": "false"}
+        ):
+            self.assertIsNone(fodc.get_embedding_cache())
+            fodc.embed_texts(["a", "bb"])
+            fodc.embed_texts(["a", "bb"])
+
+        self.assertListEqual(self.client.texts, ["a", "bb", "a", "bb"])
+
+
+class ParseCacheTests(LocalIndexTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.path = os.path.join(self.tmp_dir, "parse_cache.sqlite")
+        self.filepath = self.make_sphinx_page(
+            "user_guide/datasets.html",
+            {
+                "loading": "Load a dataset with load_dataset.",
+                "exporting": "Export a dataset with export.",
+            },
+        )
+
+        patches = [
+            mock.patch.dict(os.environ, {"FIFTYONE_DOCS_PARSE_CACHE": "true"}),
+            mock.patch.object(
+                fodc, "FIFTYONE_DOCS_PARSE_CACHE_FILEPATH", self.path
+            ),
+            mock.patch.object(fodc, "_PARSE_CACHE", None),
+            mock.patch.object(fodr, "_PARSE_VERSION", None),
+            mock.patch.object(fodr, "_SPLITTER", None),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _reset(self, env=None):
+        ## simulates a new process, optionally with different settings. The
+        ## environment is restored by `LocalIndexTestCase`
+        if fodc._PARSE_CACHE is not None:
+            fodc._PARSE_CACHE.close()
+
+        fodc._PARSE_CACHE = None
+        fodr._PARSE_VERSION = None
+        fodr._SPLITTER = None
+        if env:
+            os.environ.update(env)
+
+    def test_round_trip(self):
+        cache = fodca.ParseCache(self.path, None, "v1")
+        self.addCleanup(cache.close)
+
+        sections = {"b": ["chunk 1", "chunk 2"], None: [], "a": ["¶"]}
+        key = cache.get_key(b"<html></html>")
+        cache.put(key, {str(k): v for k, v in sections.items()})
+
+        ## section order is preserved
+        self.assertListEqual(
+            list(cache.get(key).items()),
+            [("b", ["chunk 1", "chunk 2"]), ("None", []), ("a", ["¶"])],
+        )
+
+        ## keys depend on the HTML and the version of the pipeline
+        self.assertNotEqual(cache.get_key(b"<html> </html>"), key)
+        other = fodca.ParseCache(self.path, None, "v2")
+        self.addCleanup(other.close)
+        self.assertNotEqual(other.get_key(b"<html></html>"), key)
+        self.assertIsNone(other.get(other.get_key(b"<html></html>")))
+
+    def test_parse_version(self):
+        version = fodr.get_parse_version()
+        self.assertEqual(fodr.get_parse_version(), version)
+
+        ## chunking settings change the version
+        self._reset({"FIFTYONE_DOCS_CHUNK_SIZE": "500"})
+        self.assertNotEqual(fodr.get_parse_version(), version)
+
+        self._reset({"FIFTYONE_DOCS_CHUNK_SIZE": "None"})
+        self.assertEqual(fodr.get_parse_version(), version)
+
+        ## so does the source of the parsing modules
+        self._reset()
+        with mock.patch.object(fodr, "PARSE_MODULES", fodr.PARSE_MODULES[:-1]):
+            self.assertNotEqual(fodr.get_parse_version(), version)
+
+    def test_cached_pages(self):
+        parse = fodr._parse_markdown_documents
+        parsed = []
+
+        def _parse_markdown_documents(filepath):
+            parsed.append(filepath)
+            return parse(filepath)
+
+        with mock.patch.object(
+            fodr, "_parse_markdown_documents", _parse_markdown_documents
+        ):
+            sections = fodr.get_markdown_documents(self.filepath)
+            self.assertEqual(len(parsed), 1)
+            self.assertListEqual(
+                sections["loading"], ["Load a dataset with load_dataset."]
+            )
+
+            ## cached pages are not parsed again, even by a new process
+            self._reset()
+            self.assertDictEqual(
+                fodr.get_markdown_documents(self.filepath), sections
+            )
+            self.assertListEqual(
+                list(fodr.iter_markdown_documents([self.filepath])),
+                [(self.filepath, sections)],
+            )
+            self.assertEqual(len(parsed), 1)
+
+            ## changing the page invalidates its entry
+            self.make_sphinx_page(
+                "user_guide/datasets.html",
+                {"loading": "Load a dataset with fo.load_dataset."},
+            )
+            fodr.get_markdown_documents(self.filepath)
+            self.assertEqual(len(parsed), 2)
+
+            ## so does changing the parsing settings
+            self._reset({"FIFTYONE_DOCS_CHUNK_OVERLAP": "100"})
+            fodr.get_markdown_documents(self.filepath)
+            self.assertEqual(len(parsed), 3)
+
+            stats = fodc.get_parse_cache().stats()
+            self.assertEqual(stats["entries"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,164 @@
+"""
+Markdown chunking tests.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import json
+import os
+import unittest
+
+import fiftyone.docs_search.common as fodc
+import fiftyone.docs_search.chunking as fodch
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "fixtures"
+)
+
+## chunks recorded with `langchain==0.0.179`'s `MarkdownTextSplitter`, which
+## existing indexes were built with
+GOLDEN_PATH = os.path.join(
+    FIXTURES_DIR, "chunking", "markdown_text_splitter.json"
+)
+
+
+def _read_fixture(relpath):
+    with open(os.path.join(FIXTURES_DIR, relpath), "r") as f:
+        return f.read()
+
+
+def _make_page():
+    code = "\n".join(f"dataset{i} = fo.Dataset()" for i in range(40))
+    return (
+        "# Datasets\n\n"
+        "Datasets are the core data structure in FiftyOne.\n\n"
+        "## Loading\n\n"
+        + "Load a dataset from disk. " * 8
+        + "\n\n### From the zoo\n\n"
+        + "Zoo datasets are downloaded on demand. " * 4
+        + f"\n\n```python\nimport fiftyone as fo\n\n{code}\n```\n\n"
+        "## Exporting\n\n"
+        + "Export a dataset to disk. " * 8
+        + "\n\n## Summary\n\nThat's it."
+    )
+
+
+class CompatChunkingTests(unittest.TestCase):
+    def test_langchain_golden(self):
+        with open(GOLDEN_PATH, "r") as f:
+            golden = json.load(f)
+
+        self.assertEqual(golden["langchain"], "0.0.179")
+        for case in golden["cases"]:
+            text = _read_fixture(case["input"])
+            chunker = fodch.MarkdownChunker(
+                chunk_size=case["chunk_size"],
+                chunk_overlap=case["chunk_overlap"],
+            )
+
+            msg = "%s (%d, %d)" % (
+                case["input"],
+                case["chunk_size"],
+                case["chunk_overlap"],
+            )
+            self.assertListEqual(
+                chunker.split_text(text), case["chunks"], msg=msg
+            )
+
+    def test_invalid_args(self):
+        with self.assertRaises(ValueError):
+            fodch.MarkdownChunker(unit="words")
+
+        with self.assertRaises(ValueError):
+            fodch.MarkdownChunker(chunk_size=100, chunk_overlap=100)
+
+        with self.assertRaises(ValueError):
+            fodch.MarkdownChunker(chunk_size=1)
+
+
+class BlockChunkingTests(unittest.TestCase):
+    def _split(self, text, **kwargs):
+        chunker = fodch.MarkdownChunker(compat=False, **kwargs)
+        return chunker, chunker.split_text(text)
+
+    def test_chunk_sizes(self):
+        text = _make_page()
+        for unit, length in (
+            ("chars", len),
+            ("tokens", fodc.estimate_num_tokens),
+        ):
+            _, chunks = self._split(
+                text, chunk_size=120, chunk_overlap=30, unit=unit
+            )
+            self.assertGreater(len(chunks), 3, msg=unit)
+            for chunk in chunks:
+                self.assertLessEqual(length(chunk), 120, msg=unit)
+
+        ## token units allow ~3x longer chunks than character units
+        _, char_chunks = self._split(text, chunk_size=120, chunk_overlap=30)
+        _, token_chunks = self._split(
+            text, chunk_size=40, chunk_overlap=10, unit="tokens"
+        )
+        self.assertLess(
+            abs(len(char_chunks) - len(token_chunks)), len(char_chunks) // 2
+        )
+
+    def test_code_fences(self):
+        _, chunks = self._split(_make_page(), chunk_size=300, chunk_overlap=0)
+
+        ## the code block is split, and each piece is wrapped in its fences
+        code_chunks = [c for c in chunks if "fo.Dataset()" in c]
+        self.assertGreater(len(code_chunks), 1)
+        for chunk in code_chunks:
+            lines = chunk.split("\n")
+            self.assertIn("```python", lines)
+            self.assertEqual(lines[-1], "```")
+            self.assertEqual(chunk.count("```"), 2)
+
+        ## every line of code appears in the chunks
+        for i in range(40):
+            self.assertTrue(
+                any(f"dataset{i} = " in c for c in code_chunks), msg=i
+            )
+
+    def test_headings_with_content(self):
+        _, chunks = self._split(_make_page(), chunk_size=200, chunk_overlap=0)
+
+        for chunk in chunks:
+            last_line = chunk.rstrip("\n").split("\n")[-1]
+            self.assertFalse(last_line.startswith("#"), msg=chunk)
+
+        ## headings are in the same chunk as the start of their content
+        for heading, content in (
+            ("## Loading", "Load a dataset"),
+            ("### From the zoo", "Zoo datasets"),
+            ("## Exporting", "Export a dataset"),
+        ):
+            matches = [c for c in chunks if heading in c]
+            self.assertEqual(len(matches), 1, msg=heading)
+            self.assertIn(heading + "\n\n" + content, matches[0])
+
+    def test_overlap(self):
+        paragraphs = [f"Paragraph {i} " + "x" * 40 for i in range(12)]
+        text = "\n\n".join(paragraphs)
+
+        _, chunks = self._split(text, chunk_size=200, chunk_overlap=110)
+        for prev, chunk in zip(chunks, chunks[1:]):
+            prev_blocks = prev.split("\n\n")
+            blocks = chunk.split("\n\n")
+
+            ## chunks start with whole trailing blocks of the previous chunk
+            overlap = [b for b in blocks if b in prev_blocks]
+            self.assertGreater(len(overlap), 0)
+            self.assertListEqual(overlap, prev_blocks[-len(overlap) :])
+            self.assertLessEqual(len("\n\n".join(overlap)), 110)
+            self.assertLess(len(overlap), len(prev_blocks))
+
+        _, chunks = self._split(text, chunk_size=200, chunk_overlap=0)
+        self.assertListEqual(
+            [b for c in chunks for b in c.split("\n\n")], paragraphs
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
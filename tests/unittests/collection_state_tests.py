@@ -0,0 +1,164 @@
+"""
+Collection state tests.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import builtins
+import json
+import unittest
+from unittest import mock
+
+import fiftyone.docs_search.common as fodc
+import fiftyone.docs_search.create_index as fodi
+import fiftyone.docs_search.query_index as fodq
+
+from tests.unittests.utils import LocalIndexTestCase
+
+
+class CollectionStateTests(LocalIndexTestCase):
+    def setUp(self):
+        super().setUp()
+
+        docs_index_file, self.ids = self.write_json_index(7)
+        fodi.load_index(docs_index_file, num_workers=1)
+
+        self.collection_name = fodc.get_collection_name()
+        self.client = fodc.get_client()
+
+    def _count_calls(self):
+        return mock.patch.object(
+            self.client, "get_collection", wraps=self.client.get_collection
+        )
+
+    def test_state(self):
+        state = fodc.get_collection_state(self.collection_name)
+        self.assertTrue(state["exists"])
+        self.assertEqual(state["points_count"], len(self.ids))
+        self.assertIsNotNone(state["config_version"])
+
+        state = fodc.get_collection_state("missing")
+        self.assertDictEqual(
+            {k: v for k, v in state.items() if k != "checked_at"},
+            {"exists": False, "points_count": 0, "config_version": None},
+        )
+
+    def test_state_cache(self):
+        fodc.invalidate_collection_state()
+
+        with self._count_calls() as get_collection:
+            for _ in range(3):
+                self.assertTrue(fodc.collection_exists(self.collection_name))
+
+            self.assertEqual(get_collection.call_count, 1)
+
+            ## refreshes bypass the cache
+            fodc.get_collection_state(self.collection_name, refresh=True)
+            self.assertEqual(get_collection.call_count, 2)
+
+            ## expired states are refetched
+            with mock.patch.object(fodc, "COLLECTION_STATE_TTL", 0):
+                fodc.get_collection_state(self.collection_name)
+
+            self.assertEqual(get_collection.call_count, 3)
+
+            ## invalidated states are refetched
+            fodc.invalidate_collection_state(self.collection_name)
+            fodc.get_collection_state(self.collection_name)
+            self.assertEqual(get_collection.call_count, 4)
+
+    def test_queries_use_cached_state(self):
+        fodc.invalidate_collection_state()
+
+        ## collections are not listed or fetched once per query
+        with self._count_calls() as get_collection, mock.patch.object(
+            self.client, "get_collections", wraps=self.client.get_collections
+        ) as get_collections:
+            for _ in range(3):
+                fodq.query_index("datasets", top_k=3, backend="qdrant")
+
+        self.assertEqual(get_collection.call_count, 1)
+        get_collections.assert_not_called()
+
+    def test_state_invalidated_by_writes(self):
+        self.assertEqual(
+            fodc.get_collection_state(self.collection_name)["points_count"],
+            len(self.ids),
+        )
+
+        ## recreating the collection discards its cached state
+        fodi.initialize_index()
+        self.assertEqual(
+            fodc.get_collection_state(self.collection_name)["points_count"], 0
+        )
+
+        fodc.get_client().delete_collection(self.collection_name)
+        fodc.invalidate_collection_state(self.collection_name)
+        self.assertFalse(fodc.collection_exists(self.collection_name))
+
+    def test_metadata(self):
+        embedder = fodc.get_embedder()
+        self.assertDictEqual(
+            fodc.load_collection_metadata(self.collection_name),
+            {"embedder": embedder.id, "dimension": embedder.dimension},
+        )
+        self.assertIsNone(fodc.load_collection_metadata("missing"))
+
+    def test_metadata_cache(self):
+        fodc.invalidate_collection_state()
+
+        open_ = builtins.open
+        num_reads = []
+
+        def _open(path, *args, **kwargs):
+            if path == fodc.FIFTYONE_DOCS_COLLECTIONS_FILEPATH:
+                num_reads.append(path)
+
+            return open_(path, *args, **kwargs)
+
+        with mock.patch.object(builtins, "open", _open):
+            for _ in range(3):
+                fodc.validate_collection_embedder(self.collection_name)
+
+            self.assertEqual(len(num_reads), 1)
+
+            ## saving or invalidating metadata discards the cached copy
+            metadata = fodc.load_collection_metadata(self.collection_name)
+            fodc.save_collection_metadata(self.collection_name, metadata)
+            fodc.validate_collection_embedder(self.collection_name)
+            self.assertEqual(len(num_reads), 3)
+
+            fodc.invalidate_collection_state(self.collection_name)
+            fodc.validate_collection_embedder(self.collection_name)
+            self.assertEqual(len(num_reads), 4)
+
+    def test_validate_embedder(self):
+        fodc.validate_collection_embedder(self.collection_name)
+
+        with open(fodc.FIFTYONE_DOCS_COLLECTIONS_FILEPATH, "r") as f:
+            registry = json.load(f)
+
+        ## collections built with another embedder can't be searched
+        fodc.save_collection_metadata(
+            self.collection_name, {"embedder": "other", "dimension": 3}
+        )
+        with self.assertRaises(ValueError):
+            fodc.validate_collection_embedder(self.collection_name)
+
+        ## collections without metadata were built with OpenAI embeddings
+        del registry[self.collection_name]
+        with open(fodc.FIFTYONE_DOCS_COLLECTIONS_FILEPATH, "w") as f:
+            json.dump(registry, f)
+
+        fodc.invalidate_collection_state(self.collection_name)
+        with self.assertRaises(ValueError):
+            fodc.validate_collection_embedder(self.collection_name)
+
+        with mock.patch.dict(
+            "os.environ", {"FIFTYONE_DOCS_EMBEDDER": "openai"}
+        ), mock.patch.object(fodc, "_EMBEDDER", None):
+            fodc.validate_collection_embedder(self.collection_name)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
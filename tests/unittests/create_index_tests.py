@@ -0,0 +1,264 @@
+"""
+Index creation tests.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import os
+import unittest
+from unittest import mock
+
+from qdrant_client.http import models
+
+import fiftyone.docs_search.common as fodc
+import fiftyone.docs_search.create_index as fodi
+import fiftyone.docs_search.json_index as fodj
+import fiftyone.docs_search.query_index as fodq
+
+from tests.unittests.utils import LocalIndexTestCase
+
+
+class BatchTextsTests(unittest.TestCase):
+    def test_batch_texts(self):
+        texts = ["a" * 30, "b" * 30, "c" * 3, "d" * 300, "e", "f", "g"]
+
+        ## each text of n characters is estimated to be n // 3 + 1 tokens
+        batches = list(fodc.batch_texts(texts, batch_size=3, max_tokens=23))
+
+        self.assertListEqual(batches, [[0, 1], [2], [3], [4, 5, 6]])
+
+
+class GenerateIndexTests(LocalIndexTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.pages = {
+            "user_guide/datasets.html": {
+                "loading": "Load a dataset with load_dataset.",
+                "exporting": "Export a dataset with export.",
+            },
+            "tutorials/evaluation.html": {
+                "evaluate": "Evaluate detections with evaluate_detections.",
+            },
+            "recipes/views.html": {
+                "filtering": "Filter labels with filter_labels.",
+                "sorting": "Sort samples with sort_by.",
+                "matching": "Match samples with match.",
+            },
+        }
+        for relpath, sections in self.pages.items():
+            self.make_sphinx_page(relpath, sections)
+
+    def _get_texts(self):
+        return {
+            text
+            for sections in self.pages.values()
+            for text in sections.values()
+        }
+
+    def test_generate_json(self):
+        docs_index_file = os.path.join(self.tmp_dir, "index.json")
+        embedder = fodc.get_embedder()
+        embed_texts = embedder.embed_texts
+        num_texts = []
+
+        def _embed_texts(texts, **kwargs):
+            num_texts.append(len(texts))
+            return embed_texts(texts, **kwargs)
+
+        with mock.patch.object(embedder, "embed_texts", _embed_texts):
+            fodi.generate_json_from_html_docs(
+                docs_index_file, num_workers=1, window_size=2
+            )
+
+        ## chunks are embedded in windows that span pages, rather than all
+        ## at once or page by page
+        self.assertEqual(sum(num_texts), 6)
+        self.assertGreater(len(num_texts), 1)
+        self.assertLessEqual(max(num_texts), 4)
+
+        records = dict(fodj.iter_index_records(docs_index_file))
+        self.assertSetEqual(
+            {value["text"] for value in records.values()}, self._get_texts()
+        )
+        for id, value in records.items():
+            self.assertEqual(
+                value["vector"], embedder.embed_texts([value["text"]])[0]
+            )
+
+        ## the IDs are the same as those of the points of a collection
+        fodi.generate_index_from_html_docs(num_workers=1)
+        self.assertSetEqual(self.get_point_ids(), set(records.keys()))
+
+    def test_one_embedding_session(self):
+        embedder = fodc.get_embedder()
+
+        for func in (
+            fodi.generate_index_from_html_docs,
+            fodi.update_index_from_html_docs,
+        ):
+            self.make_page("user_guide/new.html", "<p>new</p>")
+            with mock.patch.object(
+                embedder, "start"
+            ) as start, mock.patch.object(embedder, "close") as close:
+                func(num_workers=1)
+
+            start.assert_called_once_with()
+            close.assert_called_once_with()
+
+    def test_update_index(self):
+        fodi.generate_index_from_html_docs(num_workers=1)
+        point_ids = self.get_point_ids()
+        self.assertEqual(len(point_ids), 6)
+
+        ## change one section and delete a page
+        self.make_sphinx_page(
+            "user_guide/datasets.html",
+            {
+                "loading": "Load a dataset with load_dataset.",
+                "exporting": "Export a dataset with export_dataset.",
+            },
+        )
+        os.remove(
+            os.path.join(
+                self.tmp_dir, "docs", "build", "html", "recipes", "views.html"
+            )
+        )
+
+        with mock.patch.object(
+            fodi, "add_vectors_to_index", wraps=fodi.add_vectors_to_index
+        ) as add_vectors_to_index:
+            fodi.update_index_from_html_docs(num_workers=1)
+
+        ## only the changed chunk was embedded and upserted
+        add_vectors_to_index.assert_called_once()
+        ids, _, payloads = add_vectors_to_index.call_args[0]
+        self.assertEqual(len(ids), 1)
+        self.assertEqual(
+            payloads[0]["text"], "Export a dataset with export_dataset."
+        )
+
+        new_point_ids = self.get_point_ids()
+        self.assertEqual(len(new_point_ids), 3)
+        self.assertEqual(len(new_point_ids & point_ids), 2)
+
+
+class UpsertBufferTests(LocalIndexTestCase):
+    def setUp(self):
+        super().setUp()
+        fodi.initialize_index()
+
+        self.upserts = []
+        add_vectors_to_index = fodi.add_vectors_to_index
+
+        def _add_vectors_to_index(ids, vectors, payloads):
+            self.upserts.append(len(ids))
+            add_vectors_to_index(ids, vectors, payloads)
+
+        patch = mock.patch.object(
+            fodi, "add_vectors_to_index", _add_vectors_to_index
+        )
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def _get_points(self, start, num_points):
+        payloads = [
+            fodi.create_subsection_payload(
+                f"chunk {i}",
+                "intro",
+                "https://docs.voxel51.com/page.html",
+                "user_guide",
+            )
+            for i in range(start, start + num_points)
+        ]
+        return fodi.create_subsection_vectors(payloads)
+
+    def test_flush_by_points(self):
+        with fodi.UpsertBuffer(max_points=4) as buffer:
+            ## pages with one point, several points and no points
+            for start, num_points in ((0, 1), (1, 5), (6, 0), (6, 3)):
+                buffer.add(*self._get_points(start, num_points))
+
+        self.assertListEqual(self.upserts, [4, 4, 1])
+        self.assertEqual(buffer.num_points, 9)
+        self.assertEqual(buffer.num_flushes, 3)
+        self.assertEqual(len(self.get_point_ids()), 9)
+
+    def test_flush_by_bytes(self):
+        ids, vectors, payloads = self._get_points(0, 5)
+        point_size = fodi._estimate_point_size(vectors[0], payloads[0])
+
+        with fodi.UpsertBuffer(max_bytes=2 * point_size) as buffer:
+            buffer.add(ids, vectors, payloads)
+
+        self.assertListEqual(self.upserts, [2, 2, 1])
+        self.assertEqual(len(self.get_point_ids()), 5)
+
+    def test_flush_on_error(self):
+        ## the points buffered before an error are still upserted
+        with self.assertRaises(RuntimeError):
+            with fodi.UpsertBuffer(max_points=4) as buffer:
+                buffer.add(*self._get_points(0, 6))
+                raise RuntimeError("parsing failed")
+
+        self.assertListEqual(self.upserts, [4, 2])
+        self.assertEqual(len(self.get_point_ids()), 6)
+
+
+class QuantizationTests(LocalIndexTestCase):
+    def test_quantization_config(self):
+        self.assertIsNone(fodi.get_quantization_config())
+        self.assertIsNone(fodi.get_quantization_config("none"))
+
+        config = fodi.get_quantization_config("scalar")
+        self.assertEqual(config.scalar.type, models.ScalarType.INT8)
+        self.assertTrue(config.scalar.always_ram)
+
+        with mock.patch.dict(
+            os.environ, {"FIFTYONE_DOCS_QUANTIZATION": "binary"}
+        ):
+            config = fodi.get_quantization_config()
+            self.assertIsInstance(config, models.BinaryQuantization)
+
+        with self.assertRaises(ValueError):
+            fodi.get_quantization_config("product")
+
+    def test_quantized_collection(self):
+        docs_index_file, ids = self.write_json_index(9)
+
+        client = fodc.get_client()
+        with mock.patch.object(
+            client, "recreate_collection", wraps=client.recreate_collection
+        ) as recreate_collection:
+            fodi.load_index(
+                docs_index_file, num_workers=1, quantization="scalar"
+            )
+
+        config = recreate_collection.call_args.kwargs["quantization_config"]
+        self.assertIsInstance(config, models.ScalarQuantization)
+        self.assertSetEqual(self.get_point_ids(), ids)
+
+    def test_search_params(self):
+        docs_index_file, _ = self.write_json_index(9)
+        fodi.load_index(docs_index_file, num_workers=1)
+
+        client = fodc.get_client()
+        with mock.patch.object(
+            client, "search", wraps=client.search
+        ) as search:
+            fodq.query_index("chunk 3", backend="qdrant")
+            fodq.query_index(
+                "chunk 3", backend="qdrant", rescore=False, oversampling=4.0
+            )
+
+        params = [c.kwargs["search_params"] for c in search.call_args_list]
+        self.assertTrue(params[0].quantization.rescore)
+        self.assertEqual(
+            params[0].quantization.oversampling, fodc.DEFAULT_OVERSAMPLING
+        )
+        self.assertFalse(params[1].quantization.rescore)
+        self.assertEqual(params[1].quantization.oversampling, 4.0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,107 @@
+"""
+Embedder tests.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import fiftyone.docs_search.common as fodc
+import fiftyone.docs_search.create_index as fodi
+import fiftyone.docs_search.embedders as fodem
+
+from tests.unittests.utils import LocalIndexTestCase
+
+
+class HashingEmbedderTests(unittest.TestCase):
+    def test_embed_texts(self):
+        embedder = fodem.HashingEmbedder(dimension=64)
+        self.assertEqual(embedder.id, "hashing-v1-64")
+        self.assertEqual(embedder.dimension, 64)
+
+        texts = [
+            "Load a dataset with fo.load_dataset()",
+            "Load the dataset with load_dataset()",
+            "Evaluate detections and compute mAP",
+            "",
+        ]
+        vectors = np.array(embedder.embed_texts(texts))
+        self.assertTupleEqual(vectors.shape, (4, 64))
+
+        ## vectors are deterministic and L2-normalized
+        self.assertListEqual(
+            fodem.HashingEmbedder(dimension=64).embed_texts(texts),
+            vectors.tolist(),
+        )
+        np.testing.assert_allclose(
+            np.linalg.norm(vectors[:3], axis=1), 1.0, rtol=1e-5
+        )
+
+        ## texts without terms have zero vectors
+        self.assertFalse(vectors[3].any())
+
+        ## texts that share terms are more similar
+        self.assertGreater(vectors[0] @ vectors[1], vectors[0] @ vectors[2])
+
+    def test_make_embedder(self):
+        embedder = fodem.make_embedder("hashing", dimension=32)
+        self.assertIsInstance(embedder, fodem.HashingEmbedder)
+        self.assertEqual(embedder.dimension, 32)
+
+        embedder = fodem.make_embedder("openai")
+        self.assertIsInstance(embedder, fodem.OpenAIEmbedder)
+        self.assertEqual(embedder.id, fodc.MODEL)
+        self.assertEqual(embedder.dimension, fodc.DIMENSION)
+
+        with self.assertRaises(ValueError):
+            fodem.make_embedder("word2vec")
+
+
+class GetEmbedderTests(LocalIndexTestCase):
+    def test_get_embedder(self):
+        embedder = fodc.get_embedder()
+        self.assertEqual(embedder.id, f"hashing-v1-{fodc.HASHING_DIMENSION}")
+        self.assertIs(fodc.get_embedder(), embedder)
+
+        with mock.patch.object(fodc, "_EMBEDDER", None), mock.patch.dict(
+            os.environ, {"FIFTYONE_DOCS_HASHING_DIMENSION": "128"}
+        ):
+            self.assertEqual(fodc.get_embedder().id, "hashing-v1-128")
+            self.assertEqual(len(fodc.embed_text("datasets")), 128)
+
+        with mock.patch.object(fodc, "_EMBEDDER", None), mock.patch.dict(
+            os.environ, {"FIFTYONE_DOCS_EMBEDDER": "openai"}
+        ):
+            self.assertIsInstance(fodc.get_embedder(), fodem.OpenAIEmbedder)
+
+    def test_validate_dimension(self):
+        docs_index_file, ids = self.write_json_index(10)
+        fodi.load_index(docs_index_file, num_workers=1)
+
+        ## indexes are never loaded with vectors of another dimension, and
+        ## the existing collection is kept
+        with mock.patch.object(fodc, "_EMBEDDER", None), mock.patch.dict(
+            os.environ, {"FIFTYONE_DOCS_HASHING_DIMENSION": "128"}
+        ):
+            with self.assertRaises(ValueError):
+                fodi.load_index(docs_index_file, num_workers=1)
+
+        self.assertSetEqual(self.get_point_ids(), ids)
+
+    def test_openai_embedder_start_close(self):
+        client = mock.Mock()
+        with mock.patch.object(fodc, "_EMBEDDING_CLIENT", client):
+            embedder = fodem.OpenAIEmbedder()
+            embedder.start()
+            client.start.assert_called_once()
+
+            embedder.close()
+            client.close.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
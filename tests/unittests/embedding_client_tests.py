@@ -0,0 +1,198 @@
+"""
+Embedding client tests.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import asyncio
+import random
+import threading
+import time
+import unittest
+
+from aiohttp import web
+
+from fiftyone.docs_search.embedding_client import AsyncEmbeddingClient
+
+
+class FakeEmbeddingServer(object):
+    """A local OpenAI-compatible embeddings server that records the requests
+    it receives, and answers the first ``num_failures`` of them with a 429.
+    """
+
+    def __init__(self, num_failures=0):
+        self.num_failures = num_failures
+        self.requests = []
+
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self.port = None
+
+    def __enter__(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, daemon=True
+        )
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    def __exit__(self, *args):
+        asyncio.run_coroutine_threadsafe(
+            self._runner.cleanup(), self._loop
+        ).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    async def _start(self):
+        app = web.Application()
+        app.router.add_post("/v1/embeddings", self._embeddings)
+        app.router.add_post(
+            "/openai/deployments/{deployment}/embeddings", self._embeddings
+        )
+
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def _embeddings(self, request):
+        body = await request.json()
+        self.requests.append(
+            {
+                "path": request.path,
+                "query": dict(request.query),
+                "headers": dict(request.headers),
+                "body": body,
+            }
+        )
+
+        if len(self.requests) <= self.num_failures:
+            return web.Response(
+                status=429, headers={"retry-after-ms": "10"}, text="slow down"
+            )
+
+        ## the API doesn't guarantee that results are returned in order
+        data = [
+            {"index": i, "embedding": [float(len(text)), float(i)]}
+            for i, text in enumerate(body["input"])
+        ]
+        random.shuffle(data)
+        return web.json_response({"data": data})
+
+
+class AsyncEmbeddingClientTests(unittest.TestCase):
+    def test_embed_batches(self):
+        batches = [["a", "bb", "ccc"], ["dddd"], ["eeeee", "ffffff"]]
+
+        with FakeEmbeddingServer(num_failures=1) as server:
+            client = AsyncEmbeddingClient(
+                "test-model",
+                api_key="test-key",
+                api_base=f"http://127.0.0.1:{server.port}/v1",
+                api_type="open_ai",
+                organization="test-org",
+            )
+            completed = []
+            embeddings = client.embed_batches(
+                batches, callback=lambda i, e: completed.append(i)
+            )
+
+        self.assertListEqual(
+            embeddings,
+            [
+                [[1.0, 0.0], [2.0, 1.0], [3.0, 2.0]],
+                [[4.0, 0.0]],
+                [[5.0, 0.0], [6.0, 1.0]],
+            ],
+        )
+        self.assertListEqual(sorted(completed), [0, 1, 2])
+        self.assertEqual(client.num_requests, 4)
+        self.assertEqual(client.num_retries, 1)
+
+        request = server.requests[-1]
+        self.assertEqual(request["path"], "/v1/embeddings")
+        self.assertEqual(request["body"]["model"], "test-model")
+        self.assertEqual(
+            request["headers"]["Authorization"], "Bearer test-key"
+        )
+        self.assertEqual(request["headers"]["OpenAI-Organization"], "test-org")
+
+    def test_persistent_session(self):
+        with FakeEmbeddingServer() as server:
+            client = AsyncEmbeddingClient(
+                "test-model",
+                api_base=f"http://127.0.0.1:{server.port}/v1",
+                api_type="open_ai",
+            )
+            client.start()
+            try:
+                first = client.embed_batches([["a"]])
+                second = client.embed_batches([["bb"]])
+            finally:
+                client.close()
+
+        self.assertListEqual(first, [[[1.0, 0.0]]])
+        self.assertListEqual(second, [[[2.0, 0.0]]])
+
+    def test_shared_rate_limits(self):
+        with FakeEmbeddingServer() as server:
+            client = AsyncEmbeddingClient(
+                "test-model",
+                api_base=f"http://127.0.0.1:{server.port}/v1",
+                api_type="open_ai",
+                requests_per_minute=600,
+                tokens_per_minute=6000,
+                token_counter=len,
+            )
+
+            ## the first call spends the whole token budget...
+            client.embed_batches([["a" * 3000], ["b" * 3000]])
+
+            ## ...so the second call must wait for 50 tokens to be refilled
+            ## at 100 tokens per second, even though it runs on a new loop
+            start = time.monotonic()
+            embeddings = client.embed_batches([["c" * 50]])
+            elapsed = time.monotonic() - start
+
+        self.assertListEqual(embeddings, [[[50.0, 0.0]]])
+        self.assertGreaterEqual(elapsed, 0.4)
+        self.assertLess(client._request_bucket.tokens, 598)
+
+    def test_azure(self):
+        with FakeEmbeddingServer() as server:
+            client = AsyncEmbeddingClient(
+                "test-model",
+                api_key="test-key",
+                api_base=f"http://127.0.0.1:{server.port}",
+                api_type="azure",
+                api_version="2023-05-15",
+                deployment_id="test-deployment",
+            )
+            embeddings = client.embed_batches([["a"]])
+
+        self.assertListEqual(embeddings, [[[1.0, 0.0]]])
+
+        request = server.requests[0]
+        self.assertEqual(
+            request["path"], "/openai/deployments/test-deployment/embeddings"
+        )
+        self.assertDictEqual(request["query"], {"api-version": "2023-05-15"})
+        self.assertEqual(request["headers"]["api-key"], "test-key")
+        self.assertNotIn("Authorization", request["headers"])
+
+    def test_invalid_api_settings(self):
+        with self.assertRaises(ValueError):
+            AsyncEmbeddingClient("test-model", api_type="unknown")
+
+        with self.assertRaises(ValueError):
+            AsyncEmbeddingClient(
+                "test-model", api_type="azure", api_version=""
+            )
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,111 @@
+"""
+HTML content extraction tests.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import unittest
+
+from bs4 import BeautifulSoup
+
+import fiftyone.docs_search.extract_html as fode
+
+
+def _make_page(body, head="", nav="<nav><a href='/'>Home</a></nav>"):
+    return (
+        "<!DOCTYPE html><html><head><title>Page</title>"
+        f"<style>body {{ color: red; }}</style>{head}</head>"
+        f"<body>{nav}{body}<footer>Copyright</footer></body></html>"
+    )
+
+
+def _get_text(html):
+    return BeautifulSoup(html, "html.parser").get_text()
+
+
+class ExtractContentHTMLTests(unittest.TestCase):
+    def test_content_regions(self):
+        article = '<article itemprop="articleBody"><p>Article</p></article>'
+        main = '<div role="main"><p>Main</p></div>'
+        body = (
+            '<div class="document"><div class="body"><p>Body</p></div></div>'
+        )
+
+        ## the pytorch theme's article takes precedence over the other themes
+        html = _make_page(f'<div role="main">{article}<p>Main</p></div>{body}')
+        self.assertEqual(fode.extract_content_html(html), article)
+
+        html = _make_page(body + main)
+        self.assertEqual(fode.extract_content_html(html), main)
+
+        html = _make_page(body)
+        self.assertEqual(
+            fode.extract_content_html(html),
+            '<div class="body"><p>Body</p></div>',
+        )
+
+        ## pages without a content region are used whole
+        html = _make_page("<p>Text</p>")
+        self.assertEqual(
+            _get_text(fode.extract_content_html(html)),
+            "PageHomeTextCopyright",
+        )
+
+    def test_dropped_elements(self):
+        html = _make_page(
+            '<article itemprop="articleBody"><p>Intro</p>'
+            '<script>var s = "</div></article>";</script>'
+            "<style>p { margin: 0; }</style>"
+            "<noscript><p>Enable JavaScript</p></noscript>"
+            "<template><p>Template</p></template>"
+            '<img src="data:image/png;base64,AAAA" alt="inline">'
+            '<img src="_images/plot.png" alt="plot">'
+            "<p>Outro</p></article>"
+        )
+
+        content = fode.extract_content_html(html)
+        self.assertEqual(
+            content,
+            '<article itemprop="articleBody"><p>Intro</p>'
+            '<img src="_images/plot.png" alt="plot">'
+            "<p>Outro</p></article>",
+        )
+
+    def test_tricky_markup(self):
+        html = _make_page(
+            "<!-- <article itemprop='articleBody'>comment</article> -->"
+            '<DIV class="wrapper"><ARTICLE ITEMPROP="articleBody" '
+            'data-x="a > b"><p>One<p>Two<br>'
+            '<a title="</article>" href="#">Three</a>'
+            "<ul><li>Four<li>Five</ul></ARTICLE></DIV>"
+        )
+
+        content = fode.extract_content_html(html)
+        self.assertTrue(content.startswith("<ARTICLE"))
+        self.assertTrue(content.endswith("</ARTICLE>"))
+        self.assertEqual(_get_text(content), "OneTwoThreeFourFive")
+
+    def test_matches_beautifulsoup(self):
+        sections = "".join(
+            f'<section id="s{i}"><h2>Section {i}</h2><p>Text {i}</p>'
+            f"<pre><code>x = {i}</code></pre>"
+            f"<script>render({i});</script></section>"
+            for i in range(20)
+        )
+        html = _make_page(
+            '<div class="container"><div role="main">'
+            f'<article itemprop="articleBody">{sections}</article>'
+            "</div></div>",
+            head="<script>var x = '<article>';</script>",
+        )
+
+        soup = BeautifulSoup(html, "html.parser")
+        article = soup.find("article", attrs={"itemprop": "articleBody"})
+        for script in article.find_all("script"):
+            script.decompose()
+
+        self.assertEqual(fode.extract_content_html(html), str(article))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,63 @@
+"""
+Import time tests.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import json
+import subprocess
+import sys
+import unittest
+
+## the modules that a query must not import, because it doesn't need them
+HEAVY_MODULES = (
+    "aiohttp",
+    "google.cloud.storage",
+    "markdownify",
+    "numpy",
+    "openai",
+    "qdrant_client",
+    "tqdm",
+)
+
+## the maximum time, in seconds, that importing the query path may add to the
+## time to import `fiftyone`
+IMPORT_TIME_BUDGET = 0.5
+
+_SCRIPT = """
+import json
+import sys
+import time
+
+import fiftyone
+
+before = set(sys.modules)
+start = time.perf_counter()
+
+import fiftyone.docs_search.cli
+import fiftyone.docs_search.query_index
+
+elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed": elapsed, "imported": sorted(set(sys.modules) - before)}))
+"""
+
+
+class ImportTests(unittest.TestCase):
+    def _import_query_path(self):
+        ## imports are cached, so they are timed in a fresh interpreter
+        output = subprocess.check_output([sys.executable, "-c", _SCRIPT])
+        return json.loads(output.decode().splitlines()[-1])
+
+    def test_query_imports(self):
+        imported = set(self._import_query_path()["imported"])
+        heavy = [module for module in HEAVY_MODULES if module in imported]
+        self.assertListEqual(heavy, [])
+
+    def test_query_import_time(self):
+        ## the best of several runs, to discount a busy machine
+        elapsed = min(self._import_query_path()["elapsed"] for _ in range(3))
+        self.assertLess(elapsed, IMPORT_TIME_BUDGET)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
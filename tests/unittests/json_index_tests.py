@@ -0,0 +1,180 @@
+"""
+JSON index tests.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import fiftyone.docs_search.create_index as fodi
+import fiftyone.docs_search.json_index as fodj
+
+from tests.unittests.utils import LocalIndexTestCase
+
+
+WRITERS = {"json": fodj.JSONIndexWriter, "jsonl": fodj.JSONLIndexWriter}
+
+
+class IterJSONIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def _write(self, contents):
+        path = os.path.join(self.tmp_dir, "index.json")
+        with open(path, "w") as f:
+            f.write(contents)
+
+        return path
+
+    def test_iter_json_index(self):
+        docs_json = {
+            f"id{i}": {
+                "vector": [i, 0.5, -1.25e-3],
+                "text": f'chunk {i} {{"quoted"}}: [¶]\n',
+                "doc_type": "user_guide",
+            }
+            for i in range(7)
+        }
+        path = self._write(json.dumps(docs_json, indent=4))
+
+        ## reads that split the file mid-token must not change the records
+        for read_size in (1, 7, 1024**2):
+            records = list(fodj.iter_json_index(path, read_size=read_size))
+            self.assertListEqual(records, list(docs_json.items()))
+
+    def test_empty(self):
+        path = self._write(" {\n} ")
+        self.assertListEqual(list(fodj.iter_json_index(path)), [])
+
+    def test_invalid(self):
+        for contents in ("[]", '{"id0": {}', '{"id0" {}}'):
+            path = self._write(contents)
+            with self.assertRaises(ValueError):
+                list(fodj.iter_json_index(path, read_size=3))
+
+
+class JSONIndexWriterTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def _get_points(self, num_points):
+        ids = [f"id{i}" for i in range(num_points)]
+        vectors = [[i, 0.5, -1.25] for i in range(num_points)]
+        payloads = [
+            {"text": f'chunk {i} "quoted"\n', "doc_type": "user_guide"}
+            for i in range(num_points)
+        ]
+        return ids, vectors, payloads
+
+    def test_round_trip(self):
+        ids, vectors, payloads = self._get_points(7)
+
+        for format, writer_cls in WRITERS.items():
+            path = os.path.join(self.tmp_dir, f"index.{format}")
+            with writer_cls(path) as writer:
+                writer.add(ids[:3], vectors[:3], payloads[:3])
+                writer.add(ids[3:], vectors[3:], payloads[3:])
+
+            self.assertEqual(writer.count, 7)
+            self.assertFalse(os.path.exists(path + ".tmp"))
+
+            records = list(fodj.iter_index_records(path))
+            self.assertListEqual([id for id, _ in records], ids)
+            for (_, value), vector, payload in zip(records, vectors, payloads):
+                self.assertDictEqual(value, {"vector": vector, **payload})
+
+    def test_empty(self):
+        for format, writer_cls in WRITERS.items():
+            path = os.path.join(self.tmp_dir, f"index.{format}")
+            with writer_cls(path):
+                pass
+
+            self.assertListEqual(list(fodj.iter_index_records(path)), [])
+
+    def test_writer_error(self):
+        ids, vectors, payloads = self._get_points(4)
+
+        for format, writer_cls in WRITERS.items():
+            path = os.path.join(self.tmp_dir, f"index.{format}")
+            with writer_cls(path) as writer:
+                writer.add(ids[:2], vectors[:2], payloads[:2])
+
+            with open(path, "r") as f:
+                contents = f.read()
+
+            ## the write fails partway through, so the existing index must
+            ## be left untouched
+            with self.assertRaises(RuntimeError):
+                with writer_cls(path) as writer:
+                    writer.add(ids, vectors, payloads)
+                    raise RuntimeError("interrupted")
+
+            with open(path, "r") as f:
+                self.assertEqual(f.read(), contents)
+
+            self.assertFalse(os.path.exists(path + ".tmp"))
+
+
+class SaveIndexTests(LocalIndexTestCase):
+    def setUp(self):
+        super().setUp()
+
+        docs_index_file, self.ids = self.write_json_index(23)
+        fodi.load_index(docs_index_file, batch_size=5, num_workers=1)
+
+        self.records = dict(fodj.iter_index_records(docs_index_file))
+
+    def test_save_index(self):
+        for format in ("json", "jsonl"):
+            for prefetch in (True, False):
+                path = os.path.join(self.tmp_dir, f"export.{format}")
+
+                ## a page size that doesn't divide the number of points
+                fodi.save_index(
+                    docs_index_path=path,
+                    format=format,
+                    batch_size=4,
+                    prefetch=prefetch,
+                )
+
+                records = list(fodj.iter_index_records(path))
+                self.assertEqual(len(records), len(self.ids))
+                self.assertDictEqual(dict(records), self.records)
+
+    def test_failed_save_index(self):
+        path = os.path.join(self.tmp_dir, "export.json")
+        fodi.save_index(docs_index_path=path, format="json", batch_size=4)
+
+        with open(path, "r") as f:
+            contents = f.read()
+
+        iter_index_points = fodi.iter_index_points
+
+        def _iter_index_points(*args, **kwargs):
+            for idx, points in enumerate(iter_index_points(*args, **kwargs)):
+                if idx == 2:
+                    raise ConnectionError("Qdrant went away")
+
+                yield points
+
+        with mock.patch.object(fodi, "iter_index_points", _iter_index_points):
+            with self.assertRaises(ConnectionError):
+                fodi.save_index(
+                    docs_index_path=path, format="json", batch_size=4
+                )
+
+        with open(path, "r") as f:
+            self.assertEqual(f.read(), contents)
+
+        self.assertEqual(json.loads(contents).keys(), self.records.keys())
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,269 @@
+"""
+Lexical index tests.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import math
+import os
+import unittest
+from unittest import mock
+import uuid
+
+import fiftyone.docs_search.common as fodc
+import fiftyone.docs_search.create_index as fodi
+import fiftyone.docs_search.lexical_index as fodl
+import fiftyone.docs_search.query_index as fodq
+import fiftyone.docs_search.search_backends as fods
+
+from tests.unittests.utils import LocalIndexTestCase
+
+
+TEXTS = [
+    "Load a dataset with fo.load_dataset()",
+    "Compute embeddings with compute_embeddings() and visualize them",
+    "Export a dataset to disk in COCO format",
+    "Evaluate detections and compute mAP",
+    "The App lets you visualize a dataset",
+    "dataset dataset dataset dataset dataset dataset dataset dataset",
+]
+
+
+def _make_points(texts, doc_types=("user_guide", "tutorials")):
+    ids = [str(uuid.uuid5(uuid.NAMESPACE_URL, text)) for text in texts]
+    payloads = [
+        {
+            "text": text,
+            "url": f"https://docs.voxel51.com/page{i}.html",
+            "section_anchor": "intro",
+            "doc_type": doc_types[i % len(doc_types)],
+        }
+        for i, text in enumerate(texts)
+    ]
+    return ids, payloads
+
+
+def _bm25(query, texts, k1=fodl.BM25_K1, b=fodl.BM25_B):
+    ## a direct implementation of BM25
+    docs = [fodl.tokenize(text) for text in texts]
+    avg_length = sum(len(doc) for doc in docs) / len(docs)
+    scores = []
+    for doc in docs:
+        score = 0.0
+        for term in set(fodl.tokenize(query)):
+            df = sum(term in d for d in docs)
+            tf = doc.count(term)
+            if tf == 0:
+                continue
+
+            idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+            norm = k1 * (1 - b + b * len(doc) / avg_length)
+            score += idf * tf * (k1 + 1) / (tf + norm)
+
+        scores.append(score)
+
+    return scores
+
+
+class TokenizeTests(unittest.TestCase):
+    def test_tokenize(self):
+        self.assertListEqual(
+            fodl.tokenize("Call fo.load_dataset() on My\\_Dataset!"),
+            [
+                "call",
+                "fo.load_dataset",
+                "fo",
+                "load",
+                "dataset",
+                "on",
+                "my_dataset",
+                "my",
+                "dataset",
+            ],
+        )
+        self.assertListEqual(fodl.tokenize("... -- !"), [])
+
+    def test_normalize_point_id(self):
+        id = uuid.uuid4()
+        self.assertEqual(fodl.normalize_point_id(id.hex), str(id))
+        self.assertEqual(fodl.normalize_point_id(str(id).upper()), str(id))
+        self.assertEqual(fodl.normalize_point_id(7), 7)
+        self.assertEqual(fodl.normalize_point_id("not-a-uuid"), "not-a-uuid")
+
+
+class LexicalIndexTests(LocalIndexTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.ids, self.payloads = _make_points(TEXTS)
+        builder = fodl.LexicalIndexBuilder()
+        builder.add(self.ids, self.payloads)
+        self.builder = builder
+        self.index = builder.build()
+
+    def test_bm25(self):
+        for query in ("dataset", "visualize a dataset", "compute_embeddings"):
+            expected = _bm25(query, TEXTS)
+            scores = self.index.score(query)
+            for score, _score in zip(scores, expected):
+                self.assertAlmostEqual(float(score), _score, places=5)
+
+            results = self.index.search(query, top_k=3)
+            self.assertListEqual(
+                [r[1] for r in results],
+                sorted(s for s in scores.tolist() if s > 0)[::-1][:3],
+            )
+
+    def test_search(self):
+        ## identifiers match exactly and by their parts
+        results = self.index.search("compute_embeddings")
+        self.assertEqual(results[0][2]["text"], TEXTS[1])
+
+        results = self.index.search("load dataset")
+        self.assertEqual(results[0][2]["text"], TEXTS[0])
+
+        ## term frequencies saturate
+        results = self.index.search("dataset", top_k=10)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[0][2]["text"], TEXTS[5])
+
+        ## points that match no terms are never returned
+        self.assertListEqual(self.index.search("segmentation"), [])
+        self.assertListEqual(self.index.search("dataset", top_k=0), [])
+
+        results = self.index.search("dataset", doc_types=["tutorials"])
+        self.assertSetEqual({r[2]["doc_type"] for r in results}, {"tutorials"})
+        self.assertListEqual(
+            self.index.search("dataset", doc_types=["recipes"]), []
+        )
+
+    def test_untyped_points(self):
+        ## points without a doc type are never indexed
+        builder = fodl.LexicalIndexBuilder()
+        ids, payloads = _make_points(TEXTS, doc_types=("user_guide", None))
+        builder.add(ids, payloads)
+        self.assertEqual(len(builder), 3)
+
+    def test_write_load(self):
+        path = os.path.join(self.tmp_dir, "lexical", "index.json")
+        self.builder.write(path)
+        self.assertFalse(os.path.exists(path + ".tmp"))
+
+        index = fodl.load_lexical_index(path)
+        self.assertEqual(len(index), len(TEXTS))
+        for query in ("dataset", "compute mAP"):
+            self.assertListEqual(index.search(query), self.index.search(query))
+
+        with open(path, "w") as f:
+            f.write("{}")
+
+        with self.assertRaises(ValueError):
+            fodl.load_lexical_index(path)
+
+
+class HybridSearchTests(LocalIndexTestCase):
+    def setUp(self):
+        super().setUp()
+
+        ids, payloads = _make_points(TEXTS)
+        vectors = fodc.embed_texts(TEXTS)
+        fodi.initialize_index()
+        fodi.add_vectors_to_index(ids, vectors, payloads)
+        fodi.build_lexical_index()
+
+    def test_load_index(self):
+        ## loading an index also builds its lexical index
+        docs_index_file, ids = self.write_json_index(
+            10, doc_types=["user_guide", None]
+        )
+        fodi.load_index(docs_index_file, num_workers=1)
+
+        path = fodl.get_lexical_index_path(fodc.get_collection_name())
+        index = fodl.load_lexical_index(path)
+        self.assertEqual(len(index), 5)
+        self.assertTrue(set(index.ids).issubset(ids))
+
+    def test_fuse_results(self):
+        def _results(ids):
+            return [fods.SearchResult(id, 1.0, {"id": id}) for id in ids]
+
+        a, b, c, d = (str(uuid.uuid4()) for _ in range(4))
+        fused = fods.fuse_results(
+            [_results([a, b, c]), _results([d, c, a.upper()])], top_k=3, k=60
+        )
+
+        ## IDs are normalized, and scores are summed reciprocal ranks
+        self.assertListEqual([r.id for r in fused], [a, c, d])
+        self.assertAlmostEqual(fused[0].score, 1 / 61 + 1 / 63)
+        self.assertAlmostEqual(fused[1].score, 1 / 63 + 1 / 62)
+        self.assertAlmostEqual(fused[2].score, 1 / 61)
+
+    def test_lexical_mode(self):
+        embedder = fodc.get_embedder()
+        with mock.patch.object(
+            embedder, "embed_texts", side_effect=AssertionError
+        ):
+            results = fodq.query_index(
+                "compute_embeddings", backend="qdrant", mode="lexical"
+            )
+
+        self.assertEqual(results[0][1], TEXTS[1])
+
+        with mock.patch.dict(
+            os.environ, {"FIFTYONE_DOCS_SEARCH_MODE": "lexical"}
+        ), mock.patch.object(
+            embedder, "embed_texts", side_effect=AssertionError
+        ):
+            self.assertListEqual(
+                fodq.query_index("compute_embeddings", backend="qdrant"),
+                results,
+            )
+
+        with self.assertRaises(ValueError):
+            fodq.query_index("dataset", mode="semantic")
+
+    def test_hybrid_mode(self):
+        query = "visualize a dataset"
+        backend = fods.get_search_backend("qdrant")
+
+        vector_results = backend.search(
+            fodc.embed_text(query), top_k=fodc.HYBRID_NUM_CANDIDATES
+        )
+        lexical_results = backend.search_lexical(
+            query, top_k=fodc.HYBRID_NUM_CANDIDATES
+        )
+        expected = fods.fuse_results(
+            [vector_results, lexical_results], top_k=3
+        )
+
+        results = fodq.query_index(
+            query, top_k=3, backend="qdrant", mode="hybrid"
+        )
+        self.assertListEqual(
+            [r[1] for r in results], [r.payload["text"] for r in expected]
+        )
+        for result, _result in zip(results, expected):
+            self.assertAlmostEqual(result[2], _result.score)
+
+    def test_lexical_index_rebuilt(self):
+        backend = fods.get_search_backend("qdrant")
+        self.assertEqual(len(backend.get_lexical_index()), len(TEXTS))
+
+        ## the lexical index is rebuilt when it is missing and reloaded when
+        ## it is rewritten
+        path = fodl.get_lexical_index_path(fodc.get_collection_name())
+        os.remove(path)
+        self.assertEqual(len(backend.get_lexical_index()), len(TEXTS))
+        self.assertTrue(os.path.exists(path))
+
+        ids, payloads = _make_points(["Brand new chunk"])
+        fodi.add_vectors_to_index(ids, fodc.embed_texts(["Brand"]), payloads)
+        fodi.build_lexical_index()
+        os.utime(path, (0, 0))
+
+        self.assertEqual(len(backend.get_lexical_index()), len(TEXTS) + 1)
+        self.assertEqual(len(backend.search_lexical("brand")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
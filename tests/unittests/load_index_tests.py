@@ -0,0 +1,96 @@
+"""
+Index loading tests.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import os
+import unittest
+from unittest import mock
+
+import fiftyone.docs_search.cli as fodcli
+import fiftyone.docs_search.common as fodc
+import fiftyone.docs_search.create_index as fodi
+
+from tests.unittests.utils import LocalIndexTestCase
+
+
+class LoadIndexTests(LocalIndexTestCase):
+    def test_load_index(self):
+        docs_index_file, ids = self.write_json_index(23)
+
+        ## points are upserted batch by batch as they are read. The in-memory
+        ## client is not thread-safe, so uploads use one worker
+        with mock.patch.object(
+            fodi, "add_vectors_to_index", wraps=fodi.add_vectors_to_index
+        ) as add_vectors_to_index, mock.patch.object(
+            fodi, "restore_indexing"
+        ) as restore_indexing:
+            fodi.load_index(docs_index_file, batch_size=5, num_workers=1)
+
+        self.assertListEqual(
+            [len(call[0][0]) for call in add_vectors_to_index.call_args_list],
+            [5, 5, 5, 5, 3],
+        )
+        self.assertSetEqual(self.get_point_ids(), ids)
+        restore_indexing.assert_called_once_with(indexing_threshold=20000)
+        self.assertTrue(
+            os.path.exists(
+                fodi.get_lexical_index_path(fodc.get_collection_name())
+            )
+        )
+
+    def test_load_default_index(self):
+        docs_index_file, ids = self.write_json_index(7)
+
+        parser = fodcli._register_main_command(
+            fodcli.FiftyOneDocsSearchCommand
+        )
+        args = parser.parse_args(["load", "--num_workers", "1"])
+        self.assertIsNone(args.in_path)
+
+        ## the CLI loads the downloaded index by default, regardless of the
+        ## working directory
+        with mock.patch.object(
+            fodi, "FIFTYONE_DOCS_INDEX_FILEPATH", docs_index_file
+        ):
+            args.execute(args)
+
+        self.assertSetEqual(self.get_point_ids(), ids)
+
+    def test_load_index_lost_upsert(self):
+        docs_index_file, _ = self.write_json_index(23)
+
+        ## an upsert that is accepted but then fails to be applied
+        upload_batch = fodi._upload_batch
+        num_batches = []
+
+        def _upload_batch(ids, vectors, payloads):
+            num_batches.append(len(ids))
+            if len(num_batches) == 2:
+                return len(ids)
+
+            return upload_batch(ids, vectors, payloads)
+
+        with mock.patch.object(fodi, "_upload_batch", _upload_batch):
+            with self.assertRaises(RuntimeError):
+                fodi.load_index(docs_index_file, batch_size=5, num_workers=1)
+
+    def test_load_index_failed_upload(self):
+        docs_index_file, _ = self.write_json_index(23)
+
+        def _upload_batch(ids, vectors, payloads):
+            raise ConnectionError("Qdrant went away")
+
+        ## indexing is restored even though the load fails
+        with mock.patch.object(
+            fodi, "_upload_batch", _upload_batch
+        ), mock.patch.object(fodi, "restore_indexing") as restore_indexing:
+            with self.assertRaises(ConnectionError):
+                fodi.load_index(docs_index_file, batch_size=5, num_workers=1)
+
+        restore_indexing.assert_called_once_with(indexing_threshold=20000)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
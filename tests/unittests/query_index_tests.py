@@ -0,0 +1,135 @@
+"""
+Index querying tests.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import io
+import json
+import os
+import unittest
+from unittest import mock
+
+import fiftyone.docs_search.cli as fodcli
+import fiftyone.docs_search.common as fodc
+import fiftyone.docs_search.create_index as fodi
+import fiftyone.docs_search.query_index as fodq
+import fiftyone.docs_search.search_backends as fods
+
+from tests.unittests.utils import LocalIndexTestCase
+
+
+class QueryIndexBatchTests(LocalIndexTestCase):
+    def setUp(self):
+        super().setUp()
+
+        docs_index_file, _ = self.write_json_index(
+            40, doc_types=["user_guide", "tutorials"]
+        )
+        fodi.load_index(docs_index_file, num_workers=1)
+
+        index_path = os.path.join(self.tmp_dir, "index")
+        fodi.convert_index(docs_index_file, index_path)
+
+        patch = mock.patch.object(
+            fods, "FIFTYONE_DOCS_BINARY_INDEX_PATH", index_path
+        )
+        patch.start()
+        self.addCleanup(patch.stop)
+
+        self.queries = [
+            "chunk 3 about datasets",
+            "chunk 17",
+            "datasets",
+            "chunk 3 about datasets",
+        ]
+
+    def _assert_same_results(self, results, expected, msg=None):
+        ## batch scores may differ in the last bits, so results with tied
+        ## scores may be returned in a different order
+        self.assertEqual(len(results), len(expected), msg=msg)
+        scores = [r[2] for r in expected]
+        for result, _result in zip(results, expected):
+            self.assertAlmostEqual(result[2], _result[2], places=5, msg=msg)
+
+            num_tied = sum(abs(_result[2] - score) < 1e-5 for score in scores)
+            if num_tied == 1 and _result[2] > scores[-1] + 1e-5:
+                self.assertTupleEqual(result[:2], _result[:2], msg=msg)
+
+    def test_query_index_batch(self):
+        for backend in ("qdrant", "numpy"):
+            for mode in ("vector", "lexical", "hybrid"):
+                for doc_types in (None, ["tutorials"]):
+                    kwargs = dict(
+                        top_k=5,
+                        doc_types=doc_types,
+                        backend=backend,
+                        mode=mode,
+                    )
+                    batch_results = fodq.query_index_batch(
+                        self.queries, **kwargs
+                    )
+
+                    msg = f"{backend}, {mode}, {doc_types}"
+                    self.assertEqual(len(batch_results), 4, msg=msg)
+                    for query, results in zip(self.queries, batch_results):
+                        expected = fodq.query_index(query, **kwargs)
+                        self._assert_same_results(results, expected, msg)
+
+        self.assertListEqual(fodq.query_index_batch([]), [])
+
+    def test_one_embedding_request(self):
+        embedder = fodc.get_embedder()
+        with mock.patch.object(
+            embedder, "embed_texts", wraps=embedder.embed_texts
+        ) as embed_texts:
+            fodq.query_index_batch(self.queries, backend="qdrant")
+            self.assertEqual(embed_texts.call_count, 1)
+
+            ## lexical searches never embed their queries
+            fodq.query_index_batch(
+                self.queries, backend="qdrant", mode="lexical"
+            )
+            self.assertEqual(embed_texts.call_count, 1)
+
+    def test_batch_cli(self):
+        queries_path = os.path.join(self.tmp_dir, "queries.txt")
+        with open(queries_path, "w") as f:
+            f.write("\n".join(self.queries[:2]) + "\n\n  \n")
+
+        parser = fodcli._register_main_command(
+            fodcli.FiftyOneDocsSearchCommand
+        )
+        args = parser.parse_args(
+            ["query", "--batch", queries_path, "-n", "3", "-b", "numpy"]
+        )
+
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            args.execute(args)
+
+        ## blank lines are skipped, and each query is written as a JSON line
+        records = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertListEqual([r["query"] for r in records], self.queries[:2])
+
+        for record in records:
+            expected = fodq.query_index(
+                record["query"], top_k=3, backend="numpy"
+            )
+            results = [
+                (r["url"], r["text"], r["score"]) for r in record["results"]
+            ]
+            self._assert_same_results(results, expected)
+
+        args = parser.parse_args(["query", "--batch", "-", "-b", "numpy"])
+        with mock.patch("sys.stdin", io.StringIO("datasets\n")), mock.patch(
+            "sys.stdout", new_callable=io.StringIO
+        ) as stdout:
+            args.execute(args)
+
+        record = json.loads(stdout.getvalue())
+        self.assertEqual(record["query"], "datasets")
+        self.assertEqual(len(record["results"]), 10)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,244 @@
+"""
+Docs parsing tests.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import os
+import random
+import re
+import time
+import unittest
+
+import fiftyone.docs_search.read_docs as fodr
+
+from tests.unittests.utils import LocalIndexTestCase
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "fixtures", "markdown"
+)
+
+## fixtures that the fused engine cleans without falling back. The others
+## contain line-numbered code tables, whose fences share a line with text
+FUSED_FIXTURES = ("edge_cases", "sphinx_page")
+
+## lines from which random pages are assembled, chosen to trip every stage
+_TOKENS = (
+    "",
+    " ",
+    "# Title",
+    "## Section",
+    "text",
+    "```",
+    "```py",
+    "  12  x = 1",
+    "| --- |",
+    "| a | b |",
+    "!",
+    "!img-name",
+    "![](data:image/png;base64,AAA) tail",
+    "[link](http://x)",
+    '[¶](#anchor "Permalink")',
+    "[ 3]:",
+    "[",
+    "{json}",
+    "jupyter-widgets",
+    "<?xml v",
+    "@import url",
+    "#focontainer {",
+    "}",
+    "(function() {",
+    "})();",
+    "\\_under\\*",
+    "─’“©",
+    "[Next ![](x)",
+)
+
+
+_LINK_PATTERN = re.compile(r"\[.*?\]\(.*?\)")
+
+
+def _remove_links_reference(page_md):
+    ## the original recursive implementation of `remove_links()`, unrolled
+    ## into a loop so that it can run on pages with many links
+    parts = []
+    pos = 0
+    match = _LINK_PATTERN.search(page_md, pos)
+    while match is not None:
+        start, end = match.span()
+        link = page_md[start:end]
+        link_text = link[1:].split("]")[0]
+        if link_text != "¶":
+            parts.append(page_md[pos:start] + link_text)
+        else:
+            parts.append(page_md[pos:end] + link)
+
+        pos = end
+        match = _LINK_PATTERN.search(page_md, pos)
+
+    parts.append(page_md[pos:])
+    return "".join(parts)
+
+
+def _read(filename):
+    with open(os.path.join(FIXTURES_DIR, filename), encoding="utf-8") as f:
+        return f.read()
+
+
+def _get_fixture_names():
+    return sorted(
+        filename[: -len(".txt")]
+        for filename in os.listdir(FIXTURES_DIR)
+        if not filename.endswith(".expected.txt")
+    )
+
+
+class ParsePageMarkdownTests(unittest.TestCase):
+    def test_golden_files(self):
+        names = _get_fixture_names()
+        self.assertTrue(set(FUSED_FIXTURES).issubset(names))
+
+        for name in names:
+            with self.subTest(fixture=name):
+                page_md = _read(name + ".txt")
+                expected = _read(name + ".expected.txt")
+
+                self.assertEqual(
+                    fodr.parse_page_markdown_staged(page_md), expected
+                )
+                self.assertEqual(fodr.parse_page_markdown(page_md), expected)
+
+                fused = fodr._clean_page_markdown_fused(page_md)
+                if name in FUSED_FIXTURES:
+                    self.assertIsNotNone(fused)
+
+                if fused is not None:
+                    self.assertEqual(fused, expected)
+
+    def test_random_pages(self):
+        rng = random.Random(51)
+        num_fused = 0
+        for _ in range(2000):
+            page_md = "\n".join(
+                rng.choice(_TOKENS) for _ in range(rng.randint(0, 30))
+            )
+            expected = fodr.parse_page_markdown_staged(page_md)
+
+            fused = fodr._clean_page_markdown_fused(page_md)
+            if fused is not None:
+                num_fused += 1
+                self.assertEqual(fused, expected, msg=repr(page_md))
+
+            self.assertEqual(
+                fodr.parse_page_markdown(page_md), expected, msg=repr(page_md)
+            )
+
+        ## most random pages must exercise the fused engine
+        self.assertGreater(num_fused, 1000)
+
+
+class RemoveLinksTests(unittest.TestCase):
+    def test_many_links(self):
+        rng = random.Random(51)
+        lines = []
+        for i in range(20000):
+            r = rng.random()
+            if r < 0.4:
+                lines.append(f"See [page {i}](../page_{i}.html) and [x](y).")
+            elif r < 0.6:
+                lines.append(f'## Section {i}[¶](#s-{i} "Permalink")')
+            elif r < 0.8:
+                lines.append(f"[nested [link]](a) [not a link] (b) [{i}]")
+            else:
+                lines.append(f"[unclosed](link and [another](one) ) [")
+
+        page_md = "\n".join(lines)
+        self.assertGreater(page_md.count("]("), 30000)
+
+        start = time.perf_counter()
+        result = fodr.remove_links(page_md)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(result, _remove_links_reference(page_md))
+
+        ## the recursive implementation hit the recursion limit here, and
+        ## took quadratic time on pages this size
+        self.assertLess(elapsed, 5.0)
+
+    def test_many_brackets(self):
+        ## brackets that open no link are skipped up to the end of their line
+        page_md = "\n".join("[" * 500 + "](" for _ in range(200))
+        self.assertEqual(
+            fodr.remove_links(page_md), _remove_links_reference(page_md)
+        )
+
+        page_md = "[" * 100000 + "\n[link](url)"
+        self.assertEqual(fodr.remove_links(page_md), "[" * 100000 + "\nlink")
+
+    def test_random_lines(self):
+        rng = random.Random(52)
+        tokens = ("[", "]", "(", ")", "](", "¶", "a", " ", "\n", "[¶](#a)")
+        for _ in range(5000):
+            page_md = "".join(
+                rng.choice(tokens) for _ in range(rng.randint(0, 20))
+            )
+            self.assertEqual(
+                fodr.remove_links(page_md),
+                _remove_links_reference(page_md),
+                msg=repr(page_md),
+            )
+
+
+class ParseDocsTests(LocalIndexTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.filepaths = []
+        for i in range(9):
+            doc_type = ("user_guide", "tutorials", "recipes")[i % 3]
+            sections = {
+                f"section-{i}-{j}": f"Text {j} of page {i}. " * (j + 1)
+                for j in range(i % 4 + 1)
+            }
+            self.filepaths.append(
+                self.make_sphinx_page(f"{doc_type}/page{i}.html", sections)
+            )
+
+        self.make_page("api/fiftyone.core.html")
+        self.make_page("index.html")
+
+    def test_get_docs_list(self):
+        ## API reference pages and top-level pages are not indexed
+        self.assertSetEqual(set(fodr.get_docs_list()), set(self.filepaths))
+
+    def test_iter_markdown_documents(self):
+        expected = [
+            (filepath, fodr.get_markdown_documents(filepath))
+            for filepath in self.filepaths
+        ]
+        self.assertListEqual(
+            expected[4][1]["section-4-0"], ["Text 0 of page 4."]
+        )
+
+        ## results are in input order regardless of the number of workers
+        for num_workers, chunksize in ((1, None), (3, 1), (4, None)):
+            results = fodr.iter_markdown_documents(
+                self.filepaths, num_workers=num_workers, chunksize=chunksize
+            )
+            self.assertListEqual(list(results), expected, msg=num_workers)
+
+        self.assertListEqual(list(fodr.iter_markdown_documents([])), [])
+
+    def test_worker_error(self):
+        ## errors in workers are raised in the parent
+        missing = os.path.join(self.tmp_dir, "user_guide", "missing.html")
+        with self.assertRaises(FileNotFoundError):
+            list(
+                fodr.iter_markdown_documents(
+                    self.filepaths + [missing], num_workers=2
+                )
+            )
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,227 @@
+"""
+Search backend tests.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import fiftyone.docs_search.common as fodc
+import fiftyone.docs_search.create_index as fodi
+import fiftyone.docs_search.query_index as fodq
+import fiftyone.docs_search.search_backends as fods
+
+from tests.unittests.utils import LocalIndexTestCase
+
+
+class DocTypeFilterTests(LocalIndexTestCase):
+    def setUp(self):
+        super().setUp()
+
+        ## points of pages outside of the doc type folders have no doc type
+        docs_index_file, _ = self.write_json_index(
+            30, doc_types=["user_guide", "tutorials", None]
+        )
+        fodi.load_index(docs_index_file, num_workers=1)
+        self.num_points = len(self.get_point_ids())
+
+        index_path = os.path.join(self.tmp_dir, "index")
+        fodi.convert_index(docs_index_file, index_path)
+
+        self.backends = {
+            "qdrant": fods.QdrantSearchBackend(),
+            "numpy": fods.NumpySearchBackend(index_path=index_path),
+        }
+        self.query = "chunk about datasets"
+        self.vector = fodc.embed_text(self.query)
+
+    def _search(self, doc_types):
+        results = {}
+        for name, backend in self.backends.items():
+            results[name] = backend.search(
+                self.vector, top_k=100, doc_types=doc_types
+            )
+            results[name + "_lexical"] = backend.search_lexical(
+                self.query, top_k=100, doc_types=doc_types
+            )
+
+        return {
+            name: {r.payload["doc_type"] for r in _results}
+            for name, _results in results.items()
+        }
+
+    def test_all_doc_types(self):
+        for name, doc_types in self._search(fodc.DOC_TYPES).items():
+            self.assertSetEqual(
+                doc_types, {"user_guide", "tutorials"}, msg=name
+            )
+
+    def test_doc_type_subset(self):
+        for name, doc_types in self._search(["tutorials"]).items():
+            self.assertSetEqual(doc_types, {"tutorials"}, msg=name)
+
+    def test_no_doc_types(self):
+        ## points without a doc type are never loaded or searched
+        self.assertEqual(self.num_points, 20)
+        for name, doc_types in self._search(None).items():
+            self.assertSetEqual(
+                doc_types, {"user_guide", "tutorials"}, msg=name
+            )
+
+    def test_payload_index(self):
+        ## the in-memory client doesn't keep payload indexes, so the request
+        ## is checked instead
+        client = fodc.get_client()
+        with mock.patch.object(
+            client, "create_payload_index", wraps=client.create_payload_index
+        ) as create_payload_index:
+            fodi.initialize_index()
+
+        create_payload_index.assert_called_once_with(
+            collection_name=fodc.get_collection_name(),
+            field_name="doc_type",
+            field_schema=fodi.models.PayloadSchemaType.KEYWORD,
+        )
+
+    def test_default_query_filter(self):
+        self.assertIsNone(fods.get_doc_type_filter(None))
+        self.assertIsNone(fods.get_doc_type_filter(fodc.DOC_TYPES))
+        self.assertIsNotNone(fods.get_doc_type_filter(["tutorials"]))
+
+        ## the default query searches every doc type, so it sends no filter
+        client = fodc.get_client()
+        with mock.patch.object(
+            client, "search", wraps=client.search
+        ) as search:
+            fodq.query_index(self.query, backend="qdrant")
+
+        self.assertIsNone(search.call_args.kwargs["query_filter"])
+
+
+class NumpySearchBackendTests(LocalIndexTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.docs_index_file, self.ids = self.write_json_index(
+            50, doc_types=["user_guide", "tutorials", "recipes"]
+        )
+        self.index_path = os.path.join(self.tmp_dir, "index")
+        fodi.convert_index(self.docs_index_file, self.index_path)
+
+        self.backend = fods.NumpySearchBackend(index_path=self.index_path)
+        self.queries = [
+            "chunk 7 about datasets",
+            "datasets",
+            "chunk 42",
+            "something else entirely",
+        ]
+        self.vectors = fodc.embed_texts(self.queries)
+
+    def _brute_force(self, vector, top_k, doc_types=None):
+        scores = {}
+        for point_id, value in fodi.iter_index_records(self.docs_index_file):
+            if doc_types is None or value["doc_type"] in doc_types:
+                scores[point_id] = float(np.dot(value["vector"], vector))
+
+        return scores, sorted(scores.values(), reverse=True)[:top_k]
+
+    def _assert_results(self, results, expected, places=5):
+        ## points with tied scores may be returned in any order
+        scores, top_scores = expected
+        self.assertEqual(len(results), len(top_scores))
+        for result, score in zip(results, top_scores):
+            self.assertAlmostEqual(result.score, score, places=places)
+            self.assertAlmostEqual(scores[result.id], score, places=places)
+
+    def test_search(self):
+        for vector in self.vectors:
+            for top_k in (1, 5, 50, 100):
+                for doc_types in (None, ["tutorials"], ["recipes", "faq"]):
+                    results = self.backend.search(
+                        vector, top_k=top_k, doc_types=doc_types
+                    )
+                    expected = self._brute_force(vector, top_k, doc_types)
+                    self._assert_results(results, expected)
+
+        self.assertListEqual(
+            self.backend.search(self.vectors[0], doc_types=["faq"]), []
+        )
+        self.assertListEqual(self.backend.search(self.vectors[0], top_k=0), [])
+
+    def test_search_batch(self):
+        ## queries are scored in several blocks
+        for doc_types in (None, ["tutorials"]):
+            with mock.patch.object(fods, "_SEARCH_BATCH_SIZE", 3):
+                batch_results = self.backend.search_batch(
+                    self.vectors, top_k=7, doc_types=doc_types
+                )
+
+            self.assertEqual(len(batch_results), len(self.vectors))
+            for vector, results in zip(self.vectors, batch_results):
+                expected = self._brute_force(vector, 7, doc_types)
+                self._assert_results(results, expected)
+
+    def test_matches_qdrant(self):
+        fodi.load_index(self.docs_index_file, num_workers=1)
+        qdrant_backend = fods.QdrantSearchBackend()
+
+        for vector in self.vectors:
+            scores, _ = self._brute_force(vector, 5)
+            expected = [
+                r.score for r in qdrant_backend.search(vector, top_k=5)
+            ]
+            self._assert_results(
+                self.backend.search(vector, top_k=5), (scores, expected)
+            )
+
+    def test_float16(self):
+        index_path = os.path.join(self.tmp_dir, "index16")
+        fodi.convert_index(self.docs_index_file, index_path, dtype="float16")
+        backend = fods.NumpySearchBackend(index_path=index_path)
+        self.assertEqual(backend.vectors.dtype, np.float16)
+
+        ## scores are computed in blocks, and lose little precision
+        with mock.patch.object(fods, "_SCORE_BLOCK_SIZE", 16):
+            for vector in self.vectors:
+                results = backend.search(vector, top_k=3)
+                expected = self._brute_force(vector, 3)
+                self._assert_results(results, expected, places=2)
+
+                scores = backend.score_batch([vector])[:, 0]
+                np.testing.assert_allclose(
+                    scores, backend.score(vector), rtol=1e-6
+                )
+
+    def test_get_search_backend(self):
+        with mock.patch.object(
+            fods, "FIFTYONE_DOCS_BINARY_INDEX_PATH", self.index_path
+        ), mock.patch.dict(
+            os.environ, {"FIFTYONE_DOCS_SEARCH_BACKEND": "numpy"}
+        ):
+            backend = fods.get_search_backend()
+            self.assertIsInstance(backend, fods.NumpySearchBackend)
+            self.assertIs(fods.get_search_backend("numpy"), backend)
+
+            results = fodq.query_index(self.queries[0], top_k=3)
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0][1], self.queries[0])
+
+        with self.assertRaises(ValueError):
+            fods.get_search_backend("faiss")
+
+    def test_embedder_mismatch(self):
+        ## indexes are only searched with vectors from the same embedder
+        with mock.patch.dict(
+            os.environ, {"FIFTYONE_DOCS_HASHING_DIMENSION": "64"}
+        ), mock.patch.object(fodc, "_EMBEDDER", None):
+            with self.assertRaises(ValueError):
+                fods.NumpySearchBackend(index_path=self.index_path)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,158 @@
+"""
+Local query server tests.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import json
+import os
+import threading
+import unittest
+from unittest import mock
+import urllib.error
+
+import fiftyone.docs_search.create_index as fodi
+import fiftyone.docs_search.query_index as fodq
+import fiftyone.docs_search.search_backends as fods
+import fiftyone.docs_search.server as fodsv
+
+from tests.unittests.utils import LocalIndexTestCase
+
+
+class ServerTests(LocalIndexTestCase):
+    def setUp(self):
+        super().setUp()
+
+        docs_index_file, _ = self.write_json_index(
+            20, doc_types=["user_guide", "tutorials"]
+        )
+        index_path = os.path.join(self.tmp_dir, "index")
+        fodi.convert_index(docs_index_file, index_path)
+
+        patch = mock.patch.object(
+            fods, "FIFTYONE_DOCS_BINARY_INDEX_PATH", index_path
+        )
+        patch.start()
+        self.addCleanup(patch.stop)
+
+        ## the in-memory Qdrant client is not thread-safe, so the server
+        ## searches the binary index
+        self.server = fodsv.DocsSearchServer(port=0, backend="numpy")
+        self.server.warm_up()
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        host, port = self.server.server_address[:2]
+        self.client = fodsv.ServerClient(host=host, port=port)
+
+        patch = mock.patch.dict(
+            os.environ,
+            {
+                "FIFTYONE_DOCS_SERVER": "true",
+                "FIFTYONE_DOCS_SERVER_PORT": str(port),
+            },
+        )
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_health(self):
+        self.assertTrue(self.client.is_running())
+        self.assertFalse(fodsv.ServerClient(port=1).is_running())
+
+    def test_search(self):
+        query = "chunk 3 about datasets"
+        results = self.client.search(query, top_k=3, doc_types=["tutorials"])
+        self.assertListEqual(
+            results,
+            fodq.query_index(
+                query, top_k=3, doc_types=["tutorials"], backend="numpy"
+            ),
+        )
+        self.assertEqual(results[0][1], query)
+
+        queries = ["chunk 4", "chunk 5 about datasets"]
+        self.assertListEqual(
+            self.client.search_batch(queries, top_k=2, mode="lexical"),
+            fodq.query_index_batch(
+                queries, top_k=2, mode="lexical", backend="numpy"
+            ),
+        )
+
+    def test_errors(self):
+        with self.assertRaises(RuntimeError) as cm:
+            self.client._post("/search", {"top_k": 3})
+
+        self.assertIn("Invalid request", str(cm.exception))
+
+        with self.assertRaises(RuntimeError):
+            self.client.search("datasets", mode="semantic")
+
+        with self.assertRaises(RuntimeError) as cm:
+            self.client._post("/unknown", {})
+
+        self.assertIn("Unknown path", str(cm.exception))
+
+        with self.assertRaises(urllib.error.HTTPError) as cm:
+            fodsv._OPENER.open(self.client.url + "/unknown")
+
+        self.assertEqual(cm.exception.code, 404)
+        self.assertIn("error", json.load(cm.exception))
+
+    def test_query_uses_server(self):
+        query = "chunk 7"
+        expected = fodq.query_index(query, top_k=2, backend="numpy")
+
+        ## searches are sent to the running server rather than run in-process
+        self.assertIsInstance(fodsv.get_server_client(), fodsv.ServerClient)
+
+        get_search_kwargs = self.server.get_search_kwargs
+        requests = []
+
+        def _get_search_kwargs(body):
+            kwargs = get_search_kwargs(body)
+            requests.append(kwargs)
+            return kwargs
+
+        with mock.patch.object(
+            self.server, "get_search_kwargs", _get_search_kwargs
+        ):
+            self.assertListEqual(fodsv.query(query, top_k=2), expected)
+            self.assertListEqual(
+                fodsv.query_batch([query], top_k=2), [expected]
+            )
+
+        ## requests that don't specify a backend use the server's
+        self.assertListEqual(requests, [{"top_k": 2, "backend": "numpy"}] * 2)
+
+    def test_fallback(self):
+        query = "chunk 7"
+        expected = fodq.query_index(query, top_k=2, backend="numpy")
+
+        ## without a server, or if it is disabled, searches run in-process
+        with mock.patch.dict(
+            os.environ, {"FIFTYONE_DOCS_SERVER": "false"}
+        ), mock.patch.object(fodsv.ServerClient, "search") as search:
+            self.assertIsNone(fodsv.get_server_client())
+            self.assertListEqual(
+                fodsv.query(query, top_k=2, backend="numpy"), expected
+            )
+
+        search.assert_not_called()
+
+        with mock.patch.dict(
+            os.environ, {"FIFTYONE_DOCS_SERVER_PORT": "1"}
+        ), mock.patch.object(fodsv.ServerClient, "search_batch") as search:
+            self.assertIsNone(fodsv.get_server_client())
+            self.assertListEqual(
+                fodsv.query_batch([query], top_k=2, backend="numpy"),
+                [expected],
+            )
+
+        search.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
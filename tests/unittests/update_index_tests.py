@@ -0,0 +1,56 @@
+"""
+Incremental index update tests.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import unittest
+
+import fiftyone.docs_search.create_index as fodi
+
+from tests.unittests.utils import LocalIndexTestCase
+
+
+class UpdateDocTests(LocalIndexTestCase):
+    def test_update_changed_chunk(self):
+        fodi.initialize_index()
+
+        filepath = self.make_page("user_guide/page.html", "v1")
+        sections = {"intro": ["chunk 0", "chunk 1", "chunk 2"]}
+        entry, num_upserted, num_deleted = fodi.update_doc_in_index(
+            filepath, sections=sections
+        )
+
+        self.assertEqual(num_upserted, 3)
+        self.assertEqual(num_deleted, 0)
+        self.assertSetEqual(self.get_point_ids(), set(entry["ids"]))
+
+        ## change a chunk that isn't the first of its section, so that its
+        ## chunk index is only correct if IDs are computed over the page
+        filepath = self.make_page("user_guide/page.html", "v2")
+        sections = {"intro": ["chunk 0", "chunk 1 changed", "chunk 2"]}
+        entry, num_upserted, num_deleted = fodi.update_doc_in_index(
+            filepath, entry=entry, sections=sections
+        )
+
+        self.assertEqual(num_upserted, 1)
+        self.assertEqual(num_deleted, 1)
+        self.assertSetEqual(self.get_point_ids(), set(entry["ids"]))
+
+    def test_update_unchanged_page(self):
+        fodi.initialize_index()
+
+        filepath = self.make_page("user_guide/page.html")
+        sections = {"intro": ["chunk 0", "chunk 1"]}
+        entry, _, _ = fodi.update_doc_in_index(filepath, sections=sections)
+        new_entry, num_upserted, num_deleted = fodi.update_doc_in_index(
+            filepath, entry=entry, sections=sections
+        )
+
+        self.assertEqual(num_upserted, 0)
+        self.assertEqual(num_deleted, 0)
+        self.assertListEqual(new_entry["ids"], entry["ids"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,123 @@
+"""
+Unit test utilities.
+| Copyright 2017-2023, Voxel51, Inc.
+| `voxel51.com <https://voxel51.com/>`_
+|
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import uuid
+
+import qdrant_client as qc
+
+import fiftyone.docs_search.common as fodc
+import fiftyone.docs_search.create_index as fodi
+import fiftyone.docs_search.lexical_index as fodl
+import fiftyone.docs_search.search_backends as fods
+
+
+class LocalIndexTestCase(unittest.TestCase):
+    """Test case whose collection is stored in an in-memory Qdrant client,
+    whose docs and index files are written to a temporary directory, and
+    whose vectors are computed by the local hashing embedder.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+        patches = [
+            mock.patch.dict(
+                os.environ,
+                {
+                    "FIFTYONE_DIR": self.tmp_dir,
+                    "FIFTYONE_DOCS_COLLECTION": "test_docs",
+                    "FIFTYONE_DOCS_EMBEDDER": "hashing",
+                    "FIFTYONE_DOCS_EMBEDDING_CACHE": "false",
+                    "FIFTYONE_DOCS_PARSE_CACHE": "false",
+                    "FIFTYONE_DOCS_SERVER": "false",
+                },
+            ),
+            mock.patch.object(fodc, "_CLIENT", qc.QdrantClient(":memory:")),
+            mock.patch.object(fodc, "_EMBEDDER", None),
+            mock.patch.object(fodc, "_COLLECTION_STATES", {}),
+            mock.patch.object(fodc, "_COLLECTION_METADATA", {}),
+            mock.patch.object(fods, "_SEARCH_BACKENDS", {}),
+            mock.patch.object(
+                fodc,
+                "FIFTYONE_DOCS_COLLECTIONS_FILEPATH",
+                os.path.join(self.tmp_dir, "collections.json"),
+            ),
+        ]
+        for module in (fodc, fodi, fodl):
+            patches.append(
+                mock.patch.object(
+                    module, "FIFTYONE_DOCS_INDEX_FOLDER", self.tmp_dir
+                )
+            )
+
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def make_page(self, relpath, contents="<html></html>"):
+        """Writes a page to the HTML docs directory and returns its path."""
+        filepath = os.path.join(self.tmp_dir, "docs", "build", "html", relpath)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, "w") as f:
+            f.write(contents)
+
+        return filepath
+
+    def make_sphinx_page(self, relpath, sections):
+        """Writes a Sphinx-style page with a section for each
+        ``anchor -> text`` item of ``sections`` and returns its path.
+        """
+        body = "".join(
+            f'<section id="{anchor}"><h2>{anchor.title()}<a class="headerlink" '
+            f'href="#{anchor}" title="Permalink to this heading">\u00b6</a>'
+            f"</h2><p>{text}</p></section>"
+            for anchor, text in sections.items()
+        )
+        contents = (
+            "<html><body><nav><ul><li>Navigation</li></ul></nav>"
+            '<article itemprop="articleBody">'
+            f"{body}</article><footer>Copyright</footer></body></html>"
+        )
+        return self.make_page(relpath, contents)
+
+    def write_json_index(self, num_points, doc_types=None):
+        """Writes a JSON index of ``num_points`` points whose doc types cycle
+        through ``doc_types``, and returns its path and the set of its IDs.
+        """
+        if doc_types is None:
+            doc_types = ["user_guide"]
+
+        texts = [f"chunk {i} about datasets" for i in range(num_points)]
+        vectors = fodc.get_embedder().embed_texts(texts)
+
+        docs_json = {}
+        for i, (text, vector) in enumerate(zip(texts, vectors)):
+            docs_json[str(uuid.uuid4())] = {
+                "vector": vector,
+                "text": text,
+                "url": "https://docs.voxel51.com/page.html",
+                "section_anchor": "intro",
+                "doc_type": doc_types[i % len(doc_types)],
+            }
+
+        docs_index_file = os.path.join(self.tmp_dir, "index.json")
+        with open(docs_index_file, "w") as f:
+            json.dump(docs_json, f)
+
+        return docs_index_file, set(docs_json.keys())
+
+    def get_point_ids(self):
+        points, _ = fodc.get_client().scroll(
+            collection_name=fodc.get_collection_name(), limit=10000
+        )
+        return {point.id for point in points}